@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import projects, clients, tasks, finance, planning, documents, resources, inventory, analytics, hr
+from app.api.endpoints import projects, clients, tasks, finance, planning, documents, resources, inventory, analytics, hr, search, admin, batch
 
 api_router = APIRouter()
 api_router.include_router(projects.router)
@@ -13,3 +13,6 @@ api_router.include_router(resources.router)
 api_router.include_router(inventory.router)
 api_router.include_router(analytics.router)
 api_router.include_router(hr.router)
+api_router.include_router(search.router)
+api_router.include_router(admin.router)
+api_router.include_router(batch.router)
@@ -0,0 +1,349 @@
+"""Import de relevés bancaires (CSV / OFX) dans les transactions.
+
+Le fichier est lu en flux, ligne par ligne pour le CSV et par blocs pour
+l'OFX ; chaque opération est validée par TransactionCreate puis écrite par lots
+(COPY vers une table temporaire sur PostgreSQL, executemany ailleurs). Chaque
+lot est validé séparément : une erreur de ligne est signalée sans interrompre
+le fichier, et un import interrompu peut être relancé sans doublon.
+
+Dédoublonnage : chaque opération reçoit une empreinte SHA-256 de sa clé
+naturelle (FITID pour l'OFX, sinon date, montant, libellé et référence) et de
+son rang parmi les opérations identiques du fichier ; deux opérations
+identiques le même jour restent donc distinctes, mais réimporter le même
+relevé ne crée rien. L'empreinte est stockée dans transactions.import_hash.
+
+La réponse est un flux NDJSON : une ligne par erreur de ligne, une ligne de
+progression par lot écrit, puis un récapitulatif final.
+"""
+from datetime import datetime
+from hashlib import sha256
+from io import StringIO
+import codecs
+import csv
+import json
+import re
+import unicodedata
+
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+from app.core.cache import mark_tables_changed
+from app.db.database import SessionLocal
+from app.db.finance_rollup import apply_deltas, deltas_for_rows
+from app.models.models import Transaction
+from app.schemas.schemas import TransactionCreate
+
+# Opérations écrites (et validées) par lot
+IMPORT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 64 * 1024
+
+# En-têtes reconnus (après normalisation : minuscules, sans accents ni ponctuation)
+HEADER_ALIASES = {
+    "date": ("date", "date operation", "date de l operation", "date comptable", "booking date",
+             "transaction date", "date valeur", "value date"),
+    "amount": ("montant", "amount", "montant eur", "amount eur"),
+    "debit": ("debit", "debit eur"),
+    "credit": ("credit", "credit eur"),
+    "description": ("libelle", "libelle operation", "description", "label", "memo", "intitule", "details"),
+    "category": ("categorie", "category"),
+    "type": ("type", "type operation"),
+    "reference": ("reference", "ref", "fitid", "transaction id"),
+}
+HEADER_FIELDS = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S")
+OFX_DATE = re.compile(r"^(\d{8})(\d{6})?(?:\.\d+)?(?:\[.*\])?$")
+TRANSACTION_TYPES = {"revenu": "Revenu", "credit": "Revenu", "depense": "Dépense", "debit": "Dépense"}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _normalize(label):
+    label = unicodedata.normalize("NFKD", label or "").encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", label.lower()).split())
+
+
+def parse_amount(value):
+    text = re.sub(r"[\s  €$£]", "", value or "")
+    if not text:
+        return None
+    negative = text.startswith("(") and text.endswith(")")
+    text = text.strip("()")
+    if "," in text and "." in text:
+        # Le dernier séparateur est le séparateur décimal
+        thousands = "." if text.rfind(",") > text.rfind(".") else ","
+        text = text.replace(thousands, "")
+    text = text.replace(",", ".")
+    try:
+        amount = float(text)
+    except ValueError:
+        raise RowError(f"Montant invalide : {value!r}")
+    return -amount if negative else amount
+
+
+def parse_date(value):
+    text = (value or "").strip()
+    if not text:
+        raise RowError("Date manquante")
+    # Dates OFX : 20240105, 20240105120000, 20240105120000.000[+1:CET]
+    ofx = OFX_DATE.match(text)
+    if ofx:
+        try:
+            return datetime.strptime(ofx.group(1) + (ofx.group(2) or "000000"), "%Y%m%d%H%M%S")
+        except ValueError:
+            raise RowError(f"Date invalide : {value!r}")
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    raise RowError(f"Date invalide : {value!r}")
+
+
+def _build_transaction(raw, default_category):
+    """Convertit une ligne brute en dictionnaire validé par TransactionCreate"""
+    amount = parse_amount(raw.get("amount"))
+    if amount is None:
+        debit = parse_amount(raw.get("debit"))
+        credit = parse_amount(raw.get("credit"))
+        if debit is None and credit is None:
+            raise RowError("Montant manquant")
+        amount = (credit or 0) - abs(debit or 0)
+
+    transaction_type = TRANSACTION_TYPES.get(_normalize(raw.get("type")))
+    if transaction_type is None:
+        transaction_type = "Dépense" if amount < 0 else "Revenu"
+
+    data = {
+        "amount": abs(amount),
+        "type": transaction_type,
+        "category": (raw.get("category") or "").strip() or default_category,
+        "description": " ".join((raw.get("description") or "").split()) or None,
+        "date": parse_date(raw.get("date")),
+    }
+    try:
+        return TransactionCreate(**data).dict(exclude={"invoice_id"})
+    except ValidationError as e:
+        raise RowError("; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+
+
+def _natural_key(raw, data):
+    reference = (raw.get("reference") or "").strip()
+    if raw.get("source") == "ofx" and reference:
+        return f"fitid|{reference}"
+    return "|".join((
+        data["date"].date().isoformat(), f"{data['amount']:.2f}", data["type"],
+        _normalize(data["description"]), reference,
+    ))
+
+
+# --- Lecture des fichiers -----------------------------------------------------
+
+def iter_csv_rows(binary_file, encoding="utf-8-sig"):
+    """Produit (numéro de ligne, ligne brute) ; le délimiteur est déduit de l'en-tête"""
+    lines = codecs.iterdecode(binary_file, encoding, errors="replace")
+    header_line = next(lines, "")
+    while header_line is not None and not header_line.strip():
+        header_line = next(lines, None)
+    if not header_line:
+        return
+    delimiter = max(";,\t|", key=header_line.count)
+    header = next(csv.reader([header_line], delimiter=delimiter))
+    fields = [HEADER_FIELDS.get(_normalize(name)) for name in header]
+    if "date" not in fields or not {"amount", "debit", "credit"} & set(fields):
+        raise RowError(f"En-tête non reconnu : {header_line.strip()!r} (colonnes date et montant attendues)")
+
+    reader = csv.reader(lines, delimiter=delimiter)
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        raw = {field: value for field, value in zip(fields, values) if field}
+        yield reader.line_num + 1, raw
+
+
+OFX_FIELDS = {"DTPOSTED": "date", "TRNAMT": "amount", "NAME": "description", "MEMO": "memo", "FITID": "reference"}
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def iter_ofx_rows(binary_file, encoding="latin-1"):
+    """Produit (rang de l'opération, opération brute) ; gère l'OFX SGML (balises non fermées) et XML"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    current = None
+    index = 0
+    while True:
+        chunk = binary_file.read(READ_CHUNK_SIZE)
+        pending += decoder.decode(chunk, final=not chunk)
+        # On garde la dernière balise, peut-être tronquée, pour le bloc suivant
+        cut = max(pending.rfind("<"), 0) if chunk else len(pending)
+        text, pending = pending[:cut], pending[cut:]
+        for closing, tag, value in OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                # </STMTTRN> est facultatif en SGML : une nouvelle opération clôt la précédente
+                if current is not None:
+                    index += 1
+                    yield index, _ofx_transaction(current)
+                current = None if closing else {}
+            elif tag == "BANKTRANLIST" and closing and current is not None:
+                index += 1
+                yield index, _ofx_transaction(current)
+                current = None
+            elif current is not None and not closing and tag in OFX_FIELDS:
+                current[OFX_FIELDS[tag]] = value.strip()
+        if not chunk:
+            if current is not None:
+                index += 1
+                yield index, _ofx_transaction(current)
+            return
+
+
+def _ofx_transaction(fields):
+    description = " ".join(filter(None, (fields.get("description"), fields.get("memo"))))
+    return {
+        "source": "ofx",
+        "date": fields.get("date"),
+        "amount": fields.get("amount"),
+        "description": description,
+        "reference": fields.get("reference"),
+    }
+
+
+# --- Écriture -------------------------------------------------------------------
+
+IMPORT_COLUMNS = ("amount", "type", "category", "description", "date", "import_hash", "created_at", "updated_at")
+
+
+def _insert_batch_executemany(db, batch):
+    hashes = [row["import_hash"] for row in batch]
+    existing = set(db.execute(
+        select(Transaction.import_hash).where(Transaction.import_hash.in_(hashes))
+    ).scalars())
+    rows = [row for row in batch if row["import_hash"] not in existing]
+    if rows:
+        db.execute(insert(Transaction), rows)
+    return rows
+
+
+def _insert_batch_copy(db, batch):
+    """COPY vers une table temporaire puis INSERT ... ON CONFLICT DO NOTHING"""
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS transactions_import ("
+            "amount double precision, type varchar(50), category varchar(50), description text, "
+            "date timestamp, import_hash varchar(64), created_at timestamp, updated_at timestamp"
+            ") ON COMMIT DELETE ROWS"
+        )
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([
+                r"\N" if row[column] is None else row[column].isoformat() if isinstance(row[column], datetime) else row[column]
+                for column in IMPORT_COLUMNS
+            ])
+        buffer.seek(0)
+        columns = ", ".join(IMPORT_COLUMNS)
+        cursor.copy_expert(f"COPY transactions_import ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        cursor.execute(
+            f"INSERT INTO transactions ({columns}) SELECT {columns} FROM transactions_import "
+            "ON CONFLICT (import_hash) DO NOTHING RETURNING amount, type, category, date"
+        )
+        return [dict(zip(("amount", "type", "category", "date"), values)) for values in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _write_batch(db, batch):
+    if db.bind.dialect.name == "postgresql":
+        inserted = _insert_batch_copy(db, batch)
+    else:
+        inserted = _insert_batch_executemany(db, batch)
+    apply_deltas(db.connection(), deltas_for_rows(inserted))
+    mark_tables_changed(db, Transaction.__tablename__, "finance_daily_rollup")
+    db.commit()
+    return len(inserted)
+
+
+def import_transactions(db, rows, default_category=None, batch_size=IMPORT_BATCH_SIZE):
+    """Importe des lignes brutes [(numéro, ligne)] ; produit des événements de progression.
+
+    Événements : {"event": "error", "row", "error"} pour chaque ligne rejetée,
+    {"event": "progress", ...} après chaque lot et {"event": "done", ...} à la fin.
+    """
+    stats = {"rows": 0, "imported": 0, "duplicates": 0, "errors": 0}
+    occurrences = {}
+    batch = []
+
+    def flush():
+        imported = _write_batch(db, batch)
+        stats["imported"] += imported
+        stats["duplicates"] += len(batch) - imported
+        batch.clear()
+        return {"event": "progress", **stats}
+
+    rows = iter(rows)
+    while True:
+        try:
+            item = next(rows, None)
+        except RowError as e:
+            # Fichier illisible (en-tête non reconnu...) : on arrête proprement
+            stats["errors"] += 1
+            yield {"event": "error", "row": None, "error": str(e)}
+            break
+        if item is None:
+            break
+        number, raw = item
+        stats["rows"] += 1
+        try:
+            data = _build_transaction(raw, default_category)
+        except RowError as e:
+            stats["errors"] += 1
+            yield {"event": "error", "row": number, "error": str(e)}
+            continue
+
+        key = sha256(_natural_key(raw, data).encode("utf-8")).digest()
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        now = datetime.utcnow()
+        batch.append({
+            **data,
+            "import_hash": sha256(key + str(occurrence).encode()).hexdigest(),
+            "created_at": now,
+            "updated_at": now,
+        })
+        if len(batch) >= batch_size:
+            yield flush()
+
+    if batch:
+        yield flush()
+    yield {"event": "done", **stats}
+
+
+# --- Réponse -------------------------------------------------------------------
+
+def stream_import(source, format, encoding=None, default_category=None):
+    """Importe le fichier (objet binaire possédé par l'appelant, fermé à la fin) en
+    renvoyant la progression en NDJSON, un événement par ligne"""
+    if format == "ofx":
+        rows = iter_ofx_rows(source, encoding or "latin-1")
+    else:
+        rows = iter_csv_rows(source, encoding or "utf-8-sig")
+
+    def generate():
+        # Session propre au flux : celle de get_db est fermée avant l'envoi du corps
+        db = SessionLocal()
+        try:
+            for event in import_transactions(db, rows, default_category):
+                yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+            source.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,141 @@
+"""Opérations en masse partagées par les routers (/bulk).
+
+Toutes les lignes sont validées avant la moindre écriture (clés étrangères,
+unicité, existence des cibles) ; en cas d'erreur, la requête est rejetée en
+422 avec le détail par élément et rien n'est écrit. Les insertions passent
+par un INSERT ... RETURNING multi-lignes (insertmanyvalues de SQLAlchemy),
+les mises à jour et suppressions par l'unité de travail de l'ORM, en une seule
+transaction validée par l'appelant.
+"""
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+
+# Taille des lots pour les listes IN et les INSERT multi-lignes
+BATCH_SIZE = 1000
+
+
+def _chunks(values, size=BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _existing_values(db, column, values):
+    found = set()
+    for chunk in _chunks(values):
+        found.update(db.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def _raise_if_errors(errors):
+    if errors:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": "Aucune ligne n'a été enregistrée",
+                "errors": [{"index": index, "error": error} for index, error in sorted(errors.items())],
+            },
+        )
+
+
+def validate_rows(db, model, rows):
+    """Vérifie clés étrangères et colonnes uniques ; retourne {index: erreur}"""
+    table = model.__table__
+    errors = {}
+
+    for foreign_key in table.foreign_keys:
+        column = foreign_key.parent
+        referenced = foreign_key.column
+        values = {row[column.key] for row in rows if row.get(column.key) is not None}
+        existing = _existing_values(db, referenced, values)
+        for index, row in enumerate(rows):
+            value = row.get(column.key)
+            if value is not None and value not in existing:
+                errors.setdefault(index, f"{column.key}={value} n'existe pas")
+
+    for column in table.columns:
+        if not column.unique:
+            continue
+        seen = defaultdict(list)
+        for index, row in enumerate(rows):
+            if row.get(column.key) is not None:
+                seen[row[column.key]].append((index, row.get("id")))
+        owners = {}
+        for chunk in _chunks(seen):
+            owners.update(db.execute(select(column, table.c.id).where(column.in_(chunk))).all())
+        for value, claims in seen.items():
+            for index, row_id in claims:
+                if len(claims) > 1:
+                    errors.setdefault(index, f"{column.key}={value} est dupliqué dans la requête")
+                elif value in owners and owners[value] != row_id:
+                    errors.setdefault(index, f"{column.key}={value} existe déjà")
+    return errors
+
+
+def bulk_create(db, model, rows):
+    """Valide puis insère les lignes par lots ; retourne les résultats par élément"""
+    _raise_if_errors(validate_rows(db, model, rows))
+
+    ids = []
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    for chunk in _chunks(rows):
+        ids.extend(db.execute(statement, chunk).scalars())
+    return {
+        "count": len(ids),
+        "results": [{"index": index, "id": new_id, "status": "created"} for index, new_id in enumerate(ids)],
+    }
+
+
+def _load_by_ids(db, query, model, ids):
+    objects = {}
+    for chunk in _chunks(set(ids)):
+        for obj in query.filter(model.id.in_(chunk)):
+            objects[obj.id] = obj
+    return objects
+
+
+def bulk_update(db, model, items, query=None, protected_fields=()):
+    """Valide puis applique des mises à jour partielles [{id, champs...}]"""
+    query = query if query is not None else db.query(model)
+    objects = _load_by_ids(db, query, model, [item["id"] for item in items])
+
+    errors = {}
+    for index, item in enumerate(items):
+        if item["id"] not in objects:
+            errors[index] = f"id={item['id']} non trouvé"
+    # Les champs absents de la requête gardent leur valeur : on ne valide que ce qui change
+    for index, error in validate_rows(db, model, items).items():
+        errors.setdefault(index, error)
+    _raise_if_errors(errors)
+
+    for item in items:
+        obj = objects[item["id"]]
+        for key, value in item.items():
+            if key != "id" and key not in protected_fields:
+                setattr(obj, key, value)
+    return {
+        "count": len(items),
+        "results": [{"index": index, "id": item["id"], "status": "updated"} for index, item in enumerate(items)],
+    }
+
+
+def bulk_delete(db, model, ids, query=None, on_delete=None):
+    """Supprime les lignes trouvées (cascades ORM comprises) ; les absentes sont signalées"""
+    query = query if query is not None else db.query(model)
+    objects = _load_by_ids(db, query, model, ids)
+
+    results = []
+    deleted = set()
+    for index, object_id in enumerate(ids):
+        obj = objects.get(object_id)
+        if obj is None or object_id in deleted:
+            results.append({"index": index, "id": object_id, "status": "not_found"})
+            continue
+        if on_delete is not None:
+            on_delete(obj)
+        db.delete(obj)
+        deleted.add(object_id)
+        results.append({"index": index, "id": object_id, "status": "deleted"})
+    return {"count": len(deleted), "results": results}
@@ -0,0 +1,86 @@
+"""Requêtes conditionnelles (ETag, If-None-Match, If-Match) des endpoints CRUD.
+
+- Ressource seule : ETag fort dérivé de (id, updated_at), qui change à chaque
+  écriture ORM (onupdate).
+- Liste : empreinte de la chaîne de requête (filtres, tri, page), des
+  (id, updated_at) des lignes de la page et du curseur suivant, calculée
+  sur la page déjà lue : aucune requête SQL supplémentaire.
+
+Si If-None-Match correspond, l'endpoint renvoie 304 sans sérialiser ni
+envoyer le corps. Sur PUT / DELETE, un If-Match qui ne correspond plus à
+la version courante donne 412 : le client écrit sans relire la ressource et
+n'écrase pas une modification concurrente.
+
+Une réponse compressée porte l'ETag suffixé de son encodage ("x-gzip", voir
+app.core.compression) ; la comparaison ignore ce suffixe.
+"""
+from hashlib import sha1
+
+from fastapi import HTTPException, Request, Response, status
+
+
+# Suffixes ajoutés aux ETags forts des réponses compressées (app.core.compression)
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def _without_encoding(value):
+    for suffix in ENCODING_SUFFIXES:
+        if value.endswith(f'{suffix}"'):
+            return value[:-len(suffix) - 1] + '"'
+    return value
+
+
+def matching_etag(header, etag, weak=True):
+    """Valeur d'un en-tête If-None-Match / If-Match qui désigne `etag` (RFC 9110 §13.1), None sinon"""
+    if header.strip() == "*":
+        return etag
+    for value in header.split(","):
+        value = value.strip()
+        candidate = _without_encoding(value)
+        if weak:
+            # Comparaison faible : W/"x" équivaut à "x"
+            if candidate.removeprefix("W/") == etag.removeprefix("W/"):
+                return value
+        elif not etag.startswith("W/") and candidate == etag:
+            return value
+    return None
+
+
+def etag_matches(header, etag, weak=True):
+    """Compare un en-tête If-None-Match / If-Match à un ETag (RFC 9110 §13.1)"""
+    return matching_etag(header, etag, weak) is not None
+
+
+def resource_etag(obj):
+    updated_at = obj.updated_at or obj.created_at
+    version = updated_at.strftime("%Y%m%d%H%M%S%f") if updated_at is not None else "0"
+    return f'"{obj.id}-{version}"'
+
+
+def page_etag(request: Request, rows, next_cursor=None):
+    """ETag d'une page de liste : chaîne de requête, version de chaque ligne et curseur suivant"""
+    digest = sha1(f"{request.url.query}|{next_cursor or ''}".encode())
+    for row in rows:
+        digest.update(f"|{row.id}-{row.updated_at.isoformat() if row.updated_at else ''}".encode())
+    return f'"l-{digest.hexdigest()[:32]}"'
+
+
+def not_modified(request: Request, response: Response, etag):
+    """Renseigne l'ETag ; retourne la réponse 304 si If-None-Match correspond, None sinon"""
+    response.headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match")
+    matched = matching_etag(if_none_match, etag) if if_none_match else None
+    if matched is not None:
+        # ETag de la représentation que le client a en cache (suffixe d'encodage compris)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": matched})
+    return None
+
+
+def require_match(request: Request, obj):
+    """412 si If-Match est présent et ne désigne plus la version courante de `obj`"""
+    if_match = request.headers.get("if-match")
+    if if_match and not etag_matches(if_match, resource_etag(obj), weak=False):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="La ressource a été modifiée depuis la version indiquée (If-Match)",
+        )
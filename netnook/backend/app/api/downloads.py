@@ -0,0 +1,168 @@
+"""Envoi de fichiers avec requêtes partielles (Range) et conditionnelles.
+
+- ETag fort (l'empreinte SHA-256 du contenu quand elle est connue) et
+  Last-Modified : If-None-Match / If-Modified-Since donnent 304 sans corps.
+- Range : une plage d'octets (`bytes=debut-fin`, `bytes=debut-`, `bytes=-n`)
+  donne 206 avec Content-Range ; une plage hors du fichier donne 416. Plusieurs
+  plages dans la même requête ne sont pas assemblées (multipart/byteranges) :
+  le fichier complet est renvoyé, ce que permet la RFC 9110.
+- If-Range : la plage n'est servie que si le validateur correspond encore.
+
+Le corps est envoyé sans copie en espace utilisateur quand le serveur ASGI le
+permet (extensions http.response.zerocopy / http.response.pathsend), sinon par
+blocs lus dans le threadpool.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+import mimetypes
+import os
+import stat
+
+import anyio
+from fastapi import HTTPException, Request
+from starlette.responses import FileResponse, Response
+
+from app.api.conditional import etag_matches
+
+CHUNK_SIZE = 256 * 1024
+
+
+def guess_media_type(file_type, filename):
+    """Type MIME d'après file_type (type MIME ou extension), puis d'après le nom"""
+    if file_type and "/" in file_type:
+        return file_type
+    if file_type:
+        media_type = mimetypes.guess_type(f"fichier.{file_type.lstrip('.')}")[0]
+        if media_type:
+            return media_type
+    return mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+
+def _not_modified_since(header, mtime):
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(header, size):
+    """(début, fin incluse) de la plage demandée, None si l'en-tête est ignoré.
+
+    Lève 416 si la plage est syntaxiquement valide mais hors du fichier.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    start, separator, end = ranges.strip().partition("-")
+    if not separator:
+        return None
+    try:
+        if start == "":
+            # Suffixe : les n derniers octets
+            length = int(end)
+            if length <= 0:
+                raise ValueError
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(
+            status_code=416, detail="Plage hors du fichier", headers={"Content-Range": f"bytes */{size}"}
+        )
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse limitée à une plage d'octets du fichier"""
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, path, start, end, stat_result, **kwargs):
+        super().__init__(path, status_code=206, stat_result=stat_result, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-length"] = str(end - start + 1)
+        self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        await send_file(scope, send, self.path, self.start, self.end - self.start + 1, self.chunk_size)
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """FileResponse utilisant l'extension zerocopy quand le serveur la propose"""
+    chunk_size = CHUNK_SIZE
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopy" not in extensions or scope["method"].upper() == "HEAD":
+            await super().__call__(scope, receive, send)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send_file(scope, send, self.path, 0, self.stat_result.st_size, self.chunk_size)
+
+
+async def send_file(scope, send, path, offset, count, chunk_size=CHUNK_SIZE):
+    """Envoie `count` octets de `path` à partir de `offset` comme corps de réponse"""
+    extensions = scope.get("extensions") or {}
+    if "http.response.zerocopy" in extensions:
+        # Le serveur transmet le descripteur à sendfile(2)
+        with open(path, "rb") as file:
+            await send({"type": "http.response.zerocopy", "file": file, "offset": offset, "count": count})
+        return
+    async with await anyio.open_file(path, mode="rb") as file:
+        await file.seek(offset)
+        remaining = count
+        while remaining > 0:
+            chunk = await file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # Fichier tronqué depuis le stat : on clôt la réponse
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(request: Request, path, filename=None, media_type=None, etag=None, inline=False):
+    """Réponse 200, 206, 304 ou 416 pour `path`, selon les en-têtes de la requête"""
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    if etag is None:
+        etag = f'"{int(stat_result.st_mtime_ns):x}-{stat_result.st_size:x}"'
+    validators = {"etag": etag, "last-modified": last_modified, "accept-ranges": "bytes"}
+
+    # If-None-Match prime sur If-Modified-Since (RFC 9110 §13.2.2)
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if (if_none_match and etag_matches(if_none_match, etag)) or (
+        not if_none_match and if_modified_since and _not_modified_since(if_modified_since, stat_result.st_mtime)
+    ):
+        return Response(status_code=304, headers=validators)
+
+    options = {
+        "filename": filename,
+        "media_type": media_type,
+        "headers": validators,
+        "content_disposition_type": "inline" if inline else "attachment",
+    }
+    range_header = request.headers.get("range")
+    if range_header and stat_result.st_size > 0:
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() in (etag, last_modified):
+            byte_range = parse_range(range_header, stat_result.st_size)
+            if byte_range is not None:
+                return RangeFileResponse(path, *byte_range, stat_result, **options)
+
+    return ZeroCopyFileResponse(path, stat_result=stat_result, **options)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Query, status
+from typing import Literal
+from app.db.slow_queries import recorder as slow_queries
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/slow-queries")
+def read_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order: Literal["total", "max", "count"] = "total",
+):
+    """Requêtes SQL lentes agrégées par empreinte, les plus coûteuses d'abord"""
+    sort_key = {"total": "total_ms", "max": "max_ms", "count": "count"}[order]
+    return {
+        "threshold_ms": slow_queries.threshold_ms,
+        "enabled": slow_queries.enabled,
+        "queries": slow_queries.top(limit, sort_key),
+    }
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def reset_slow_queries():
+    """Remet à zéro l'agrégation des requêtes lentes"""
+    slow_queries.reset()
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from app.db.database import get_db
-from app.models.models import Project, Client, Task, Invoice, Transaction
-from sqlalchemy import func, desc
+from typing import List, Optional, Dict, Any, Literal
+from app.db.database import async_endpoint, get_session
+from app.core.cache import analytics_cache
+from app.models.models import Project, Client, Task, Invoice, Transaction, FinanceDailyRollup
+from sqlalchemy import func, desc, cast, select, Date
+from datetime import datetime, time, timezone
 import json
 
 router = APIRouter(
@@ -12,10 +14,21 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Tables dont dépend chaque réponse mise en cache
+DASHBOARD_TABLES = ("projects", "clients", "tasks", "invoices", "transactions")
+FINANCE_SUMMARY_TABLES = ("transactions", "finance_daily_rollup")
+PROJECTS_PERFORMANCE_TABLES = ("projects", "tasks", "invoices")
+AI_INSIGHTS_TABLES = ("projects", "clients", "tasks", "invoices")
+
 @router.get("/dashboard")
-def get_dashboard_data(db: Session = Depends(get_db)):
+@async_endpoint
+def get_dashboard_data(response: Response, db: Session = Depends(get_session)):
     """Récupère les données pour le dashboard principal"""
-    
+    return analytics_cache.get_or_compute(
+        ("dashboard",), DASHBOARD_TABLES, lambda: _dashboard_data(db), response
+    )
+
+def _dashboard_data(db: Session):
     # Nombre total de projets par statut
     projects_by_status = db.query(
         Project.status, 
@@ -69,40 +82,115 @@ def get_dashboard_data(db: Session = Depends(get_db)):
         ]
     }
 
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Ramène une date avec fuseau horaire en UTC naïf, comme les colonnes DateTime"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _is_day_boundary(value: Optional[datetime]) -> bool:
+    return value is None or value.time() == time.min
+
+def _date_bucket(db: Session, column, group_by: str):
+    """Expression SQL tronquant une date au jour, à la semaine (lundi) ou au mois"""
+    if db.bind.dialect.name == "sqlite":
+        if group_by == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        if group_by == "month":
+            return func.strftime("%Y-%m-01", column)
+        return func.date(column)
+    return cast(func.date_trunc(group_by, column), Date)
+
 @router.get("/finance/summary")
+@async_endpoint
 def get_finance_summary(
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    db: Session = Depends(get_db)
+    response: Response,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    group_by: Optional[Literal["day", "week", "month"]] = None,
+    db: Session = Depends(get_session)
 ):
     """Récupère un résumé des données financières"""
-    
-    query = db.query(Transaction)
-    
+    start_date = _to_naive_utc(start_date)
+    end_date = _to_naive_utc(end_date)
+    return analytics_cache.get_or_compute(
+        ("finance_summary", start_date, end_date, group_by),
+        FINANCE_SUMMARY_TABLES,
+        lambda: _finance_summary(db, start_date, end_date, group_by),
+        response
+    )
+
+def _finance_sources(start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Requêtes à cumuler pour la période : (colonne date, type, catégorie, montant, filtres).
+
+    end_date est inclus à l'instant près, quel que soit le chemin : une borne à
+    minuit n'inclut de ce jour que les transactions datées de minuit.
+    """
+    if _is_day_boundary(start_date) and _is_day_boundary(end_date):
+        # Bornes à la journée : agrégat journalier (coût proportionnel au nombre de jours)
+        # pour les jours entiers, transactions datées exactement de end_date en plus
+        filters = []
+        if start_date:
+            filters.append(FinanceDailyRollup.day >= start_date.date())
+        if end_date:
+            filters.append(FinanceDailyRollup.day < end_date.date())
+        sources = [(
+            FinanceDailyRollup.day, FinanceDailyRollup.type, FinanceDailyRollup.category,
+            func.sum(FinanceDailyRollup.total), filters
+        )]
+        if end_date:
+            filters = [Transaction.date == end_date]
+            if start_date:
+                filters.append(Transaction.date >= start_date)
+            sources.append((
+                Transaction.date, Transaction.type, Transaction.category, func.sum(Transaction.amount), filters
+            ))
+        return sources
+
+    # Bornes horaires précises : agrégation sur les transactions elles-mêmes
+    filters = []
     if start_date:
-        query = query.filter(Transaction.date >= start_date)
+        filters.append(Transaction.date >= start_date)
     if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    
-    transactions = query.all()
+        filters.append(Transaction.date <= end_date)
+    return [(Transaction.date, Transaction.type, Transaction.category, func.sum(Transaction.amount), filters)]
+
+def _finance_summary(
+    db: Session,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    group_by: Optional[str]
+):
+    sources = _finance_sources(start_date, end_date)
     
-    # Calculer les revenus et dépenses
-    income = sum(t.amount for t in transactions if t.type == "Revenu")
-    expenses = sum(t.amount for t in transactions if t.type == "Dépense")
+    # Totaux par type et par catégorie calculés par la base
+    totals = [
+        row
+        for _, type_column, category_column, amount_total, filters in sources
+        for row in db.query(
+            type_column,
+            category_column,
+            amount_total.label("total")
+        ).filter(*filters).group_by(type_column, category_column).all()
+    ]
     
-    # Transactions par catégorie
+    income = 0
+    expenses = 0
     categories = {}
-    for t in transactions:
-        if t.category:
-            if t.category not in categories:
-                categories[t.category] = {"income": 0, "expenses": 0}
-            
-            if t.type == "Revenu":
-                categories[t.category]["income"] += t.amount
-            elif t.type == "Dépense":
-                categories[t.category]["expenses"] += t.amount
+    for transaction_type, category, total in totals:
+        total = float(total or 0)
+        if transaction_type == "Revenu":
+            income += total
+        elif transaction_type == "Dépense":
+            expenses += total
+        else:
+            continue
+        
+        if category:
+            data = categories.setdefault(category, {"income": 0, "expenses": 0})
+            data["income" if transaction_type == "Revenu" else "expenses"] += total
     
-    return {
+    summary = {
         "total_income": income,
         "total_expenses": expenses,
         "net_profit": income - expenses,
@@ -116,45 +204,114 @@ def get_finance_summary(
             for category, data in categories.items()
         ]
     }
+    
+    # Série temporelle optionnelle pour les graphiques du dashboard
+    if group_by:
+        rows = []
+        for date_column, type_column, _, amount_total, filters in sources:
+            bucket = _date_bucket(db, date_column, group_by).label("period")
+            rows += db.query(
+                bucket,
+                type_column,
+                amount_total.label("total")
+            ).filter(*filters).group_by(bucket, type_column).order_by(bucket).all()
+        
+        periods = {}
+        for period, transaction_type, total in rows:
+            if period is None:
+                continue
+            data = periods.setdefault(str(period), {"income": 0, "expenses": 0})
+            if transaction_type == "Revenu":
+                data["income"] += float(total or 0)
+            elif transaction_type == "Dépense":
+                data["expenses"] += float(total or 0)
+        
+        summary["group_by"] = group_by
+        summary["series"] = [
+            {
+                "period": period,
+                "income": data["income"],
+                "expenses": data["expenses"],
+                "net": data["income"] - data["expenses"]
+            }
+            for period, data in periods.items()
+        ]
+    
+    return summary
 
 @router.get("/projects/performance")
-def get_projects_performance(db: Session = Depends(get_db)):
-    """Récupère les données de performance des projets"""
+@async_endpoint
+def get_projects_performance(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    status: Optional[str] = None,
+    db: Session = Depends(get_session)
+):
+    """Récupère les données de performance des projets (tous par défaut, une page avec skip/limit)"""
+    return analytics_cache.get_or_compute(
+        ("projects_performance", skip, limit, status),
+        PROJECTS_PERFORMANCE_TABLES,
+        lambda: _projects_performance(db, skip, limit, status),
+        response
+    )
+
+def _projects_performance(db: Session, skip: int, limit: Optional[int], status: Optional[str]):
+    query = db.query(Project)
+    if status:
+        query = query.filter(Project.status == status)
+    query = query.order_by(Project.id).offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    projects = query.all()
     
-    projects = db.query(Project).all()
+    # Les agrégats filtrent sur la requête des projets (sous-requête) : pas de liste
+    # d'ids en paramètres, quel que soit le nombre de projets
+    page = query.with_entities(Project.id, Project.client_id).subquery()
     
-    project_data = []
-    for project in projects:
-        # Calculer le nombre de tâches par statut pour ce projet
-        tasks_by_status = db.query(
-            Task.status, 
+    # Nombre de tâches par projet et par statut, en une seule requête
+    tasks_by_project = {}
+    if projects:
+        task_counts = db.query(
+            Task.project_id,
+            Task.status,
             func.count(Task.id).label("count")
-        ).filter(Task.project_id == project.id).group_by(Task.status).all()
-        
-        # Calculer le montant total des factures liées à ce client/projet
-        total_invoiced = 0
-        if project.client_id:
-            total_invoiced = db.query(func.sum(Invoice.amount)).filter(
-                Invoice.client_id == project.client_id
-            ).scalar() or 0
-        
-        project_data.append({
+        ).filter(Task.project_id.in_(select(page.c.id))).group_by(Task.project_id, Task.status).all()
+        for project_id, task_status, count in task_counts:
+            tasks_by_project.setdefault(project_id, []).append({"status": task_status, "count": count})
+    
+    # Montant total facturé par client, en une seule requête
+    invoiced_by_client = {}
+    if any(project.client_id for project in projects):
+        invoice_totals = db.query(
+            Invoice.client_id,
+            func.sum(Invoice.amount).label("total")
+        ).filter(Invoice.client_id.in_(select(page.c.client_id))).group_by(Invoice.client_id).all()
+        invoiced_by_client = {client_id: total or 0 for client_id, total in invoice_totals}
+    
+    return [
+        {
             "id": project.id,
             "name": project.name,
             "status": project.status,
             "budget": project.budget,
             "start_date": project.start_date.isoformat() if project.start_date else None,
             "end_date": project.end_date.isoformat() if project.end_date else None,
-            "tasks": [{"status": status, "count": count} for status, count in tasks_by_status],
-            "total_invoiced": float(total_invoiced)
-        })
-    
-    return project_data
+            "tasks": tasks_by_project.get(project.id, []),
+            "total_invoiced": float(invoiced_by_client.get(project.client_id, 0))
+        }
+        for project in projects
+    ]
 
 @router.get("/ai-insights")
-def get_ai_insights(db: Session = Depends(get_db)):
+@async_endpoint
+def get_ai_insights(response: Response, db: Session = Depends(get_session)):
     """Génère des insights basés sur les données de l'application"""
-    
+    return analytics_cache.get_or_compute(
+        ("ai_insights",), AI_INSIGHTS_TABLES, lambda: _ai_insights(db), response
+    )
+
+def _ai_insights(db: Session):
     # Nombre de projets en retard (date de fin dépassée mais statut pas terminé)
     from datetime import datetime
     now = datetime.utcnow()
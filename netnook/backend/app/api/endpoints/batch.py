@@ -0,0 +1,147 @@
+"""Requêtes groupées : plusieurs GET de l'API en une seule requête HTTP.
+
+POST /batch reçoit une liste de sous-requêtes GET (chemin avec chaîne de
+requête, en-têtes facultatifs comme If-None-Match). Elles sont exécutées dans
+l'application même, sans aller-retour HTTP, et partagent une session en
+lecture seule (app.db.database.shared_read_only_session). Les sous-requêtes
+s'exécutent en parallèle : leurs accès à la base passent l'un après l'autre
+sur la session partagée, le reste (routage, validation, sérialisation,
+réponses servies par le cache analytique) se recouvre.
+
+La réponse donne, dans l'ordre des sous-requêtes, le statut, les en-têtes et
+le corps JSON de chacune ; une sous-requête en erreur n'interrompt pas les
+autres.
+"""
+from urllib.parse import quote, unquote, urlsplit
+import asyncio
+import logging
+import os
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.db.database import run_in_session, shared_read_only_session
+from app.schemas.schemas import BatchRequest
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+
+# En-têtes de sous-réponse sans objet dans l'enveloppe JSON
+SKIPPED_HEADERS = {"content-length", "content-type", "content-encoding", "vary"}
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["batch"],
+)
+
+
+def _error(status, detail):
+    return status, {}, orjson.dumps({"detail": detail})
+
+
+def _header(message, name):
+    for key, value in message.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_json(start):
+    return (_header(start, b"content-type") or "").startswith("application/json")
+
+
+async def _dispatch(app, parent_scope, item, db):
+    """Exécute une sous-requête GET dans l'application ; (statut, en-têtes, corps JSON brut)"""
+    url = urlsplit(item.path)
+    if not url.path.startswith("/") or url.scheme or url.netloc:
+        return _error(400, "Chemin invalide : attendu /ressource?paramètres")
+    if url.path.rstrip("/") == router.prefix:
+        return _error(400, "Une sous-requête ne peut pas viser /batch")
+
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in item.headers.items()
+        if name.lower() not in ("accept-encoding", "content-length", "host")
+    ]
+    host = [(name, value) for name, value in parent_scope["headers"] if name == b"host"]
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": parent_scope.get("scheme", "http"),
+        "server": parent_scope.get("server"),
+        "client": parent_scope.get("client"),
+        "root_path": parent_scope.get("root_path", ""),
+        # Chemin et paramètres tels qu'un client HTTP les enverrait (caractères non ASCII encodés)
+        "path": unquote(url.path),
+        "raw_path": quote(url.path, safe="/%").encode(),
+        "query_string": quote(url.query, safe="=&%+,;:@/?!$'()*").encode(),
+        "headers": host + [(b"accept", b"application/json")] + headers,
+        "state": parent_scope.get("state", {}).copy(),
+    }
+    start = {}
+    chunks = []
+    finished = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Pas d'autre message avant la fin de la réponse (les réponses en flux attendent une déconnexion)
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+            if not _is_json(message):
+                # Corps inutilisable : la déconnexion interrompt une réponse en flux (export)
+                finished.set()
+        elif message["type"] == "http.response.body" and not finished.is_set():
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # La session partagée est remise en état pour les sous-requêtes suivantes
+        logger.exception("Sous-requête /batch en échec : %s", item.path)
+        await run_in_session(db, lambda session: session.rollback())
+        return _error(500, "Erreur interne")
+    finally:
+        finished.set()
+
+    status = start.get("status", 500)
+    if not _is_json(start) and status not in (204, 304):
+        content_type = _header(start, b"content-type") or "type inconnu"
+        return _error(406, f"Réponse non JSON ({content_type}) : non disponible par /batch")
+    response_headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in start.get("headers", [])
+        if name.decode("latin-1").lower() not in SKIPPED_HEADERS
+    }
+    return status, response_headers, b"".join(chunks) or b"null"
+
+
+@router.post("")
+async def batch(batch_request: BatchRequest, request: Request):
+    """Exécute plusieurs GET de l'API et renvoie leurs réponses dans l'ordre"""
+    items = batch_request.requests
+    if len(items) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400, detail=f"Trop de sous-requêtes : {len(items)} (maximum {BATCH_MAX_REQUESTS})"
+        )
+    async with shared_read_only_session() as db:
+        results = await asyncio.gather(*[_dispatch(request.app, request.scope, item, db) for item in items])
+
+    # Corps des sous-réponses insérés tels quels : pas de second décodage / encodage JSON
+    parts = []
+    for item, (status, headers, body) in zip(items, results):
+        head = orjson.dumps({"id": item.id, "path": item.path, "status": status, "headers": headers})
+        parts.append(head[:-1] + b',"body":' + body + b"}")
+    return Response(b'{"responses":[' + b",".join(parts) + b"]}", media_type="application/json")
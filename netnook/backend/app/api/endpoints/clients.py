@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.includes import includes_etag, load_includes, parse_includes
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.db.search import search_filter
 from app.models.models import Client
-from app.schemas.schemas import Client as ClientSchema, ClientCreate, ClientUpdate
+from app.schemas.schemas import Client as ClientSchema, ClientCreate, ClientUpdate, ClientBulkUpdate
+from app.schemas.schemas import Invoice as InvoiceSchema, Project as ProjectSchema
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/clients",
@@ -11,8 +19,21 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+CLIENT_SORTS = {
+    "name": Client.name,
+    "created_at": Client.created_at,
+}
+
+# Relations exposées par include= (voir app.api.includes)
+CLIENT_INCLUDES = {
+    "projects": (Client.projects, ProjectSchema),
+    "invoices": (Client.invoices, InvoiceSchema),
+}
+
 @router.post("/", response_model=ClientSchema, status_code=status.HTTP_201_CREATED)
-def create_client(client: ClientCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_client(client: ClientCreate, db: Session = Depends(get_session)):
     db_client = Client(**client.dict())
     db.add(db_client)
     db.commit()
@@ -20,29 +41,64 @@ def create_client(client: ClientCreate, db: Session = Depends(get_db)):
     return db_client
 
 @router.get("/", response_model=List[ClientSchema])
+@async_endpoint
 def read_clients(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(Client)
     if search:
-        query = query.filter(Client.name.ilike(f"%{search}%"))
-    return query.offset(skip).limit(limit).all()
+        query = query.filter(search_filter(db, Client, search))
+    return paginate(query, Client, CLIENT_SORTS, sort, cursor, skip, limit, response, request, ClientSchema, fields, include, CLIENT_INCLUDES)
+
+@router.post("/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_clients(clients: List[ClientCreate], db: Session = Depends(get_session)):
+    result = bulk_create(db, Client, [client.dict() for client in clients])
+    db.commit()
+    return result
+
+@router.put("/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_clients(clients: List[ClientBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Client, [client.dict(exclude_unset=True) for client in clients])
+    db.commit()
+    return result
+
+@router.post("/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_clients(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Client, request.ids)
+    db.commit()
+    return result
 
 @router.get("/{client_id}", response_model=ClientSchema)
-def read_client(client_id: int, db: Session = Depends(get_db)):
-    db_client = db.query(Client).filter(Client.id == client_id).first()
+@async_endpoint
+def read_client(client_id: int, request: Request, response: Response, fields: Optional[str] = None, include: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, ClientSchema)
+    includes = parse_includes(include, CLIENT_INCLUDES)
+    query = load_includes(load_fields(db.query(Client), Client, names), includes)
+    db_client = query.filter(Client.id == client_id).first()
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client non trouvé")
-    return db_client
+    etag = includes_etag([db_client], includes) if includes else resource_etag(db_client)
+    return not_modified(request, response, etag) or with_fields(db_client, ClientSchema, names, response, includes)
 
 @router.put("/{client_id}", response_model=ClientSchema)
-def update_client(client_id: int, client: ClientUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_client(client_id: int, client: ClientUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_client = db.query(Client).filter(Client.id == client_id).first()
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client non trouvé")
+    require_match(request, db_client)
     
     update_data = client.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -50,13 +106,16 @@ def update_client(client_id: int, client: ClientUpdate, db: Session = Depends(ge
     
     db.commit()
     db.refresh(db_client)
+    response.headers["ETag"] = resource_etag(db_client)
     return db_client
 
 @router.delete("/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_client(client_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_client(client_id: int, request: Request, db: Session = Depends(get_session)):
     db_client = db.query(Client).filter(Client.id == client_id).first()
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client non trouvé")
+    require_match(request, db_client)
     
     db.delete(db_client)
     db.commit()
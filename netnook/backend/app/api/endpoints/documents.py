@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, engine, get_session, run_in_session
+from app.api.uploads import UPLOAD_DIRECTORY, UPLOAD_OPENAPI, receive_upload
+from app.api.downloads import file_response, guess_media_type
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.includes import includes_etag, load_includes, parse_includes
+from app.api.bulk import bulk_update, bulk_delete
+from app.db.search import search_document_texts, search_filter
+from app.api.text_extraction import pipeline as text_extraction
+from app.api.previews import PREVIEW_MEDIA_TYPE, PreviewSize, pipeline as previews
+from app.db.document_store import discard_blob, document_file, settle_blob, store_blob
 from app.models.models import Document
-from app.schemas.schemas import Document as DocumentSchema, DocumentCreate, DocumentUpdate
+from app.schemas.schemas import Document as DocumentSchema, DocumentCreate, DocumentUpdate, DocumentBulkUpdate
+from app.schemas.schemas import Project as ProjectSchema
+from app.schemas.schemas import BulkDelete, BulkResult
 import os
-import shutil
-from datetime import datetime
 
 router = APIRouter(
     prefix="/documents",
@@ -14,68 +26,187 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-UPLOAD_DIRECTORY = "/app/uploads"
+# Colonnes de tri acceptées par la pagination (en plus de id)
+DOCUMENT_SORTS = {
+    "name": Document.name,
+    "created_at": Document.created_at,
+}
+
+# Relations exposées par include= (voir app.api.includes)
+DOCUMENT_INCLUDES = {
+    "project": (Document.project, ProjectSchema),
+}
+
 os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
 
-@router.post("/", response_model=DocumentSchema, status_code=status.HTTP_201_CREATED)
-async def create_document(
-    file: UploadFile = File(...),
-    project_id: Optional[int] = None,
-    db: Session = Depends(get_db)
-):
-    # Créer un nom de fichier unique
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIRECTORY, unique_filename)
-    
-    # Sauvegarder le fichier
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Créer l'entrée dans la base de données
-    db_document = Document(
-        name=file.filename,
-        file_path=file_path,
-        file_type=file.content_type,
-        size=os.path.getsize(file_path),
-        project_id=project_id
-    )
-    
+def _create_document_record(db: Session, values: dict):
+    db_document = Document(**values)
     db.add(db_document)
     db.commit()
     db.refresh(db_document)
     return db_document
 
+def _get_document(db: Session, document_id: int):
+    return db.query(Document).filter(Document.id == document_id).first()
+
+def _optional_int(value: Optional[str]):
+    try:
+        return int(value) if value not in (None, "") else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Entier attendu : {value!r}")
+
+# /upload : chemin utilisé par le frontend
+@router.post("/", response_model=DocumentSchema, status_code=status.HTTP_201_CREATED, openapi_extra=UPLOAD_OPENAPI)
+@router.post("/upload", response_model=DocumentSchema, status_code=status.HTTP_201_CREATED, include_in_schema=False)
+async def create_document(
+    request: Request,
+    project_id: Optional[int] = None,
+    db: Session = Depends(get_session)
+):
+    # Réception en flux : fichier temporaire, taille et SHA-256 calculés au fil de l'eau
+    fields, upload = await receive_upload(request)
+    try:
+        project_id = project_id or _optional_int(fields.get("project_id"))
+        # Stockage par contenu : un fichier déjà présent n'est pas réécrit
+        file_path = await run_in_threadpool(store_blob, upload)
+    except BaseException:
+        await run_in_threadpool(upload.discard)
+        raise
+
+    values = {
+        "name": fields.get("name") or upload.filename,
+        "file_path": file_path,
+        "file_type": upload.content_type,
+        "size": upload.size,
+        "sha256": upload.sha256,
+        "project_id": project_id,
+    }
+    try:
+        # Le compteur de références du contenu est incrémenté au flush
+        db_document = await run_in_session(db, _create_document_record, values)
+    except BaseException:
+        await run_in_threadpool(discard_blob, engine, upload)
+        raise
+    # Référence validée : le fichier reçu est libéré, ou remis en place si le contenu a disparu
+    await run_in_threadpool(settle_blob, upload)
+    # Extraction du texte et aperçus en tâche de fond (rien à faire si le contenu est déjà traité)
+    text_extraction.schedule(upload.sha256)
+    previews.schedule(upload.sha256, file_path)
+    return db_document
+
 @router.get("/", response_model=List[DocumentSchema])
+@async_endpoint
 def read_documents(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     project_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(Document)
     
     if search:
-        query = query.filter(Document.name.ilike(f"%{search}%"))
+        query = query.filter(search_filter(db, Document, search))
     if project_id:
         query = query.filter(Document.project_id == project_id)
         
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, Document, DOCUMENT_SORTS, sort, cursor, skip, limit, response, request, DocumentSchema, fields, include, DOCUMENT_INCLUDES)
+
+@router.get("/search")
+@async_endpoint
+def search_documents(
+    q: str = Query(..., min_length=1, max_length=200),
+    project_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_session)
+):
+    """Recherche dans le texte extrait des documents (PDF, DOCX, texte), avec extraits"""
+    term = q.strip()
+    if not term:
+        return {"query": q, "results": []}
+    return {"query": q, "results": search_document_texts(db, term, project_id, limit)}
+
+# La création reste unitaire : chaque document provient d'un upload de fichier
+@router.put("/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_documents(documents: List[DocumentBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Document, [document.dict(exclude_unset=True) for document in documents])
+    db.commit()
+    return result
+
+@router.post("/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_documents(request: BulkDelete, db: Session = Depends(get_session)):
+    # Les contenus qui n'ont plus de référence sont supprimés après le commit
+    result = bulk_delete(db, Document, request.ids)
+    db.commit()
+    return result
 
 @router.get("/{document_id}", response_model=DocumentSchema)
-def read_document(document_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def read_document(document_id: int, request: Request, response: Response, fields: Optional[str] = None, include: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, DocumentSchema)
+    includes = parse_includes(include, DOCUMENT_INCLUDES)
+    query = load_includes(load_fields(db.query(Document), Document, names), includes)
+    db_document = query.filter(Document.id == document_id).first()
+    if db_document is None:
+        raise HTTPException(status_code=404, detail="Document non trouvé")
+    etag = includes_etag([db_document], includes) if includes else resource_etag(db_document)
+    return not_modified(request, response, etag) or with_fields(db_document, DocumentSchema, names, response, includes)
+
+# GET et HEAD : les clients de reprise interrogent la taille avant de demander une plage
+@router.get("/{document_id}/content", response_class=Response)
+@router.head("/{document_id}/content", response_class=Response, include_in_schema=False)
+@async_endpoint
+def download_document(document_id: int, request: Request, inline: bool = False, db: Session = Depends(get_session)):
     db_document = db.query(Document).filter(Document.id == document_id).first()
     if db_document is None:
         raise HTTPException(status_code=404, detail="Document non trouvé")
-    return db_document
+    path = document_file(db_document)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Contenu du document introuvable")
+    # Contenu adressé par son SHA-256 : l'empreinte fait un ETag fort
+    etag = f'"{db_document.sha256}"' if db_document.sha256 else None
+    return file_response(
+        request,
+        path,
+        filename=db_document.name,
+        media_type=guess_media_type(db_document.file_type, db_document.name),
+        etag=etag,
+        inline=inline,
+    )
+
+@router.get("/{document_id}/preview", response_class=Response)
+async def preview_document(
+    document_id: int,
+    request: Request,
+    size: PreviewSize = "medium",
+    db: Session = Depends(get_session)
+):
+    db_document = await run_in_session(db, _get_document, document_id)
+    if db_document is None:
+        raise HTTPException(status_code=404, detail="Document non trouvé")
+    # Aperçu manquant : la requête attend la génération en cours pour ce contenu
+    path = await previews.get(db_document.sha256, document_file(db_document), size) if db_document.sha256 else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Aperçu indisponible pour ce document")
+    return file_response(
+        request, path, media_type=PREVIEW_MEDIA_TYPE, etag=f'"{db_document.sha256}-{size}"', inline=True
+    )
 
 @router.put("/{document_id}", response_model=DocumentSchema)
-def update_document(document_id: int, document: DocumentUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_document(document_id: int, document: DocumentUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_document = db.query(Document).filter(Document.id == document_id).first()
     if db_document is None:
         raise HTTPException(status_code=404, detail="Document non trouvé")
+    require_match(request, db_document)
     
     update_data = document.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -83,23 +214,19 @@ def update_document(document_id: int, document: DocumentUpdate, db: Session = De
     
     db.commit()
     db.refresh(db_document)
+    response.headers["ETag"] = resource_etag(db_document)
     return db_document
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_document(document_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_document(document_id: int, request: Request, db: Session = Depends(get_session)):
     db_document = db.query(Document).filter(Document.id == document_id).first()
     if db_document is None:
         raise HTTPException(status_code=404, detail="Document non trouvé")
+    require_match(request, db_document)
     
-    # Supprimer le fichier physique
-    try:
-        if os.path.exists(db_document.file_path):
-            os.remove(db_document.file_path)
-    except Exception as e:
-        # Log l'erreur mais continuer la suppression de l'entrée en base
-        print(f"Erreur lors de la suppression du fichier: {e}")
-    
-    # Supprimer l'entrée en base
+    # Le fichier n'est supprimé qu'avec la dernière référence à son contenu
+    # (après le commit, voir app.db.document_store)
     db.delete(db_document)
     db.commit()
     return None
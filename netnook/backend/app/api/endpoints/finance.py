@@ -1,10 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.db.database import get_db
+from typing import List, Literal, Optional
+from datetime import datetime
+import codecs
+import os
+import shutil
+import tempfile
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.includes import includes_etag, load_includes, parse_includes
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.api.export import ExportFormat, stream_export
+from app.api.bank_import import stream_import
+from app.db.search import search_filter
+from app.db.finance_rollup import apply_deltas, deltas_for_rows
 from app.models.models import Invoice, Transaction
-from app.schemas.schemas import Invoice as InvoiceSchema, InvoiceCreate, InvoiceUpdate
-from app.schemas.schemas import Transaction as TransactionSchema, TransactionCreate, TransactionUpdate
+from app.schemas.schemas import Invoice as InvoiceSchema, InvoiceCreate, InvoiceUpdate, InvoiceBulkUpdate
+from app.schemas.schemas import Transaction as TransactionSchema, TransactionCreate, TransactionUpdate, TransactionBulkUpdate
+from app.schemas.schemas import Client as ClientSchema
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/finance",
@@ -12,9 +29,68 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+INVOICE_SORTS = {
+    "invoice_number": Invoice.invoice_number,
+    "issue_date": Invoice.issue_date,
+    "created_at": Invoice.created_at,
+}
+
+# Relations exposées par include= (voir app.api.includes)
+INVOICE_INCLUDES = {
+    "client": (Invoice.client, ClientSchema),
+    "transactions": (Invoice.transactions, TransactionSchema),
+}
+
+TRANSACTION_SORTS = {
+    "date": Transaction.date,
+    "created_at": Transaction.created_at,
+}
+
+# Relations exposées par include= (voir app.api.includes)
+TRANSACTION_INCLUDES = {
+    "invoice": (Transaction.invoice, InvoiceSchema),
+}
+
+# Colonnes des exports CSV / NDJSON (mêmes champs que les schémas de lecture)
+INVOICE_EXPORT_COLUMNS = [
+    Invoice.id, Invoice.invoice_number, Invoice.client_id, Invoice.amount, Invoice.status,
+    Invoice.issue_date, Invoice.due_date, Invoice.paid_date, Invoice.notes,
+    Invoice.created_at, Invoice.updated_at,
+]
+TRANSACTION_EXPORT_COLUMNS = [
+    Transaction.id, Transaction.invoice_id, Transaction.amount, Transaction.type,
+    Transaction.category, Transaction.description, Transaction.date,
+    Transaction.created_at, Transaction.updated_at,
+]
+
+# Filtres communs à la liste et à l'export
+def _invoice_filters(db, search, client_id, status):
+    filters = []
+    if search:
+        filters.append(search_filter(db, Invoice, search))
+    if client_id:
+        filters.append(Invoice.client_id == client_id)
+    if status:
+        filters.append(Invoice.status == status)
+    return filters
+
+def _transaction_filters(db, search, invoice_id, type, category):
+    filters = []
+    if search:
+        filters.append(search_filter(db, Transaction, search))
+    if invoice_id:
+        filters.append(Transaction.invoice_id == invoice_id)
+    if type:
+        filters.append(Transaction.type == type)
+    if category:
+        filters.append(Transaction.category == category)
+    return filters
+
 # Endpoints pour les factures (invoices)
 @router.post("/invoices", response_model=InvoiceSchema, status_code=status.HTTP_201_CREATED)
-def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_session)):
     db_invoice = Invoice(**invoice.dict())
     db.add(db_invoice)
     db.commit()
@@ -22,37 +98,80 @@ def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db)):
     return db_invoice
 
 @router.get("/invoices", response_model=List[InvoiceSchema])
+@async_endpoint
 def read_invoices(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     client_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
-    query = db.query(Invoice)
-    
-    if search:
-        query = query.filter(Invoice.invoice_number.ilike(f"%{search}%"))
-    if client_id:
-        query = query.filter(Invoice.client_id == client_id)
-    if status:
-        query = query.filter(Invoice.status == status)
-        
-    return query.offset(skip).limit(limit).all()
+    query = db.query(Invoice).filter(*_invoice_filters(db, search, client_id, status))
+    return paginate(query, Invoice, INVOICE_SORTS, sort, cursor, skip, limit, response, request, InvoiceSchema, fields, include, INVOICE_INCLUDES)
+
+@router.get("/invoices/export")
+@async_endpoint
+def export_invoices(
+    format: ExportFormat = "csv",
+    search: Optional[str] = None,
+    client_id: Optional[int] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_session)
+):
+    statement = (
+        select(*INVOICE_EXPORT_COLUMNS)
+        .where(*_invoice_filters(db, search, client_id, status))
+        .order_by(Invoice.id)
+    )
+    return stream_export(statement, format, "factures")
+
+@router.post("/invoices/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_invoices(invoices: List[InvoiceCreate], db: Session = Depends(get_session)):
+    result = bulk_create(db, Invoice, [invoice.dict() for invoice in invoices])
+    db.commit()
+    return result
+
+@router.put("/invoices/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_invoices(invoices: List[InvoiceBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Invoice, [invoice.dict(exclude_unset=True) for invoice in invoices])
+    db.commit()
+    return result
+
+@router.post("/invoices/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_invoices(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Invoice, request.ids)
+    db.commit()
+    return result
 
 @router.get("/invoices/{invoice_id}", response_model=InvoiceSchema)
-def read_invoice(invoice_id: int, db: Session = Depends(get_db)):
-    db_invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+@async_endpoint
+def read_invoice(invoice_id: int, request: Request, response: Response, fields: Optional[str] = None, include: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, InvoiceSchema)
+    includes = parse_includes(include, INVOICE_INCLUDES)
+    query = load_includes(load_fields(db.query(Invoice), Invoice, names), includes)
+    db_invoice = query.filter(Invoice.id == invoice_id).first()
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Facture non trouvée")
-    return db_invoice
+    etag = includes_etag([db_invoice], includes) if includes else resource_etag(db_invoice)
+    return not_modified(request, response, etag) or with_fields(db_invoice, InvoiceSchema, names, response, includes)
 
 @router.put("/invoices/{invoice_id}", response_model=InvoiceSchema)
-def update_invoice(invoice_id: int, invoice: InvoiceUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_invoice(invoice_id: int, invoice: InvoiceUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Facture non trouvée")
+    require_match(request, db_invoice)
     
     update_data = invoice.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -60,13 +179,16 @@ def update_invoice(invoice_id: int, invoice: InvoiceUpdate, db: Session = Depend
     
     db.commit()
     db.refresh(db_invoice)
+    response.headers["ETag"] = resource_etag(db_invoice)
     return db_invoice
 
 @router.delete("/invoices/{invoice_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_invoice(invoice_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_invoice(invoice_id: int, request: Request, db: Session = Depends(get_session)):
     db_invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Facture non trouvée")
+    require_match(request, db_invoice)
     
     db.delete(db_invoice)
     db.commit()
@@ -74,7 +196,8 @@ def delete_invoice(invoice_id: int, db: Session = Depends(get_db)):
 
 # Endpoints pour les transactions
 @router.post("/transactions", response_model=TransactionSchema, status_code=status.HTTP_201_CREATED)
-def create_transaction(transaction: TransactionCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_transaction(transaction: TransactionCreate, db: Session = Depends(get_session)):
     db_transaction = Transaction(**transaction.dict())
     db.add(db_transaction)
     db.commit()
@@ -82,40 +205,110 @@ def create_transaction(transaction: TransactionCreate, db: Session = Depends(get
     return db_transaction
 
 @router.get("/transactions", response_model=List[TransactionSchema])
+@async_endpoint
 def read_transactions(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     invoice_id: Optional[int] = None,
     type: Optional[str] = None,
     category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
-    query = db.query(Transaction)
-    
-    if search:
-        query = query.filter(Transaction.description.ilike(f"%{search}%"))
-    if invoice_id:
-        query = query.filter(Transaction.invoice_id == invoice_id)
-    if type:
-        query = query.filter(Transaction.type == type)
-    if category:
-        query = query.filter(Transaction.category == category)
-        
-    return query.offset(skip).limit(limit).all()
+    query = db.query(Transaction).filter(*_transaction_filters(db, search, invoice_id, type, category))
+    return paginate(query, Transaction, TRANSACTION_SORTS, sort, cursor, skip, limit, response, request, TransactionSchema, fields, include, TRANSACTION_INCLUDES)
+
+@router.get("/transactions/export")
+@async_endpoint
+def export_transactions(
+    format: ExportFormat = "csv",
+    search: Optional[str] = None,
+    invoice_id: Optional[int] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_session)
+):
+    statement = (
+        select(*TRANSACTION_EXPORT_COLUMNS)
+        .where(*_transaction_filters(db, search, invoice_id, type, category))
+        .order_by(Transaction.id)
+    )
+    return stream_export(statement, format, "transactions")
+
+@router.post("/transactions/import")
+def import_transactions(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ofx"]] = None,
+    encoding: Optional[str] = None,
+    category: Optional[str] = None,
+):
+    """Importe un relevé bancaire CSV ou OFX ; la progression est renvoyée en NDJSON."""
+    if format is None:
+        extension = os.path.splitext(file.filename or "")[1].lower()
+        format = "ofx" if extension in (".ofx", ".qfx") else "csv"
+    if encoding:
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            raise HTTPException(status_code=400, detail=f"Encodage inconnu : {encoding}")
+
+    # Le fichier reçu est fermé avant l'envoi de la réponse : on le recopie dans un fichier à nous
+    source = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, source)
+    source.seek(0)
+    return stream_import(source, format, encoding, category)
+
+@router.post("/transactions/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_transactions(transactions: List[TransactionCreate], db: Session = Depends(get_session)):
+    rows = [transaction.dict() for transaction in transactions]
+    for row in rows:
+        row["date"] = row["date"] or datetime.utcnow()
+    result = bulk_create(db, Transaction, rows)
+    # L'insertion en masse ne passe pas par le flush ORM : agrégat mis à jour explicitement
+    apply_deltas(db.connection(), deltas_for_rows(rows))
+    db.commit()
+    return result
+
+@router.put("/transactions/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_transactions(transactions: List[TransactionBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Transaction, [transaction.dict(exclude_unset=True) for transaction in transactions])
+    db.commit()
+    return result
+
+@router.post("/transactions/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_transactions(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Transaction, request.ids)
+    db.commit()
+    return result
 
 @router.get("/transactions/{transaction_id}", response_model=TransactionSchema)
-def read_transaction(transaction_id: int, db: Session = Depends(get_db)):
-    db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+@async_endpoint
+def read_transaction(transaction_id: int, request: Request, response: Response, fields: Optional[str] = None, include: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, TransactionSchema)
+    includes = parse_includes(include, TRANSACTION_INCLUDES)
+    query = load_includes(load_fields(db.query(Transaction), Transaction, names), includes)
+    db_transaction = query.filter(Transaction.id == transaction_id).first()
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction non trouvée")
-    return db_transaction
+    etag = includes_etag([db_transaction], includes) if includes else resource_etag(db_transaction)
+    return not_modified(request, response, etag) or with_fields(db_transaction, TransactionSchema, names, response, includes)
 
 @router.put("/transactions/{transaction_id}", response_model=TransactionSchema)
-def update_transaction(transaction_id: int, transaction: TransactionUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_transaction(transaction_id: int, transaction: TransactionUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction non trouvée")
+    require_match(request, db_transaction)
     
     update_data = transaction.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -123,13 +316,16 @@ def update_transaction(transaction_id: int, transaction: TransactionUpdate, db:
     
     db.commit()
     db.refresh(db_transaction)
+    response.headers["ETag"] = resource_etag(db_transaction)
     return db_transaction
 
 @router.delete("/transactions/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_transaction(transaction_id: int, request: Request, db: Session = Depends(get_session)):
     db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction non trouvée")
+    require_match(request, db_transaction)
     
     db.delete(db_transaction)
     db.commit()
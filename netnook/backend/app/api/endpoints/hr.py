@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.db.search import search_filter
 from app.models.models import Resource
-from app.schemas.schemas import Resource as ResourceSchema, ResourceCreate, ResourceUpdate
+from app.schemas.schemas import Resource as ResourceSchema, ResourceCreate, ResourceUpdate, ResourceBulkUpdate
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/hr",
@@ -11,11 +17,18 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+EMPLOYEE_SORTS = {
+    "name": Resource.name,
+    "created_at": Resource.created_at,
+}
+
 # Nous utilisons le modèle Resource pour les ressources humaines également
 # avec le type "Humain" pour distinguer des autres types de ressources
 
 @router.post("/employees", response_model=ResourceSchema, status_code=status.HTTP_201_CREATED)
-def create_employee(employee: ResourceCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_employee(employee: ResourceCreate, db: Session = Depends(get_session)):
     # Forcer le type à "Humain" pour les employés
     employee_data = employee.dict()
     employee_data["type"] = "Humain"
@@ -27,35 +40,74 @@ def create_employee(employee: ResourceCreate, db: Session = Depends(get_db)):
     return db_employee
 
 @router.get("/employees", response_model=List[ResourceSchema])
+@async_endpoint
 def read_employees(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     availability: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(Resource).filter(Resource.type == "Humain")
     
     if search:
-        query = query.filter(Resource.name.ilike(f"%{search}%"))
+        query = query.filter(search_filter(db, Resource, search))
     if availability is not None:
         query = query.filter(Resource.availability == availability)
         
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, Resource, EMPLOYEE_SORTS, sort, cursor, skip, limit, response, request, ResourceSchema, fields)
+
+@router.post("/employees/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_employees(employees: List[ResourceCreate], db: Session = Depends(get_session)):
+    # Forcer le type à "Humain" pour les employés
+    rows = [dict(employee.dict(), type="Humain") for employee in employees]
+    result = bulk_create(db, Resource, rows)
+    db.commit()
+    return result
+
+@router.put("/employees/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_employees(employees: List[ResourceBulkUpdate], db: Session = Depends(get_session)):
+    # Empêcher la modification du type pour garder "Humain"
+    result = bulk_update(
+        db,
+        Resource,
+        [employee.dict(exclude_unset=True) for employee in employees],
+        query=db.query(Resource).filter(Resource.type == "Humain"),
+        protected_fields=("type",)
+    )
+    db.commit()
+    return result
+
+@router.post("/employees/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_employees(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Resource, request.ids, query=db.query(Resource).filter(Resource.type == "Humain"))
+    db.commit()
+    return result
 
 @router.get("/employees/{employee_id}", response_model=ResourceSchema)
-def read_employee(employee_id: int, db: Session = Depends(get_db)):
-    db_employee = db.query(Resource).filter(
+@async_endpoint
+def read_employee(employee_id: int, request: Request, response: Response, fields: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, ResourceSchema)
+    db_employee = load_fields(db.query(Resource), Resource, names).filter(
         Resource.id == employee_id,
         Resource.type == "Humain"
     ).first()
     
     if db_employee is None:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
-    return db_employee
+    return not_modified(request, response, resource_etag(db_employee)) or with_fields(db_employee, ResourceSchema, names, response)
 
 @router.put("/employees/{employee_id}", response_model=ResourceSchema)
-def update_employee(employee_id: int, employee: ResourceUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_employee(employee_id: int, employee: ResourceUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_employee = db.query(Resource).filter(
         Resource.id == employee_id,
         Resource.type == "Humain"
@@ -63,6 +115,7 @@ def update_employee(employee_id: int, employee: ResourceUpdate, db: Session = De
     
     if db_employee is None:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
+    require_match(request, db_employee)
     
     # Empêcher la modification du type pour garder "Humain"
     update_data = employee.dict(exclude_unset=True)
@@ -74,10 +127,12 @@ def update_employee(employee_id: int, employee: ResourceUpdate, db: Session = De
     
     db.commit()
     db.refresh(db_employee)
+    response.headers["ETag"] = resource_etag(db_employee)
     return db_employee
 
 @router.delete("/employees/{employee_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_employee(employee_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_employee(employee_id: int, request: Request, db: Session = Depends(get_session)):
     db_employee = db.query(Resource).filter(
         Resource.id == employee_id,
         Resource.type == "Humain"
@@ -85,6 +140,7 @@ def delete_employee(employee_id: int, db: Session = Depends(get_db)):
     
     if db_employee is None:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
+    require_match(request, db_employee)
     
     db.delete(db_employee)
     db.commit()
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.db.search import search_filter
 from app.models.models import InventoryItem
-from app.schemas.schemas import InventoryItem as InventoryItemSchema, InventoryItemCreate, InventoryItemUpdate
+from app.schemas.schemas import InventoryItem as InventoryItemSchema, InventoryItemCreate, InventoryItemUpdate, InventoryItemBulkUpdate
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/inventory",
@@ -11,8 +17,15 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+INVENTORY_SORTS = {
+    "name": InventoryItem.name,
+    "created_at": InventoryItem.created_at,
+}
+
 @router.post("/", response_model=InventoryItemSchema, status_code=status.HTTP_201_CREATED)
-def create_inventory_item(item: InventoryItemCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_inventory_item(item: InventoryItemCreate, db: Session = Depends(get_session)):
     db_item = InventoryItem(**item.dict())
     db.add(db_item)
     db.commit()
@@ -20,37 +33,68 @@ def create_inventory_item(item: InventoryItemCreate, db: Session = Depends(get_d
     return db_item
 
 @router.get("/", response_model=List[InventoryItemSchema])
+@async_endpoint
 def read_inventory_items(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     category: Optional[str] = None,
     min_quantity: Optional[int] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(InventoryItem)
     
     if search:
-        query = query.filter(InventoryItem.name.ilike(f"%{search}%"))
+        query = query.filter(search_filter(db, InventoryItem, search))
     if category:
         query = query.filter(InventoryItem.category == category)
     if min_quantity is not None:
         query = query.filter(InventoryItem.quantity >= min_quantity)
         
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, InventoryItem, INVENTORY_SORTS, sort, cursor, skip, limit, response, request, InventoryItemSchema, fields)
+
+@router.post("/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_inventory_items(inventory_items: List[InventoryItemCreate], db: Session = Depends(get_session)):
+    result = bulk_create(db, InventoryItem, [item.dict() for item in inventory_items])
+    db.commit()
+    return result
+
+@router.put("/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_inventory_items(inventory_items: List[InventoryItemBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, InventoryItem, [item.dict(exclude_unset=True) for item in inventory_items])
+    db.commit()
+    return result
+
+@router.post("/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_inventory_items(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, InventoryItem, request.ids)
+    db.commit()
+    return result
 
 @router.get("/{item_id}", response_model=InventoryItemSchema)
-def read_inventory_item(item_id: int, db: Session = Depends(get_db)):
-    db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
+@async_endpoint
+def read_inventory_item(item_id: int, request: Request, response: Response, fields: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, InventoryItemSchema)
+    db_item = load_fields(db.query(InventoryItem), InventoryItem, names).filter(InventoryItem.id == item_id).first()
     if db_item is None:
         raise HTTPException(status_code=404, detail="Article d'inventaire non trouvé")
-    return db_item
+    return not_modified(request, response, resource_etag(db_item)) or with_fields(db_item, InventoryItemSchema, names, response)
 
 @router.put("/{item_id}", response_model=InventoryItemSchema)
-def update_inventory_item(item_id: int, item: InventoryItemUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_inventory_item(item_id: int, item: InventoryItemUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
     if db_item is None:
         raise HTTPException(status_code=404, detail="Article d'inventaire non trouvé")
+    require_match(request, db_item)
     
     update_data = item.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -58,13 +102,16 @@ def update_inventory_item(item_id: int, item: InventoryItemUpdate, db: Session =
     
     db.commit()
     db.refresh(db_item)
+    response.headers["ETag"] = resource_etag(db_item)
     return db_item
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_inventory_item(item_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_inventory_item(item_id: int, request: Request, db: Session = Depends(get_session)):
     db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
     if db_item is None:
         raise HTTPException(status_code=404, detail="Article d'inventaire non trouvé")
+    require_match(request, db_item)
     
     db.delete(db_item)
     db.commit()
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.db.search import search_filter
 from app.models.models import Event
-from app.schemas.schemas import Event as EventSchema, EventCreate, EventUpdate
+from app.schemas.schemas import Event as EventSchema, EventCreate, EventUpdate, EventBulkUpdate
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/planning",
@@ -11,8 +17,16 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+EVENT_SORTS = {
+    "start_date": Event.start_date,
+    "title": Event.title,
+    "created_at": Event.created_at,
+}
+
 @router.post("/events", response_model=EventSchema, status_code=status.HTTP_201_CREATED)
-def create_event(event: EventCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_event(event: EventCreate, db: Session = Depends(get_session)):
     db_event = Event(**event.dict())
     db.add(db_event)
     db.commit()
@@ -20,37 +34,68 @@ def create_event(event: EventCreate, db: Session = Depends(get_db)):
     return db_event
 
 @router.get("/events", response_model=List[EventSchema])
+@async_endpoint
 def read_events(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(Event)
     
     if search:
-        query = query.filter(Event.title.ilike(f"%{search}%"))
+        query = query.filter(search_filter(db, Event, search))
     if start_date:
         query = query.filter(Event.start_date >= start_date)
     if end_date:
         query = query.filter(Event.end_date <= end_date)
         
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, Event, EVENT_SORTS, sort, cursor, skip, limit, response, request, EventSchema, fields)
+
+@router.post("/events/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_events(events: List[EventCreate], db: Session = Depends(get_session)):
+    result = bulk_create(db, Event, [event.dict() for event in events])
+    db.commit()
+    return result
+
+@router.put("/events/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_events(events: List[EventBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Event, [event.dict(exclude_unset=True) for event in events])
+    db.commit()
+    return result
+
+@router.post("/events/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_events(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Event, request.ids)
+    db.commit()
+    return result
 
 @router.get("/events/{event_id}", response_model=EventSchema)
-def read_event(event_id: int, db: Session = Depends(get_db)):
-    db_event = db.query(Event).filter(Event.id == event_id).first()
+@async_endpoint
+def read_event(event_id: int, request: Request, response: Response, fields: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, EventSchema)
+    db_event = load_fields(db.query(Event), Event, names).filter(Event.id == event_id).first()
     if db_event is None:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
-    return db_event
+    return not_modified(request, response, resource_etag(db_event)) or with_fields(db_event, EventSchema, names, response)
 
 @router.put("/events/{event_id}", response_model=EventSchema)
-def update_event(event_id: int, event: EventUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_event(event_id: int, event: EventUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_event = db.query(Event).filter(Event.id == event_id).first()
     if db_event is None:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
+    require_match(request, db_event)
     
     update_data = event.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -58,13 +103,16 @@ def update_event(event_id: int, event: EventUpdate, db: Session = Depends(get_db
     
     db.commit()
     db.refresh(db_event)
+    response.headers["ETag"] = resource_etag(db_event)
     return db_event
 
 @router.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_event(event_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_event(event_id: int, request: Request, db: Session = Depends(get_session)):
     db_event = db.query(Event).filter(Event.id == event_id).first()
     if db_event is None:
         raise HTTPException(status_code=404, detail="Événement non trouvé")
+    require_match(request, db_event)
     
     db.delete(db_event)
     db.commit()
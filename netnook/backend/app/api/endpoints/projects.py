@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.includes import includes_etag, load_includes, parse_includes
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.db.search import search_filter
 from app.models.models import Project
-from app.schemas.schemas import Project as ProjectSchema, ProjectCreate, ProjectUpdate
+from app.schemas.schemas import Project as ProjectSchema, ProjectCreate, ProjectUpdate, ProjectBulkUpdate
+from app.schemas.schemas import Client as ClientSchema, Document as DocumentSchema, Task as TaskSchema
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/projects",
@@ -11,8 +19,22 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+PROJECT_SORTS = {
+    "name": Project.name,
+    "created_at": Project.created_at,
+}
+
+# Relations exposées par include= (voir app.api.includes)
+PROJECT_INCLUDES = {
+    "client": (Project.client, ClientSchema),
+    "tasks": (Project.tasks, TaskSchema),
+    "documents": (Project.documents, DocumentSchema),
+}
+
 @router.post("/", response_model=ProjectSchema, status_code=status.HTTP_201_CREATED)
-def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_project(project: ProjectCreate, db: Session = Depends(get_session)):
     db_project = Project(**project.dict())
     db.add(db_project)
     db.commit()
@@ -20,29 +42,64 @@ def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     return db_project
 
 @router.get("/", response_model=List[ProjectSchema])
+@async_endpoint
 def read_projects(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(Project)
     if search:
-        query = query.filter(Project.name.ilike(f"%{search}%"))
-    return query.offset(skip).limit(limit).all()
+        query = query.filter(search_filter(db, Project, search))
+    return paginate(query, Project, PROJECT_SORTS, sort, cursor, skip, limit, response, request, ProjectSchema, fields, include, PROJECT_INCLUDES)
+
+@router.post("/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_projects(projects: List[ProjectCreate], db: Session = Depends(get_session)):
+    result = bulk_create(db, Project, [project.dict() for project in projects])
+    db.commit()
+    return result
+
+@router.put("/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_projects(projects: List[ProjectBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Project, [project.dict(exclude_unset=True) for project in projects])
+    db.commit()
+    return result
+
+@router.post("/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_projects(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Project, request.ids)
+    db.commit()
+    return result
 
 @router.get("/{project_id}", response_model=ProjectSchema)
-def read_project(project_id: int, db: Session = Depends(get_db)):
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+@async_endpoint
+def read_project(project_id: int, request: Request, response: Response, fields: Optional[str] = None, include: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, ProjectSchema)
+    includes = parse_includes(include, PROJECT_INCLUDES)
+    query = load_includes(load_fields(db.query(Project), Project, names), includes)
+    db_project = query.filter(Project.id == project_id).first()
     if db_project is None:
         raise HTTPException(status_code=404, detail="Projet non trouvé")
-    return db_project
+    etag = includes_etag([db_project], includes) if includes else resource_etag(db_project)
+    return not_modified(request, response, etag) or with_fields(db_project, ProjectSchema, names, response, includes)
 
 @router.put("/{project_id}", response_model=ProjectSchema)
-def update_project(project_id: int, project: ProjectUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_project(project_id: int, project: ProjectUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_project = db.query(Project).filter(Project.id == project_id).first()
     if db_project is None:
         raise HTTPException(status_code=404, detail="Projet non trouvé")
+    require_match(request, db_project)
     
     update_data = project.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -50,13 +107,16 @@ def update_project(project_id: int, project: ProjectUpdate, db: Session = Depend
     
     db.commit()
     db.refresh(db_project)
+    response.headers["ETag"] = resource_etag(db_project)
     return db_project
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(project_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_project(project_id: int, request: Request, db: Session = Depends(get_session)):
     db_project = db.query(Project).filter(Project.id == project_id).first()
     if db_project is None:
         raise HTTPException(status_code=404, detail="Projet non trouvé")
+    require_match(request, db_project)
     
     db.delete(db_project)
     db.commit()
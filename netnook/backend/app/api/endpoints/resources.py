@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.db.search import search_filter
 from app.models.models import Resource
-from app.schemas.schemas import Resource as ResourceSchema, ResourceCreate, ResourceUpdate
+from app.schemas.schemas import Resource as ResourceSchema, ResourceCreate, ResourceUpdate, ResourceBulkUpdate
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/resources",
@@ -11,8 +17,15 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+RESOURCE_SORTS = {
+    "name": Resource.name,
+    "created_at": Resource.created_at,
+}
+
 @router.post("/", response_model=ResourceSchema, status_code=status.HTTP_201_CREATED)
-def create_resource(resource: ResourceCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_resource(resource: ResourceCreate, db: Session = Depends(get_session)):
     db_resource = Resource(**resource.dict())
     db.add(db_resource)
     db.commit()
@@ -20,37 +33,68 @@ def create_resource(resource: ResourceCreate, db: Session = Depends(get_db)):
     return db_resource
 
 @router.get("/", response_model=List[ResourceSchema])
+@async_endpoint
 def read_resources(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     type: Optional[str] = None,
     availability: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(Resource)
     
     if search:
-        query = query.filter(Resource.name.ilike(f"%{search}%"))
+        query = query.filter(search_filter(db, Resource, search))
     if type:
         query = query.filter(Resource.type == type)
     if availability is not None:
         query = query.filter(Resource.availability == availability)
         
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, Resource, RESOURCE_SORTS, sort, cursor, skip, limit, response, request, ResourceSchema, fields)
+
+@router.post("/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_resources(resources: List[ResourceCreate], db: Session = Depends(get_session)):
+    result = bulk_create(db, Resource, [resource.dict() for resource in resources])
+    db.commit()
+    return result
+
+@router.put("/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_resources(resources: List[ResourceBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Resource, [resource.dict(exclude_unset=True) for resource in resources])
+    db.commit()
+    return result
+
+@router.post("/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_resources(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Resource, request.ids)
+    db.commit()
+    return result
 
 @router.get("/{resource_id}", response_model=ResourceSchema)
-def read_resource(resource_id: int, db: Session = Depends(get_db)):
-    db_resource = db.query(Resource).filter(Resource.id == resource_id).first()
+@async_endpoint
+def read_resource(resource_id: int, request: Request, response: Response, fields: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, ResourceSchema)
+    db_resource = load_fields(db.query(Resource), Resource, names).filter(Resource.id == resource_id).first()
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Ressource non trouvée")
-    return db_resource
+    return not_modified(request, response, resource_etag(db_resource)) or with_fields(db_resource, ResourceSchema, names, response)
 
 @router.put("/{resource_id}", response_model=ResourceSchema)
-def update_resource(resource_id: int, resource: ResourceUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_resource(resource_id: int, resource: ResourceUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_resource = db.query(Resource).filter(Resource.id == resource_id).first()
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Ressource non trouvée")
+    require_match(request, db_resource)
     
     update_data = resource.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -58,13 +102,16 @@ def update_resource(resource_id: int, resource: ResourceUpdate, db: Session = De
     
     db.commit()
     db.refresh(db_resource)
+    response.headers["ETag"] = resource_etag(db_resource)
     return db_resource
 
 @router.delete("/{resource_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_resource(resource_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_resource(resource_id: int, request: Request, db: Session = Depends(get_session)):
     db_resource = db.query(Resource).filter(Resource.id == resource_id).first()
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Ressource non trouvée")
+    require_match(request, db_resource)
     
     db.delete(db_resource)
     db.commit()
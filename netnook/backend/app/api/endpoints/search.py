@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.db.database import async_endpoint, get_session
+from app.db.search import global_search, SEARCH_ENTITIES_BY_NAME
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/")
+@async_endpoint
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    entities: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_session)
+):
+    """Recherche classée dans les projets, clients, tâches, factures, transactions, documents, événements, ressources et inventaire"""
+    entity_names = None
+    if entities:
+        entity_names = [name.strip() for name in entities.split(",") if name.strip()]
+        unknown = [name for name in entity_names if name not in SEARCH_ENTITIES_BY_NAME]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Entités inconnues : {', '.join(unknown)}")
+    
+    term = q.strip()
+    if not term:
+        return {"query": q, "results": []}
+    
+    return {"query": q, "results": global_search(db, term, entity_names, limit)}
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
+from app.db.database import async_endpoint, get_session
+from app.api.pagination import MAX_PAGE_SIZE, paginate
+from app.api.conditional import not_modified, require_match, resource_etag
+from app.api.serialization import load_fields, parse_fields, with_fields
+from app.api.includes import includes_etag, load_includes, parse_includes
+from app.api.bulk import bulk_create, bulk_update, bulk_delete
+from app.db.search import search_filter
 from app.models.models import Task
-from app.schemas.schemas import Task as TaskSchema, TaskCreate, TaskUpdate
+from app.schemas.schemas import Task as TaskSchema, TaskCreate, TaskUpdate, TaskBulkUpdate
+from app.schemas.schemas import Project as ProjectSchema
+from app.schemas.schemas import BulkDelete, BulkResult
 
 router = APIRouter(
     prefix="/tasks",
@@ -11,8 +19,20 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Colonnes de tri acceptées par la pagination (en plus de id)
+TASK_SORTS = {
+    "title": Task.title,
+    "created_at": Task.created_at,
+}
+
+# Relations exposées par include= (voir app.api.includes)
+TASK_INCLUDES = {
+    "project": (Task.project, ProjectSchema),
+}
+
 @router.post("/", response_model=TaskSchema, status_code=status.HTTP_201_CREATED)
-def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_task(task: TaskCreate, db: Session = Depends(get_session)):
     db_task = Task(**task.dict())
     db.add(db_task)
     db.commit()
@@ -20,19 +40,26 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     return db_task
 
 @router.get("/", response_model=List[TaskSchema])
+@async_endpoint
 def read_tasks(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     project_id: Optional[int] = None,
     status: Optional[str] = None,
     priority: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_session)
 ):
     query = db.query(Task)
     
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
+        query = query.filter(search_filter(db, Task, search))
     if project_id:
         query = query.filter(Task.project_id == project_id)
     if status:
@@ -40,20 +67,48 @@ def read_tasks(
     if priority:
         query = query.filter(Task.priority == priority)
         
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, Task, TASK_SORTS, sort, cursor, skip, limit, response, request, TaskSchema, fields, include, TASK_INCLUDES)
+
+@router.post("/bulk", response_model=BulkResult, status_code=status.HTTP_201_CREATED)
+@async_endpoint
+def bulk_create_tasks(tasks: List[TaskCreate], db: Session = Depends(get_session)):
+    result = bulk_create(db, Task, [task.dict() for task in tasks])
+    db.commit()
+    return result
+
+@router.put("/bulk", response_model=BulkResult)
+@async_endpoint
+def bulk_update_tasks(tasks: List[TaskBulkUpdate], db: Session = Depends(get_session)):
+    result = bulk_update(db, Task, [task.dict(exclude_unset=True) for task in tasks])
+    db.commit()
+    return result
+
+@router.post("/bulk/delete", response_model=BulkResult)
+@async_endpoint
+def bulk_delete_tasks(request: BulkDelete, db: Session = Depends(get_session)):
+    result = bulk_delete(db, Task, request.ids)
+    db.commit()
+    return result
 
 @router.get("/{task_id}", response_model=TaskSchema)
-def read_task(task_id: int, db: Session = Depends(get_db)):
-    db_task = db.query(Task).filter(Task.id == task_id).first()
+@async_endpoint
+def read_task(task_id: int, request: Request, response: Response, fields: Optional[str] = None, include: Optional[str] = None, db: Session = Depends(get_session)):
+    names = parse_fields(fields, TaskSchema)
+    includes = parse_includes(include, TASK_INCLUDES)
+    query = load_includes(load_fields(db.query(Task), Task, names), includes)
+    db_task = query.filter(Task.id == task_id).first()
     if db_task is None:
         raise HTTPException(status_code=404, detail="Tâche non trouvée")
-    return db_task
+    etag = includes_etag([db_task], includes) if includes else resource_etag(db_task)
+    return not_modified(request, response, etag) or with_fields(db_task, TaskSchema, names, response, includes)
 
 @router.put("/{task_id}", response_model=TaskSchema)
-def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_task(task_id: int, task: TaskUpdate, request: Request, response: Response, db: Session = Depends(get_session)):
     db_task = db.query(Task).filter(Task.id == task_id).first()
     if db_task is None:
         raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    require_match(request, db_task)
     
     update_data = task.dict(exclude_unset=True)
     for key, value in update_data.items():
@@ -61,13 +116,16 @@ def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db)):
     
     db.commit()
     db.refresh(db_task)
+    response.headers["ETag"] = resource_etag(db_task)
     return db_task
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def delete_task(task_id: int, request: Request, db: Session = Depends(get_session)):
     db_task = db.query(Task).filter(Task.id == task_id).first()
     if db_task is None:
         raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    require_match(request, db_task)
     
     db.delete(db_task)
     db.commit()
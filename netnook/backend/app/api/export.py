@@ -0,0 +1,76 @@
+"""Exports en flux (CSV / NDJSON) des endpoints /export.
+
+Les lignes sont lues par lots via un curseur côté serveur (yield_per, qui
+active stream_results sur PostgreSQL) et écrites au fil de l'eau dans une
+StreamingResponse : la mémoire reste constante quel que soit le volume.
+
+Les dépendances à `yield` (get_db) se terminent avant l'envoi du corps de la
+réponse ; l'export ouvre donc sa propre session, fermée à la fin du flux.
+"""
+from datetime import date, datetime
+from io import StringIO
+from typing import Literal
+import csv
+import json
+
+from fastapi.responses import StreamingResponse
+
+from app.db.database import SessionLocal
+
+# Nombre de lignes lues par aller-retour sur le curseur serveur
+EXPORT_BATCH_SIZE = 2000
+
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(names, partitions):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for rows in partitions:
+        writer.writerows([_encode(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(names, partitions):
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(names, map(_encode, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def stream_export(statement, format: ExportFormat, filename: str):
+    """Retourne une StreamingResponse sur les lignes du SELECT donné (colonnes nommées)"""
+    names = [column.key for column in statement.selected_columns]
+    serialize = _csv_chunks if format == "csv" else _ndjson_chunks
+
+    def generate():
+        db = SessionLocal()
+        try:
+            result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            for chunk in serialize(names, result.partitions()):
+                yield chunk.encode("utf-8")
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
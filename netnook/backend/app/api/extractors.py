@@ -0,0 +1,118 @@
+"""Extraction du texte des documents (PDF, DOCX, texte brut).
+
+Fonctions sans dépendance à l'application : elles s'exécutent dans les
+processus du pool d'extraction (voir app.api.text_extraction). Le format est
+reconnu d'après le contenu (signature du fichier), le type MIME enregistré ne
+servant que pour le texte brut : les fichiers du stockage n'ont pas
+d'extension.
+"""
+from xml.etree.ElementTree import iterparse
+import zipfile
+
+# Octets lus pour reconnaître le format
+SNIFF_SIZE = 8192
+TEXT_CHUNK_SIZE = 1024 * 1024
+
+TEXT_MEDIA_TYPES = {"application/json", "application/xml", "application/csv", "application/x-ndjson"}
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def _extract_pdf(path):
+    # Dépendance chargée seulement dans les processus d'extraction
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+        yield "\n"
+
+
+def _extract_docx(path):
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("word/document.xml") as source:
+            for event, element in iterparse(source, events=("end",)):
+                tag = element.tag
+                if tag == f"{WORD_NAMESPACE}t":
+                    yield element.text or ""
+                elif tag == f"{WORD_NAMESPACE}tab":
+                    yield "\t"
+                elif tag in (f"{WORD_NAMESPACE}br", f"{WORD_NAMESPACE}p"):
+                    yield "\n"
+                if tag == f"{WORD_NAMESPACE}p":
+                    element.clear()
+
+
+def _extract_plain(path):
+    with open(path, "rb") as source:
+        head = source.read(SNIFF_SIZE)
+    encoding = "utf-8-sig" if _looks_like_text(head) else "latin-1"
+    # Lecture par blocs : l'extraction s'arrête à max_chars sans charger le fichier
+    with open(path, encoding=encoding, errors="replace") as source:
+        for chunk in iter(lambda: source.read(TEXT_CHUNK_SIZE), ""):
+            yield chunk
+
+
+def _looks_like_text(head):
+    if b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # Caractère multi-octets coupé en fin de bloc
+        return e.start >= len(head) - 3
+    return True
+
+
+def detect_format(path, media_type=None):
+    """'pdf', 'docx' ou 'text' ; lève UnsupportedFormat sinon"""
+    with open(path, "rb") as source:
+        head = source.read(SNIFF_SIZE)
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        raise UnsupportedFormat("archive non reconnue")
+    media_type = (media_type or "").split(";")[0].strip().lower()
+    if (media_type.startswith("text/") or media_type in TEXT_MEDIA_TYPES or not media_type
+            or media_type == "application/octet-stream") and _looks_like_text(head):
+        return "text"
+    raise UnsupportedFormat(media_type or "format inconnu")
+
+
+EXTRACTORS = {"pdf": _extract_pdf, "docx": _extract_docx, "text": _extract_plain}
+
+
+def extract_text(path, media_type=None, max_chars=None):
+    """Texte du document ; retourne {"status": "done"|"unsupported"|"failed", "text", "error"}"""
+    try:
+        extractor = EXTRACTORS[detect_format(path, media_type)]
+    except UnsupportedFormat as e:
+        return {"status": "unsupported", "text": None, "error": str(e)}
+    except OSError as e:
+        return {"status": "failed", "text": None, "error": f"{type(e).__name__}: {e}"}
+
+    parts = []
+    length = 0
+    try:
+        for part in extractor(path):
+            parts.append(part)
+            length += len(part)
+            if max_chars and length >= max_chars:
+                break
+    except Exception as e:
+        return {"status": "failed", "text": None, "error": f"{type(e).__name__}: {e}"}
+
+    text = "".join(parts)
+    if max_chars:
+        text = text[:max_chars]
+    # Les NUL sont refusés par PostgreSQL dans les colonnes texte
+    return {"status": "done", "text": text.replace("\x00", "").strip(), "error": None}
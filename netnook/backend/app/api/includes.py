@@ -0,0 +1,56 @@
+"""Relations incluses dans les réponses (include=client,tasks).
+
+Chaque router déclare les relations exposables de son modèle, avec le
+schéma de sortie des objets liés (ex. PROJECT_INCLUDES). include= ajoute ces
+relations à chaque objet de la réponse, dans un schéma imbriqué, pour un
+nombre de requêtes qui ne dépend pas de la taille de la page :
+- relation vers un objet (many-to-one) : joinedload, jointure dans la
+  requête principale, sans requête supplémentaire ;
+- collection (one-to-many) : selectinload, une requête IN (...) sur les ids
+  de la page.
+
+Le client n'a plus à relire chaque client ou tâche ligne par ligne (N+1).
+"""
+from hashlib import sha1
+
+from fastapi import HTTPException
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.api.conditional import resource_etag
+
+
+def parse_includes(include, relations):
+    """Relations demandées (include=a,b) : tuple de (nom, relation, schéma) ; None sans inclusion"""
+    if not include:
+        return None
+    requested = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = sorted(requested - set(relations or {}))
+    if unknown:
+        allowed = ", ".join(relations or {}) or "aucune"
+        raise HTTPException(
+            status_code=400, detail=f"Relations inconnues : {', '.join(unknown)} (valeurs possibles : {allowed})"
+        )
+    return tuple((name, *relations[name]) for name in relations if name in requested) or None
+
+
+def load_includes(query, includes):
+    """Options de chargement des relations incluses ; sans effet si includes est None"""
+    if not includes:
+        return query
+    options = [
+        selectinload(attribute) if attribute.property.uselist else joinedload(attribute)
+        for _, attribute, _ in includes
+    ]
+    return query.options(*options)
+
+
+def includes_etag(objects, includes, seed=""):
+    """ETag faible d'objets et de leurs relations incluses : change si l'un d'eux est modifié, ajouté ou retiré"""
+    digest = sha1(seed.encode())
+    for obj in objects:
+        digest.update(resource_etag(obj).encode())
+        for name, _, _ in includes:
+            related = getattr(obj, name)
+            for item in related if isinstance(related, list) else [related]:
+                digest.update(f"{name}:{resource_etag(item) if item is not None else '-'}".encode())
+    return f'W/"i-{digest.hexdigest()[:32]}"'
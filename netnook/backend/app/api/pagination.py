@@ -0,0 +1,165 @@
+"""Pagination des endpoints de liste.
+
+Deux modes coexistent :
+- skip/limit (historique), désormais sur un ordre stable ;
+- curseur opaque (keyset) sur (colonne de tri, id), dont le coût ne dépend
+  pas de la profondeur de la page.
+
+Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor
+(absent sur la dernière page), ce qui laisse le corps des réponses inchangé.
+Le tri se choisit avec sort=<colonne> ou sort=-<colonne> (décroissant).
+Sur une colonne de tri qui accepte NULL, les NULL viennent en premier en tri
+croissant et en dernier en tri décroissant, sur SQLite comme sur PostgreSQL
+(ordre natif des index SQLite, index NULLS FIRST sur PostgreSQL) ; le
+curseur d'une ligne NULL reste valide.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+import binascii
+import json
+import os
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import Date, DateTime, and_, or_, tuple_
+
+from app.api.conditional import not_modified, page_etag
+from app.api.includes import includes_etag, load_includes, parse_includes
+from app.api.serialization import FAST_JSON, json_objects, json_rows, load_fields, parse_fields, select_schema_columns
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Taille de page maximale acceptée par limit= (validée par les endpoints de liste)
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+
+def _parse_sort(sort, model, sortable_columns):
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name == "id":
+        return name, model.id, descending
+    column = sortable_columns.get(name)
+    if column is None:
+        allowed = ", ".join(["id"] + sorted(sortable_columns))
+        raise HTTPException(status_code=400, detail=f"Tri non supporté : {name} (valeurs possibles : {allowed})")
+    return name, column, descending
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(value, column):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def encode_cursor(sort, value, last_id):
+    payload = json.dumps({"s": sort, "v": _encode_value(value), "id": last_id}, separators=(",", ":"))
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort, column):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort:
+            raise ValueError("tri différent")
+        return _decode_value(payload["v"], column), int(payload["id"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def _order_by(column, descending):
+    order = column.desc() if descending else column.asc()
+    if not column.nullable:
+        return order
+    # Même place des NULL sur tous les dialectes (par défaut : premiers sur SQLite, derniers sur PostgreSQL)
+    return order.nulls_last() if descending else order.nulls_first()
+
+
+def _keyset_filter(column, model, value, last_id, descending):
+    """Lignes qui suivent (value, last_id) dans l'ordre de _order_by"""
+    if value is None:
+        if descending:
+            # NULL en dernier : il ne reste que des NULL d'id inférieur
+            return and_(column.is_(None), model.id < last_id)
+        return or_(and_(column.is_(None), model.id > last_id), column.isnot(None))
+    keyset = tuple_(column, model.id)
+    if descending:
+        after = keyset < (value, last_id)
+        return or_(after, column.is_(None)) if column.nullable else after
+    # En tri croissant les NULL sont déjà passés (et la comparaison les exclut)
+    return keyset > (value, last_id)
+
+
+def paginate(query, model, sortable_columns, sort, cursor, skip, limit, response: Response, request: Request = None,
+             schema=None, fields=None, include=None, relations=None):
+    """Applique tri, pagination (curseur ou skip/limit) et renseigne X-Next-Cursor.
+
+    Avec `request`, la liste porte un ETag calculé sur la page lue et un
+    If-None-Match correspondant donne une réponse 304, retournée à la place
+    de la page. Avec `schema`
+    (schéma de sortie) et FAST_JSON, la page est lue en tuples de colonnes et
+    retournée directement en JSON (voir app.api.serialization). `fields`
+    (paramètre fields=, avec `schema`) limite les colonnes lues et renvoyées.
+    `include` (paramètre include=) charge les relations demandées parmi
+    `relations` (voir app.api.includes) et les imbrique dans la réponse ;
+    l'ETag couvre alors aussi les relations chargées.
+    """
+    name, column, descending = _parse_sort(sort, model, sortable_columns)
+    sort_key = f"-{name}" if descending else name
+    names = parse_fields(fields, schema) if schema is not None else None
+    includes = parse_includes(include, relations)
+
+    if column is model.id:
+        order_by = [column.desc() if descending else column.asc()]
+    else:
+        order_by = [
+            _order_by(column, descending),
+            model.id.desc() if descending else model.id.asc(),
+        ]
+    query = query.order_by(*order_by)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_key, column)
+        if column is model.id:
+            query = query.filter(model.id < last_id if descending else model.id > last_id)
+        else:
+            query = query.filter(_keyset_filter(column, model, value, last_id, descending))
+    elif skip:
+        query = query.offset(skip)
+
+    fast = schema is not None and FAST_JSON and not includes
+    if fast:
+        # updated_at pour l'ETag de la page, même s'il n'est pas dans fields=
+        query = select_schema_columns(query, model, schema, extra=(column, model.updated_at), names=names)
+    else:
+        query = load_includes(load_fields(query, model, names, extra=(column,)), includes)
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    items = query.limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort_key, getattr(last, column.key), last.id)
+    if request is not None:
+        if includes:
+            etag = includes_etag(items, includes, request.url.query)
+        else:
+            etag = page_etag(request, items, response.headers.get(NEXT_CURSOR_HEADER))
+        unchanged = not_modified(request, response, etag)
+        if unchanged is not None:
+            return unchanged
+    if fast:
+        return json_rows(items, model, schema, response, names)
+    if includes:
+        return json_objects(items, schema, names, response, includes)
+    if names is not None:
+        return json_objects(items, schema, names, response)
+    return items
@@ -0,0 +1,134 @@
+"""Aperçus des documents (images et PDF), générés dans un pool de processus.
+
+Les aperçus sont propres au contenu : ils sont rangés à côté du fichier du
+stockage (<blob>.preview-<taille>.webp) et supprimés avec lui. Après un
+upload, schedule() lance la génération de toutes les tailles en une fois
+dans un pool borné (PREVIEW_WORKERS, 2 par défaut, 0 pour désactiver).
+
+Une requête d'aperçu arrivant avant la fin de la génération attend le travail
+en cours pour ce contenu au lieu d'en lancer un autre : un seul travail par
+contenu à la fois. Un échec est mémorisé à côté du fichier
+(<blob>.preview-error) pour ne pas relancer un rendu voué à échouer.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import logging
+import multiprocessing
+import os
+from typing import Literal
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.thumbnails import PREVIEW_FORMAT, detect_preview_format, render_previews
+from app.db.document_store import blob_path, remove_derived_files
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+# Plus grande dimension de l'aperçu, en pixels
+PREVIEW_SIZES = {"small": 160, "medium": 480, "large": 1024}
+PreviewSize = Literal["small", "medium", "large"]
+PREVIEW_MEDIA_TYPE = f"image/{PREVIEW_FORMAT.lower()}"
+
+
+def preview_path(digest, size):
+    return f"{blob_path(digest)}.preview-{size}.{PREVIEW_FORMAT.lower()}"
+
+
+def _error_path(digest):
+    return f"{blob_path(digest)}.preview-error"
+
+
+def _missing_previews(digest):
+    if os.path.exists(_error_path(digest)):
+        return {}
+    return {
+        pixels: preview_path(digest, size)
+        for size, pixels in PREVIEW_SIZES.items()
+        if not os.path.exists(preview_path(digest, size))
+    }
+
+
+class PreviewPipeline:
+    def __init__(self, workers=PREVIEW_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._semaphore = None
+        # Génération en cours par empreinte du contenu
+        self._jobs = {}
+
+    @property
+    def running(self):
+        return self._executor is not None
+
+    @property
+    def in_flight(self):
+        return len(self._jobs)
+
+    def start(self):
+        if self.workers <= 0 or self.running:
+            return
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._semaphore = asyncio.Semaphore(self.workers * 2)
+
+    async def stop(self):
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def schedule(self, digest, source_path):
+        """Programme la génération des aperçus manquants du contenu ; retourne la tâche (ou None)"""
+        if not self.running or not digest:
+            return None
+        job = self._jobs.get(digest)
+        if job is None:
+            job = self._jobs[digest] = asyncio.get_running_loop().create_task(
+                self._run(digest, source_path)
+            )
+            job.add_done_callback(lambda _: self._jobs.pop(digest, None))
+        return job
+
+    async def get(self, digest, source_path, size):
+        """Chemin de l'aperçu demandé, généré au besoin ; None si le contenu n'en a pas"""
+        path = preview_path(digest, size)
+        if await run_in_threadpool(os.path.exists, path):
+            return path
+        job = self.schedule(digest, source_path)
+        if job is None:
+            return None
+        # shield : une requête abandonnée n'annule pas le travail partagé
+        await asyncio.shield(job)
+        return path if await run_in_threadpool(os.path.exists, path) else None
+
+    async def _run(self, digest, source_path):
+        async with self._semaphore:
+            try:
+                preview_format = await run_in_threadpool(detect_preview_format, source_path)
+                targets = await run_in_threadpool(_missing_previews, digest)
+                if preview_format is None or not targets:
+                    return
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, render_previews, source_path, preview_format, targets
+                )
+                if result["status"] == "failed":
+                    logger.warning(f"Aperçu du contenu {digest} impossible: {result['error']}")
+                    await run_in_threadpool(_write_error, digest, result["error"])
+                # Contenu supprimé pendant le rendu : ses aperçus partent avec lui
+                if not await run_in_threadpool(os.path.exists, source_path):
+                    await run_in_threadpool(remove_derived_files, source_path)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Génération des aperçus du contenu {digest} interrompue: {e}")
+
+
+def _write_error(digest, error):
+    with open(_error_path(digest), "w") as marker:
+        marker.write(error)
+
+
+pipeline = PreviewPipeline()
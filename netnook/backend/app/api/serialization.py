@@ -0,0 +1,127 @@
+"""Sérialisation rapide des listes et sélection de champs (fields=).
+
+Le chemin classique (response_model=List[Schema], orm_mode) charge des objets
+ORM, valide chaque ligne avec Pydantic puis encode avec json. Ici, la requête
+ne sélectionne que les colonnes du schéma de sortie ; chaque ligne devient un
+dict dans l'ordre des champs du schéma et la liste est encodée en une fois
+par orjson. Le JSON produit est identique, sans validation des lignes : les
+valeurs viennent de la base, typées par les colonnes.
+
+fields=name,status restreint la réponse à ces champs (id toujours inclus) :
+seules ces colonnes sont lues en base (select de colonnes, ou load_only sur
+le chemin ORM) et la réponse suit un schéma réduit au même sous-ensemble.
+Les relations incluses (include=, voir app.api.includes) s'ajoutent à ce
+schéma comme champs imbriqués ; la page passe alors par le chemin ORM.
+
+FAST_JSON=false rétablit le chemin classique (comparaison, diagnostic).
+"""
+from functools import lru_cache
+from typing import List, Optional
+import os
+
+from fastapi import HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter, create_model
+from sqlalchemy.orm import load_only
+
+FAST_JSON = os.getenv("FAST_JSON", "true").lower() in ("1", "true", "yes", "on")
+
+# Colonnes toujours chargées sur le chemin ORM : identité et version (ETag)
+ALWAYS_LOADED = ("id", "created_at", "updated_at")
+
+# (modèle, schéma, champs) -> (noms des champs, colonnes) ; calculé au premier appel
+_schema_columns = {}
+
+
+def parse_fields(fields, schema):
+    """Champs demandés (fields=a,b) dans l'ordre du schéma, id compris ; None sans sélection"""
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(schema.model_fields))
+    if unknown:
+        allowed = ", ".join(schema.model_fields)
+        raise HTTPException(
+            status_code=400, detail=f"Champs inconnus : {', '.join(unknown)} (valeurs possibles : {allowed})"
+        )
+    requested.add("id")
+    return tuple(name for name in schema.model_fields if name in requested)
+
+
+@lru_cache(maxsize=256)
+def trimmed_schema(schema, names):
+    """Schéma de sortie réduit aux champs `names` (mêmes types et valeurs par défaut)"""
+    if names is None:
+        return schema
+    definitions = {
+        name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names
+    }
+    return create_model(f"{schema.__name__}Fields", __config__=schema.model_config, **definitions)
+
+
+@lru_cache(maxsize=256)
+def output_schema(schema, names, includes=None):
+    """Schéma réduit aux champs `names`, complété des relations incluses (objet ou liste imbriqués)"""
+    trimmed = trimmed_schema(schema, names)
+    if not includes:
+        return trimmed
+    definitions = {
+        name: (List[nested], []) if attribute.property.uselist else (Optional[nested], None)
+        for name, attribute, nested in includes
+    }
+    return create_model(f"{trimmed.__name__}Included", __base__=trimmed, **definitions)
+
+
+@lru_cache(maxsize=256)
+def _list_adapter(schema, names, includes=None):
+    return TypeAdapter(List[output_schema(schema, names, includes)])
+
+
+def schema_columns(model, schema, names=None):
+    key = (model, schema, names)
+    columns = _schema_columns.get(key)
+    if columns is None:
+        names = list(names or schema.model_fields)
+        columns = _schema_columns[key] = (names, [getattr(model, name) for name in names])
+    return columns
+
+
+def select_schema_columns(query, model, schema, extra=(), names=None):
+    """Restreint la requête aux colonnes du schéma (et à `extra`, ex. colonne de tri)"""
+    names, columns = schema_columns(model, schema, names)
+    extra = list({column.key: column for column in extra if column.key not in names}.values())
+    return query.with_entities(*columns, *extra)
+
+
+def load_fields(query, model, names, extra=()):
+    """load_only des champs demandés (et des colonnes d'identité et de version) ; sans effet si names est None"""
+    if names is None:
+        return query
+    loaded = dict.fromkeys([*names, *ALWAYS_LOADED, *(column.key for column in extra)])
+    return query.options(load_only(*[getattr(model, name) for name in loaded]))
+
+
+def json_rows(rows, model, schema, response=None, names=None):
+    """Réponse JSON des lignes ; reprend les en-têtes posés sur `response` (curseur, ETag)"""
+    names, _ = schema_columns(model, schema, names)
+    width = len(names)
+    content = [dict(zip(names, row[:width])) for row in rows]
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, headers=headers)
+
+
+def json_objects(objects, schema, names, response=None, includes=None):
+    """Réponse JSON d'objets ORM validés par le schéma réduit (chemin classique avec fields= ou include=)"""
+    adapter = _list_adapter(schema, names, includes)
+    body = adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+    headers = dict(response.headers) if response is not None else None
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def with_fields(obj, schema, names, response=None, includes=None):
+    """`obj` tel quel sans sélection de champs ni relations, sinon sa réponse JSON (champs demandés, relations incluses)"""
+    if names is None and not includes:
+        return obj
+    content = output_schema(schema, names, includes).model_validate(obj, from_attributes=True).model_dump(mode="json")
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, headers=headers)
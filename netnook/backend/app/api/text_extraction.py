@@ -0,0 +1,191 @@
+"""Extraction du texte des documents en tâche de fond.
+
+Après un upload, schedule(sha256) lance l'extraction du contenu dans un pool
+de processus (TEXT_EXTRACTION_WORKERS, 2 par défaut, 0 pour désactiver) :
+l'upload n'attend jamais l'extraction. Le résultat est écrit sur la ligne
+document_blobs du contenu, ce qui alimente l'index plein texte.
+
+Le travail est indexé par l'empreinte du contenu : un contenu déjà traité
+n'est pas réextrait, deux uploads identiques ne lancent qu'une extraction, et
+l'écriture ne s'applique qu'aux contenus encore en attente. Au démarrage, les
+contenus restés en attente (arrêt du serveur, migration) sont repris.
+
+Traitement hors serveur (reprend là où il s'est arrêté) :
+    python -m app.api.text_extraction run [--retry-failed]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.extractors import extract_text
+from app.db.database import SessionLocal
+from app.models.models import Document, DocumentBlob
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.getenv("TEXT_EXTRACTION_WORKERS", "2"))
+# Longueur maximale du texte indexé par contenu
+MAX_TEXT_LENGTH = int(os.getenv("TEXT_EXTRACTION_MAX_CHARS", str(2_000_000)))
+
+
+def claim_job(digest):
+    """(chemin, type MIME) du contenu s'il est en attente d'extraction, None sinon"""
+    db = SessionLocal()
+    try:
+        blob = db.query(DocumentBlob).filter(
+            DocumentBlob.sha256 == digest, DocumentBlob.extraction_status == "pending"
+        ).first()
+        if blob is None:
+            return None
+        file_type = db.query(Document.file_type).filter(
+            Document.sha256 == digest, Document.file_type.isnot(None)
+        ).limit(1).scalar()
+        return blob.file_path, file_type
+    finally:
+        db.close()
+
+
+def save_result(digest, result):
+    """Enregistre le résultat d'extraction ; sans effet si le contenu n'est plus en attente"""
+    db = SessionLocal()
+    try:
+        db.query(DocumentBlob).filter(
+            DocumentBlob.sha256 == digest, DocumentBlob.extraction_status == "pending"
+        ).update({
+            "extraction_status": result["status"],
+            "extracted_text": result["text"],
+            "extraction_error": (result["error"] or "")[:255] or None,
+            "extracted_at": datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def pending_digests(retry_failed=False):
+    statuses = ["pending", "failed"] if retry_failed else ["pending"]
+    db = SessionLocal()
+    try:
+        if retry_failed:
+            db.query(DocumentBlob).filter(DocumentBlob.extraction_status == "failed").update(
+                {"extraction_status": "pending"}, synchronize_session=False
+            )
+            db.commit()
+        return [
+            digest for digest, in db.query(DocumentBlob.sha256)
+            .filter(DocumentBlob.extraction_status.in_(statuses))
+            .order_by(DocumentBlob.id)
+        ]
+    finally:
+        db.close()
+
+
+class TextExtractionPipeline:
+    def __init__(self, workers=EXTRACTION_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._semaphore = None
+        # Extractions en cours par empreinte : un seul travail par contenu
+        self._jobs = {}
+
+    @property
+    def running(self):
+        return self._executor is not None
+
+    @property
+    def in_flight(self):
+        return len(self._jobs)
+
+    def start(self):
+        if self.workers <= 0 or self.running:
+            return
+        # spawn : les processus ne doivent pas hériter des threads et connexions du serveur
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        # Limite les travaux commencés (requêtes en base comprises) au double des processus
+        self._semaphore = asyncio.Semaphore(self.workers * 2)
+
+    async def stop(self):
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def schedule(self, digest):
+        """Programme l'extraction d'un contenu, sans attendre ; retourne la tâche (ou None)"""
+        if not self.running or not digest:
+            return None
+        job = self._jobs.get(digest)
+        if job is None:
+            job = self._jobs[digest] = asyncio.get_running_loop().create_task(self._run(digest))
+            job.add_done_callback(lambda _: self._jobs.pop(digest, None))
+        return job
+
+    async def resume(self):
+        """Reprend les contenus restés en attente"""
+        if not self.running:
+            return 0
+        digests = await run_in_threadpool(pending_digests)
+        for digest in digests:
+            self.schedule(digest)
+        if digests:
+            logger.info(f"Extraction de texte : {len(digests)} contenus en attente repris")
+        return len(digests)
+
+    async def _run(self, digest):
+        async with self._semaphore:
+            try:
+                job = await run_in_threadpool(claim_job, digest)
+                if job is None:
+                    return
+                path, file_type = job
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, extract_text, path, file_type, MAX_TEXT_LENGTH
+                )
+                await run_in_threadpool(save_result, digest, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Le contenu reste en attente : il sera repris au prochain démarrage
+                logger.error(f"Extraction de texte du contenu {digest} interrompue: {e}")
+
+
+pipeline = TextExtractionPipeline()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extraction du texte des documents en attente")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--retry-failed", action="store_true", help="Retente aussi les extractions en échec")
+    parser.add_argument("--workers", type=int, default=max(EXTRACTION_WORKERS, 1))
+    args = parser.parse_args(argv)
+
+    digests = pending_digests(args.retry_failed)
+    counts = {}
+    with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        jobs = {}
+        for digest in digests:
+            job = claim_job(digest)
+            if job is not None:
+                jobs[executor.submit(extract_text, job[0], job[1], MAX_TEXT_LENGTH)] = digest
+        for future, digest in jobs.items():
+            result = future.result()
+            # Écrit au fil de l'eau : une interruption ne perd que les travaux en cours
+            save_result(digest, result)
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print(f"{len(jobs)} contenus traités : {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Rendu des aperçus (vignettes) d'images et de PDF.
+
+Fonctions sans dépendance à l'application, exécutées dans les processus du
+pool d'aperçus (voir app.api.previews). Le document est décodé une seule
+fois, à la plus grande taille demandée, puis réduit pour les suivantes.
+"""
+import os
+
+# Signatures reconnues : les fichiers du stockage n'ont pas d'extension
+IMAGE_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",
+    b"II*\x00",
+    b"MM\x00*",
+)
+PREVIEW_FORMAT = "WEBP"
+PREVIEW_QUALITY = 80
+
+
+def detect_preview_format(path):
+    """'image', 'pdf' ou None si le contenu n'a pas d'aperçu"""
+    with open(path, "rb") as source:
+        head = source.read(16)
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(IMAGE_SIGNATURES) or (head[:4] == b"RIFF" and head[8:12] == b"WEBP"):
+        return "image"
+    return None
+
+
+def _open_image(path, max_size):
+    from PIL import Image, ImageOps
+
+    image = Image.open(path)
+    # JPEG : décodage directement à une résolution réduite
+    image.draft("RGB", (max_size, max_size))
+    image = ImageOps.exif_transpose(image)
+    if getattr(image, "n_frames", 1) > 1:
+        image.seek(0)
+    return image
+
+
+def _render_pdf(path, max_size):
+    import pypdfium2
+
+    document = pypdfium2.PdfDocument(path)
+    try:
+        page = document[0]
+        width, height = page.get_size()
+        bitmap = page.render(scale=max_size / max(width, height, 1))
+        return bitmap.to_pil()
+    finally:
+        document.close()
+
+
+def render_previews(path, preview_format, targets):
+    """Écrit un aperçu par taille ; targets = {taille en pixels: chemin de sortie}.
+
+    Retourne {"status": "done"|"failed", "error"}. Chaque fichier apparaît par
+    rename atomique : un lecteur ne voit jamais d'aperçu partiel.
+    """
+    from PIL import Image
+
+    try:
+        largest = max(targets)
+        image = _render_pdf(path, largest) if preview_format == "pdf" else _open_image(path, largest)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        for size in sorted(targets, reverse=True):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            output = targets[size]
+            temporary = f"{output}.tmp-{os.getpid()}"
+            image.save(temporary, PREVIEW_FORMAT, quality=PREVIEW_QUALITY)
+            os.replace(temporary, output)
+    except Exception as e:
+        return {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+    return {"status": "done", "error": None}
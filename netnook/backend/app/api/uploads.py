@@ -0,0 +1,183 @@
+"""Réception des fichiers envoyés en multipart/form-data, sans bloquer la boucle.
+
+Le corps de la requête est lu au fil de l'eau (request.stream()) et découpé
+par python-multipart ; les données du fichier sont écrites par blocs dans un
+fichier temporaire du répertoire d'upload, dans le threadpool, en calculant
+au passage la taille et le SHA-256. Au-delà de MAX_UPLOAD_SIZE la réception
+s'arrête (413) et le fichier temporaire est supprimé. Le fichier n'apparaît
+sous son nom définitif qu'au moment du rename atomique (move_to). Les champs
+texte sont bornés en nombre (MAX_FIELDS) et en taille (MAX_FIELD_SIZE).
+"""
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+import os
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_DIRECTORY = os.getenv("UPLOAD_DIRECTORY", "/app/uploads")
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(500 * 1024 * 1024)))
+# Taille maximale et nombre maximal des champs texte accompagnant le fichier
+MAX_FIELD_SIZE = 64 * 1024
+MAX_FIELDS = 16
+
+# Schéma OpenAPI du corps, que FastAPI ne peut pas déduire d'une lecture en flux
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "name": {"type": "string"},
+                        "project_id": {"type": "integer"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+class ReceivedFile:
+    """Fichier en cours de réception ; ses méthodes sont bloquantes (threadpool)"""
+
+    def __init__(self, directory, max_size, filename, content_type):
+        self.filename = filename
+        self.content_type = content_type
+        self.max_size = max_size
+        self.size = 0
+        self._hash = sha256()
+        self._file = NamedTemporaryFile(dir=directory, prefix=".upload-", delete=False)
+        self.path = self._file.name
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise HTTPException(status_code=413, detail=f"Fichier trop volumineux (maximum {self.max_size} octets)")
+        self._hash.update(data)
+        self._file.write(data)
+
+    def move_to(self, path):
+        """Rend le fichier visible sous `path` (même système de fichiers : rename atomique)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = path
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _MultipartState:
+    def __init__(self, field, directory, max_size, charset):
+        self.field = field
+        self.directory = directory
+        self.max_size = max_size
+        self.charset = charset
+        self.fields = {}
+        self.received = None
+        self.pending = []
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._name = None
+        self._data = b""
+        self._target = None
+
+    def _decode(self, value):
+        try:
+            return value.decode(self.charset)
+        except (UnicodeDecodeError, LookupError):
+            return value.decode("latin-1")
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._data = b""
+        self._target = None
+
+    def on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+        if len(self._header_name) > MAX_FIELD_SIZE:
+            raise HTTPException(status_code=400, detail="En-tête de partie multipart trop volumineux")
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+        if len(self._header_value) > MAX_FIELD_SIZE:
+            raise HTTPException(status_code=400, detail="En-tête de partie multipart trop volumineux")
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = self._decode(options.get(b"name", b""))
+        if b"filename" in options:
+            if self._name != self.field or self.received is not None:
+                raise HTTPException(status_code=400, detail=f"Un seul fichier attendu, dans le champ '{self.field}'")
+            filename = os.path.basename(self._decode(options[b"filename"]).replace("\\", "/")) or "fichier"
+            content_type = self._decode(self._headers.get(b"content-type", b"application/octet-stream"))
+            # Création du fichier temporaire : opération disque, mais ponctuelle
+            self.received = ReceivedFile(self.directory, self.max_size, filename, content_type)
+            self._target = self.received
+        elif len(self.fields) >= MAX_FIELDS and self._name not in self.fields:
+            raise HTTPException(status_code=413, detail=f"Trop de champs (maximum {MAX_FIELDS})")
+
+    def on_part_data(self, data, start, end):
+        if self._target is not None:
+            self.pending.append(data[start:end])
+        else:
+            self._data += data[start:end]
+            if len(self._data) > MAX_FIELD_SIZE:
+                raise HTTPException(status_code=413, detail=f"Champ '{self._name}' trop volumineux")
+
+    def on_part_end(self):
+        if self._target is None:
+            self.fields[self._name] = self._decode(self._data)
+
+
+async def receive_upload(request: Request, field="file", directory=UPLOAD_DIRECTORY, max_size=MAX_UPLOAD_SIZE):
+    """Lit un formulaire multipart en flux ; retourne (champs texte, ReceivedFile)"""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=415, detail="Corps multipart/form-data attendu")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size + MAX_FIELDS * MAX_FIELD_SIZE:
+        raise HTTPException(status_code=413, detail=f"Fichier trop volumineux (maximum {max_size} octets)")
+
+    charset = params.get(b"charset", b"utf-8").decode("latin-1")
+    state = _MultipartState(field, directory, max_size, charset)
+    parser = MultipartParser(params[b"boundary"], {
+        name: getattr(state, name)
+        for name in ("on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                     "on_headers_finished", "on_part_data", "on_part_end")
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if state.pending:
+                data = b"".join(state.pending)
+                state.pending.clear()
+                await run_in_threadpool(state.received.write, data)
+        parser.finalize()
+    except BaseException:
+        if state.received is not None:
+            await run_in_threadpool(state.received.discard)
+        raise
+
+    if state.received is None:
+        raise HTTPException(status_code=422, detail=f"Champ fichier '{field}' manquant")
+    return state.fields, state.received
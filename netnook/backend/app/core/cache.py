@@ -0,0 +1,110 @@
+"""Cache en mémoire des réponses analytiques.
+
+Chaque entrée déclare les tables dont elle dépend. Les écritures validées
+(after_commit) incrémentent la version des tables modifiées, ce qui invalide
+précisément les entrées concernées ; un TTL sert de filet de sécurité pour ce
+qui n'est pas tracé (autres workers, écritures hors ORM, dépendance à l'heure).
+"""
+from threading import Lock
+import os
+import time
+
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "256"))
+
+
+class ResponseCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._versions = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _snapshot(self, tables):
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get_or_compute(self, key, tables, compute, response: Response = None):
+        """Retourne la valeur en cache pour key, ou la calcule et la mémorise"""
+        tables = tuple(sorted(tables))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at, versions = entry
+                if now - stored_at < self.ttl and versions == self._snapshot(tables):
+                    self.hits += 1
+                    if response is not None:
+                        response.headers["X-Cache"] = "HIT"
+                        response.headers["X-Cache-Age"] = f"{now - stored_at:.1f}"
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            # Versions relevées avant le calcul : un commit concurrent rendra l'entrée obsolète
+            versions = self._snapshot(tables)
+
+        value = compute()
+
+        with self._lock:
+            if versions == self._snapshot(tables):
+                if len(self._entries) >= self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                    del self._entries[oldest]
+                self._entries[key] = (value, now, versions)
+        if response is not None:
+            response.headers["X-Cache"] = "MISS"
+        return value
+
+    def invalidate_tables(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+analytics_cache = ResponseCache(ANALYTICS_CACHE_TTL, ANALYTICS_CACHE_MAX_ENTRIES)
+
+
+def mark_tables_changed(session, *tables):
+    """Signale des tables modifiées hors ORM ; elles seront invalidées au commit"""
+    session.info.setdefault("changed_tables", set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    if tables:
+        mark_tables_changed(session, *tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            mark_tables_changed(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tables(session):
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        analytics_cache.invalidate_tables(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session):
+    session.info.pop("changed_tables", None)
@@ -0,0 +1,168 @@
+"""Compression des réponses (brotli ou gzip) au-delà d'un seuil de taille.
+
+CompressionMiddleware (ASGI pur) choisit l'encodage d'après Accept-Encoding
+— brotli si le module est installé, sinon gzip — pour les types textuels
+(JSON, NDJSON, CSV, texte) dont le corps dépasse COMPRESSION_MINIMUM_SIZE
+octets (1024 par défaut, 0 pour désactiver). Les réponses en flux sont
+compressées au fil de l'eau, chaque morceau étant vidé aussitôt : un export
+reste progressif. Les fichiers servis par plage (Accept-Ranges) et les
+réponses déjà encodées ne sont pas touchés. Toute réponse qui serait
+compressée porte Vary: Accept-Encoding, y compris quand le client n'accepte
+aucun encodage : un cache partagé ne sert pas le corps non compressé aux
+clients gzip / brotli, ni l'inverse.
+
+Un ETag fort désigne une représentation précise (RFC 9110 §8.8.3) : celui
+d'une réponse compressée reçoit le suffixe de l'encodage ("x" devient
+"x-gzip"), que app.api.conditional ignore en comparant If-None-Match /
+If-Match. Les ETags faibles restent inchangés.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli optionnel : gzip seul
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+# Niveaux rapides : le gain de taille au-delà ne compense pas le temps CPU par requête
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (
+    b"application/json", b"application/x-ndjson", b"application/problem+json",
+    b"text/", b"application/javascript", b"application/xml", b"image/svg+xml",
+)
+
+
+def _accepted_encodings(header):
+    """Encodages acceptés (q > 0) d'un en-tête Accept-Encoding"""
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def _encoded_etag(value, encoding):
+    """ETag fort suffixé de l'encodage ; un ETag faible est conservé"""
+    if value.startswith(b"W/") or not value.endswith(b'"'):
+        return value
+    return value[:-1] + b"-" + encoding.encode() + b'"'
+
+
+def choose_encoding(header):
+    accepted = _accepted_encodings(header or "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def _with_vary(headers):
+    """En-têtes de réponse avec Accept-Encoding ajouté à Vary"""
+    vary = [value for name, value in headers if name.lower() == b"vary"]
+    return [(name, value) for name, value in headers if name.lower() != b"vary"] + [
+        (b"vary", b", ".join(vary + [b"Accept-Encoding"]))
+    ]
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._process = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data):
+        return self._process(data) + self._flush()
+
+    def last(self, data):
+        return self._process(data) + self._finish()
+
+
+class CompressionMiddleware:
+    """Middleware ASGI : compression brotli / gzip des réponses textuelles volumineuses"""
+
+    def __init__(self, app, minimum_size=COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = choose_encoding(value.decode("latin-1"))
+                break
+
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def compressing_send(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = next((value for name, value in headers if name.lower() == b"content-type"), b"")
+                skip = any(name.lower() in (b"content-encoding", b"content-range", b"accept-ranges") for name, _ in headers)
+                if skip or message["status"] in (204, 304) or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    state["passthrough"] = True
+                    await send(message)
+                else:
+                    # Décision au premier morceau du corps : sa taille (et more_body) est alors connue
+                    state["start"] = message
+                return
+            if state["passthrough"] or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+            if start is not None:
+                state["start"] = None
+                if not more_body and len(body) < self.minimum_size:
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+                if encoding is None:
+                    # Non compressée pour ce client, mais le serait pour un autre
+                    state["passthrough"] = True
+                    await send({**start, "headers": _with_vary(start.get("headers", []))})
+                    await send(message)
+                    return
+                state["compressor"] = _Compressor(encoding)
+                headers = _with_vary([
+                    (name, _encoded_etag(value, encoding) if name.lower() == b"etag" else value)
+                    for name, value in start.get("headers", [])
+                    if name.lower() != b"content-length"
+                ])
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    compressed = state["compressor"].last(body)
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start, "headers": headers})
+
+            compressor = state["compressor"]
+            data = compressor.chunk(body) if more_body else compressor.last(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,244 @@
+"""Mesures des requêtes HTTP et SQL, exposées au format texte Prometheus.
+
+MetricsMiddleware (ASGI pur, sans tamponner les réponses en flux) relève par
+route — le gabarit de chemin, pas l'URL, pour borner le nombre de séries — la
+latence, la taille de réponse et le code de statut. Les événements
+before/after_cursor_execute du moteur comptent les requêtes SQL et leur durée,
+attribuées à la requête HTTP en cours via une variable de contexte (propagée
+au threadpool et à run_sync).
+
+Chaque observation ne coûte qu'une recherche dichotomique et quelques
+additions sous verrou ; le texte n'est produit qu'au moment où /metrics est
+lu.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+import math
+import time
+
+from sqlalchemy import event
+
+# Bornes des histogrammes (secondes, octets, nombre de requêtes SQL)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Option d'exécution des connexions de diagnostic (EXPLAIN des requêtes lentes) :
+# leurs requêtes ne sont ni comptées ni mesurées
+SKIP_INSTRUMENTATION = "netnook_skip_instrumentation"
+
+
+def is_instrumented(conn):
+    return not conn.get_execution_options().get(SKIP_INSTRUMENTATION, False)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # Par jeu d'étiquettes : [comptes par intervalle (non cumulés), somme, total]
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        names = (*self.labels, "le")
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, (*labels, _format_value(bound)))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # Fonctions appelées à la lecture : [(nom, type, aide, [(étiquettes dict, valeur)])]
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+ROUTE_LABELS = ("method", "route")
+http_requests = registry.register(Counter(
+    "http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status")
+))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP", ROUTE_LABELS, LATENCY_BUCKETS
+))
+http_response_size = registry.register(Histogram(
+    "http_response_size_bytes", "Taille du corps des réponses HTTP", ROUTE_LABELS, SIZE_BUCKETS
+))
+sql_per_request = registry.register(Histogram(
+    "http_request_sql_statements", "Requêtes SQL émises par requête HTTP", ROUTE_LABELS, SQL_COUNT_BUCKETS
+))
+sql_time_per_request = registry.register(Histogram(
+    "http_request_sql_duration_seconds", "Temps passé en SQL par requête HTTP", ROUTE_LABELS, LATENCY_BUCKETS
+))
+sql_statements = registry.register(Counter(
+    "sql_statements_total", "Requêtes SQL exécutées (toutes origines)", ("engine",)
+))
+sql_duration = registry.register(Counter(
+    "sql_statements_duration_seconds_total", "Temps cumulé des requêtes SQL", ("engine",)
+))
+
+
+class RequestStats:
+    __slots__ = ("scope", "sql_count", "sql_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+current_request = ContextVar("current_request", default=None)
+
+
+def route_label(scope):
+    """(méthode, gabarit de route) ; le routeur renseigne scope["route"] avant l'endpoint"""
+    route = scope.get("route")
+    return scope["method"], getattr(route, "path", None) or "unmatched"
+
+
+def current_route():
+    """« MÉTHODE /gabarit » de la requête HTTP en cours, None hors requête"""
+    stats = current_request.get()
+    return " ".join(route_label(stats.scope)) if stats is not None else None
+
+
+def instrument_sql(engine, name):
+    """Compte les requêtes SQL du moteur (synchrone) et les attribue à la requête HTTP en cours"""
+    labels = (name,)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        if not is_instrumented(conn):
+            return
+        elapsed = time.perf_counter() - context._metrics_start
+        sql_statements.inc(labels)
+        sql_duration.inc(labels, elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_seconds += elapsed
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : latence, taille, statut et SQL par route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def measured_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            elif message["type"] == "http.response.zerocopy":
+                size += message.get("count") or 0
+            await send(message)
+
+        try:
+            await self.app(scope, receive, measured_send)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - start
+            labels = route_label(scope)
+            http_requests.inc((*labels, str(status)))
+            http_duration.observe(elapsed, labels)
+            http_response_size.observe(size, labels)
+            sql_per_request.observe(stats.sql_count, labels)
+            sql_time_per_request.observe(stats.sql_seconds, labels)
@@ -0,0 +1,369 @@
+"""Stockage des documents adressé par contenu.
+
+Chaque contenu distinct est stocké une seule fois sous
+UPLOAD_DIRECTORY/blobs/<sha[0:2]>/<sha[2:4]>/<sha256> (fichiers dérivés, comme
+les aperçus, à côté : <sha256>.*) ; la table document_blobs
+compte les documents qui y font référence. Le compteur est tenu à jour à
+chaque flush (création, suppression y compris en cascade, changement de
+contenu) dans la même transaction SQL ; le fichier n'est supprimé qu'après
+la validation qui fait tomber le compteur à zéro.
+
+Un upload dont le contenu existe déjà garde son fichier reçu jusqu'à la
+validation du document (settle_blob) ; la suppression met le fichier de côté
+puis revérifie les références avant de l'effacer. Une suppression concurrente
+de la dernière référence ne laisse donc jamais un document sans fichier.
+
+Commandes de maintenance :
+    python -m app.db.document_store check     # compteurs et fichiers manquants
+    python -m app.db.document_store rebuild   # recalcule les compteurs depuis documents
+"""
+from collections import Counter
+from hashlib import sha256
+import argparse
+import glob
+import logging
+import os
+import shutil
+import sys
+from uuid import uuid4
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.api.uploads import UPLOAD_DIRECTORY
+from app.db.database import SessionLocal
+from app.models.models import Document, DocumentBlob
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIRECTORY = os.path.join(UPLOAD_DIRECTORY, "blobs")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+blobs_table = DocumentBlob.__table__
+documents_table = Document.__table__
+
+
+def blob_path(digest):
+    return os.path.join(BLOB_DIRECTORY, digest[:2], digest[2:4], digest)
+
+
+def document_file(document):
+    """Chemin du contenu d'un document, None s'il n'est pas dans le stockage.
+
+    Le chemin est déduit du SHA-256 ; file_path n'est suivi que pour les
+    fichiers non migrés et seulement s'il se trouve sous UPLOAD_DIRECTORY :
+    une valeur en base ne doit pas permettre de lire un fichier de l'hôte.
+    """
+    if document.sha256:
+        return blob_path(document.sha256)
+    if not document.file_path:
+        return None
+    root = os.path.realpath(UPLOAD_DIRECTORY)
+    path = os.path.realpath(document.file_path)
+    return path if os.path.commonpath([root, path]) == root else None
+
+
+def hash_file(path):
+    digest = sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_blob(received):
+    """Range un fichier reçu (app.api.uploads.ReceivedFile) dans le stockage ; retourne son chemin.
+
+    Si le contenu est déjà stocké, le fichier reçu est conservé jusqu'à
+    settle_blob : la dernière référence existante peut disparaître avant que
+    le nouveau document ne prenne la sienne.
+    """
+    path = blob_path(received.sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        received.move_to(path)
+    return path
+
+
+def settle_blob(received):
+    """Après la validation du document : libère le fichier reçu, ou le remet en place si le contenu a disparu"""
+    path = blob_path(received.sha256)
+    if received.path == path:
+        return
+    if os.path.exists(path):
+        received.discard()
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        received.move_to(path)
+
+
+def discard_blob(bind, received):
+    """Annule store_blob quand le document n'a pas été créé"""
+    if received.path == blob_path(received.sha256):
+        remove_blob_if_unreferenced(bind, received.sha256)
+    else:
+        received.discard()
+
+
+def _is_referenced(bind, digest):
+    with bind.connect() as connection:
+        return connection.execute(
+            select(blobs_table.c.id).where(blobs_table.c.sha256 == digest)
+        ).first() is not None
+
+
+def remove_blob_if_unreferenced(bind, digest):
+    """Supprime le fichier d'un contenu qu'aucune ligne de document_blobs ne référence"""
+    if _is_referenced(bind, digest):
+        return
+    path = blob_path(digest)
+    # Fichier mis de côté puis références revérifiées : un upload du même contenu
+    # validé entre-temps le retrouve en place
+    aside = os.path.join(os.path.dirname(path), f".{digest}.{uuid4().hex}.removing")
+    try:
+        os.replace(path, aside)
+    except FileNotFoundError:
+        aside = None
+    except OSError as e:
+        logger.warning(f"Suppression du contenu {digest} impossible: {e}")
+        return
+    try:
+        if _is_referenced(bind, digest):
+            if aside is not None:
+                os.replace(aside, path)
+            return
+        if aside is not None:
+            os.remove(aside)
+        remove_derived_files(path)
+    except OSError as e:
+        logger.warning(f"Suppression du contenu {digest} impossible: {e}")
+
+
+def remove_derived_files(path):
+    """Supprime les fichiers dérivés rangés à côté d'un contenu (<blob>.*, ex. aperçus)"""
+    for derived in glob.glob(f"{glob.escape(path)}.*"):
+        os.remove(derived)
+
+
+def apply_reference_deltas(connection, deltas, sizes):
+    """Applique des variations {sha256: delta} ; retourne les contenus tombés à zéro"""
+    for digest, delta in deltas.items():
+        if not delta:
+            continue
+        result = connection.execute(
+            blobs_table.update()
+            .where(blobs_table.c.sha256 == digest)
+            .values(ref_count=blobs_table.c.ref_count + delta)
+        )
+        if result.rowcount == 0 and delta > 0:
+            connection.execute(blobs_table.insert().values(
+                sha256=digest, size=sizes.get(digest), file_path=blob_path(digest), ref_count=delta,
+            ))
+
+    orphans = list(connection.execute(
+        select(blobs_table.c.sha256).where(
+            blobs_table.c.sha256.in_(list(deltas)), blobs_table.c.ref_count <= 0
+        )
+    ).scalars())
+    if orphans:
+        connection.execute(blobs_table.delete().where(blobs_table.c.sha256.in_(orphans)))
+    return orphans
+
+
+def _previous_digest(document):
+    history = inspect(document).attrs.sha256.history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return document.sha256
+
+
+@event.listens_for(Session, "before_flush")
+def _track_references(session, flush_context, instances):
+    deltas = Counter()
+    sizes = {}
+
+    for obj in session.new:
+        if isinstance(obj, Document) and obj.sha256:
+            deltas[obj.sha256] += 1
+            sizes[obj.sha256] = obj.size
+    for obj in session.dirty:
+        if isinstance(obj, Document) and inspect(obj).attrs.sha256.history.has_changes():
+            previous = _previous_digest(obj)
+            if previous:
+                deltas[previous] -= 1
+            if obj.sha256:
+                deltas[obj.sha256] += 1
+                sizes[obj.sha256] = obj.size
+    for obj in session.deleted:
+        if isinstance(obj, Document):
+            previous = _previous_digest(obj)
+            if previous:
+                deltas[previous] -= 1
+
+    if deltas:
+        orphans = apply_reference_deltas(session.connection(), deltas, sizes)
+        session.info.setdefault("orphan_blobs", set()).update(orphans)
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_orphan_blobs(session):
+    orphans = session.info.pop("orphan_blobs", None)
+    if orphans:
+        # Nouvelle vérification : le même contenu a pu être renvoyé entre-temps
+        bind = session.get_bind()
+        for digest in orphans:
+            remove_blob_if_unreferenced(bind, digest)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_orphan_blobs(session):
+    session.info.pop("orphan_blobs", None)
+
+
+# --- Migration des fichiers existants --------------------------------------------
+
+def dedup_existing_documents(connection):
+    """Range les fichiers existants dans le stockage par contenu et crée les compteurs.
+
+    Les fichiers d'origine ne sont supprimés qu'en dernier : une migration
+    interrompue les laisse intacts (les contenus déjà copiés seront réutilisés).
+    """
+    references = Counter()
+    sizes = {}
+    originals = []
+    rows = connection.execute(
+        select(documents_table.c.id, documents_table.c.file_path, documents_table.c.sha256)
+    ).all()
+    for document_id, path, digest in rows:
+        if digest and path == blob_path(digest) and os.path.exists(path):
+            references[digest] += 1
+            sizes[digest] = os.path.getsize(path)
+            continue
+        if not path or not os.path.exists(path):
+            logger.warning(f"Document {document_id} : fichier introuvable ({path}), laissé tel quel")
+            continue
+        digest = hash_file(path)
+        target = blob_path(digest)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copyfile(path, target)
+        sizes[digest] = os.path.getsize(target)
+        references[digest] += 1
+        connection.execute(
+            documents_table.update().where(documents_table.c.id == document_id)
+            .values(file_path=target, sha256=digest, size=sizes[digest])
+        )
+        originals.append(path)
+
+    for digest, count in references.items():
+        connection.execute(blobs_table.insert().values(
+            sha256=digest, size=sizes[digest], file_path=blob_path(digest), ref_count=count,
+        ))
+    for path in originals:
+        os.remove(path)
+    logger.info(f"{len(originals)} fichiers rangés dans {len(references)} contenus distincts")
+
+
+def restore_document_files(connection):
+    """Inverse de dedup_existing_documents : une copie du fichier par document"""
+    rows = connection.execute(
+        select(documents_table.c.id, documents_table.c.name, documents_table.c.file_path)
+        .where(documents_table.c.sha256.isnot(None))
+    ).all()
+    for document_id, name, path in rows:
+        if not os.path.exists(path):
+            continue
+        target = os.path.join(UPLOAD_DIRECTORY, f"{document_id}_{os.path.basename(name or 'fichier')}")
+        shutil.copyfile(path, target)
+        connection.execute(
+            documents_table.update().where(documents_table.c.id == document_id).values(file_path=target)
+        )
+    if os.path.isdir(BLOB_DIRECTORY):
+        shutil.rmtree(BLOB_DIRECTORY)
+
+
+# --- Maintenance ----------------------------------------------------------------
+
+def _expected_references(db):
+    return dict(
+        db.query(Document.sha256, func.count(Document.id))
+        .filter(Document.sha256.isnot(None))
+        .group_by(Document.sha256)
+        .all()
+    )
+
+
+def check_store(db):
+    """Liste les écarts entre compteurs, documents et fichiers (vide si cohérent)"""
+    expected = _expected_references(db)
+    actual = dict(db.query(DocumentBlob.sha256, DocumentBlob.ref_count).all())
+    problems = []
+    for digest in sorted(set(expected) | set(actual)):
+        if expected.get(digest, 0) != actual.get(digest, 0):
+            problems.append({"sha256": digest, "expected": expected.get(digest, 0), "actual": actual.get(digest, 0)})
+        elif not os.path.exists(blob_path(digest)):
+            problems.append({"sha256": digest, "missing_file": blob_path(digest)})
+    return problems
+
+
+def rebuild_references(db):
+    """Recalcule les compteurs à partir des documents.
+
+    Les lignes existantes sont mises à jour sur place : le texte extrait
+    (app.api.text_extraction) est conservé. Seuls les contenus sans document
+    sont supprimés, avec leur fichier et leurs aperçus.
+    """
+    expected = _expected_references(db)
+    actual = dict(db.query(DocumentBlob.sha256, DocumentBlob.ref_count).all())
+    missing = [digest for digest in expected if digest not in actual]
+    sizes = dict(
+        db.query(Document.sha256, func.max(Document.size))
+        .filter(Document.sha256.in_(missing))
+        .group_by(Document.sha256)
+        .all()
+    ) if missing else {}
+
+    for digest, count in expected.items():
+        if digest not in actual:
+            db.execute(blobs_table.insert().values(
+                sha256=digest, size=sizes.get(digest), file_path=blob_path(digest), ref_count=count,
+            ))
+        elif actual[digest] != count:
+            db.execute(blobs_table.update().where(blobs_table.c.sha256 == digest).values(ref_count=count))
+    orphans = [digest for digest in actual if digest not in expected]
+    if orphans:
+        db.execute(blobs_table.delete().where(blobs_table.c.sha256.in_(orphans)))
+    db.commit()
+    bind = db.get_bind()
+    for digest in orphans:
+        remove_blob_if_unreferenced(bind, digest)
+    return len(expected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance du stockage des documents")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            print(f"Compteurs recalculés : {rebuild_references(db)} contenus")
+            return 0
+        problems = check_store(db)
+        for problem in problems:
+            print(problem)
+        print(f"{len(problems)} écart(s)")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
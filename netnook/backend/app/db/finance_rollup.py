@@ -0,0 +1,218 @@
+"""Maintenance de la table finance_daily_rollup.
+
+Chaque écriture ORM sur une transaction (création, modification, suppression,
+y compris les suppressions en cascade depuis une facture ou un client) met à
+jour l'agrégat (jour, type, catégorie) dans la même transaction SQL.
+
+Commandes de maintenance :
+    python -m app.db.finance_rollup rebuild   # reconstruit la table depuis transactions
+    python -m app.db.finance_rollup check     # compare la table aux transactions
+"""
+from collections import defaultdict
+from datetime import datetime
+import argparse
+import logging
+import sys
+
+from sqlalchemy import event, func, and_, or_, inspect, literal_column
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.models.models import Transaction, FinanceDailyRollup
+
+logger = logging.getLogger(__name__)
+
+rollup_table = FinanceDailyRollup.__table__
+
+# Colonnes de Transaction qui influencent l'agrégat
+TRACKED_ATTRIBUTES = ("date", "type", "category", "amount")
+
+# Clé de l'index unique uq_finance_daily_rollup_key (catégorie NULL comprise)
+ROLLUP_KEY = (rollup_table.c.day, rollup_table.c.type, func.coalesce(rollup_table.c.category, literal_column("''")))
+
+
+def _key(day, transaction_type, category):
+    return (day, transaction_type, category)
+
+
+def _key_filter(key):
+    day, transaction_type, category = key
+    return and_(
+        rollup_table.c.day == day,
+        rollup_table.c.type == transaction_type,
+        rollup_table.c.category.is_(None) if category is None else rollup_table.c.category == category,
+    )
+
+
+def apply_deltas(connection, deltas):
+    """Applique des variations {(jour, type, catégorie): (montant, nombre)} à l'agrégat.
+
+    Utilisable directement par les chemins d'écriture qui ne passent pas par l'ORM
+    (insertions en masse, imports).
+    """
+    rows = [
+        {"day": day, "type": transaction_type, "category": category, "total": amount, "count": count}
+        for (day, transaction_type, category), (amount, count) in deltas.items()
+        if amount or count
+    ]
+    if not rows:
+        return
+    # Upsert : deux flush concurrents sur la même clé s'additionnent au lieu d'échouer
+    insert = (postgresql if connection.dialect.name == "postgresql" else sqlite).insert(rollup_table)
+    connection.execute(
+        insert.on_conflict_do_update(
+            index_elements=ROLLUP_KEY,
+            set_={"total": rollup_table.c.total + insert.excluded.total, "count": rollup_table.c.count + insert.excluded.count},
+        ),
+        rows,
+    )
+    # Les lignes vidées par une suppression ou un déplacement n'ont plus lieu d'être
+    emptied = [key for key, (_, count) in deltas.items() if count < 0]
+    if emptied:
+        connection.execute(
+            rollup_table.delete().where(rollup_table.c.count <= 0, or_(*[_key_filter(key) for key in emptied]))
+        )
+
+
+def deltas_for_rows(rows, sign=1):
+    """Calcule les variations pour des dictionnaires de transactions (date, type, category, amount)"""
+    deltas = defaultdict(lambda: [0.0, 0])
+    for row in rows:
+        if row.get("date") is None or row.get("type") is None:
+            continue
+        key = _key(row["date"].date(), row["type"], row.get("category"))
+        deltas[key][0] += sign * (row.get("amount") or 0)
+        deltas[key][1] += sign
+    return deltas
+
+
+def _previous_values(transaction):
+    """Valeurs des colonnes suivies telles qu'elles sont en base avant ce flush"""
+    state = inspect(transaction)
+    values = {}
+    for name in TRACKED_ATTRIBUTES:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            values[name] = getattr(transaction, name)
+    return values
+
+
+def _current_values(transaction):
+    return {name: getattr(transaction, name) for name in TRACKED_ATTRIBUTES}
+
+
+@event.listens_for(Session, "before_flush")
+def _track_transactions(session, flush_context, instances):
+    rows_added = []
+    rows_removed = []
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            # Fixer la date ici pour que l'agrégat et la ligne insérée soient d'accord
+            if obj.date is None:
+                obj.date = datetime.utcnow()
+            rows_added.append(_current_values(obj))
+
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj, include_collections=False):
+            previous = _previous_values(obj)
+            current = _current_values(obj)
+            if previous != current:
+                rows_removed.append(previous)
+                rows_added.append(current)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            rows_removed.append(_previous_values(obj))
+
+    if not rows_added and not rows_removed:
+        return
+
+    deltas = deltas_for_rows(rows_added)
+    for key, (amount, count) in deltas_for_rows(rows_removed, sign=-1).items():
+        deltas[key][0] += amount
+        deltas[key][1] += count
+    apply_deltas(session.connection(), deltas)
+
+
+def _aggregated_transactions(db):
+    return db.query(
+        func.date(Transaction.date).label("day"),
+        Transaction.type,
+        Transaction.category,
+        func.sum(Transaction.amount).label("total"),
+        func.count(Transaction.id).label("count"),
+    ).filter(Transaction.date.isnot(None)).group_by(
+        func.date(Transaction.date), Transaction.type, Transaction.category
+    )
+
+
+def rebuild_rollup(db):
+    """Reconstruit entièrement l'agrégat à partir de la table transactions"""
+    db.execute(rollup_table.delete())
+    select = _aggregated_transactions(db).statement
+    db.execute(
+        rollup_table.insert().from_select(["day", "type", "category", "total", "count"], select)
+    )
+    db.commit()
+    return db.query(func.count(FinanceDailyRollup.id)).scalar()
+
+
+def check_rollup(db, tolerance=0.005):
+    """Liste les écarts entre l'agrégat et les transactions (vide si cohérent)"""
+    expected = {}
+    for day, transaction_type, category, total, count in _aggregated_transactions(db).all():
+        if isinstance(day, str):
+            day = datetime.strptime(day, "%Y-%m-%d").date()
+        expected[_key(day, transaction_type, category)] = (float(total or 0), count)
+
+    actual = {
+        _key(r.day, r.type, r.category): (r.total, r.count)
+        for r in db.query(FinanceDailyRollup).all()
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1], k[2] or "")):
+        expected_total, expected_count = expected.get(key, (0.0, 0))
+        actual_total, actual_count = actual.get(key, (0.0, 0))
+        if expected_count != actual_count or abs(expected_total - actual_total) > tolerance:
+            mismatches.append({
+                "day": key[0].isoformat(),
+                "type": key[1],
+                "category": key[2],
+                "expected_total": expected_total,
+                "actual_total": actual_total,
+                "expected_count": expected_count,
+                "actual_count": actual_count,
+            })
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance de l'agrégat financier journalier")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rows = rebuild_rollup(db)
+            print(f"Agrégat reconstruit : {rows} lignes")
+            return 0
+        mismatches = check_rollup(db)
+        for mismatch in mismatches:
+            print(mismatch)
+        print(f"{len(mismatches)} écart(s) détecté(s)")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -1,18 +1,51 @@
 from alembic import command
 from alembic.config import Config
-from app.db.database import Base, engine
+from sqlalchemy import inspect
+from app.db.database import engine, SessionLocal
+from app.db import document_store, finance_rollup  # noqa: F401  (hooks de session)
 from app.models import models
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Révision correspondant au schéma créé par create_all avant l'introduction des migrations
+LEGACY_REVISION = "0001_initial_schema"
+
+def get_alembic_config():
+    """Configuration Alembic du backend, utilisable hors du répertoire courant."""
+    config = Config(os.path.join(BACKEND_DIRECTORY, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIRECTORY, "migrations"))
+    # Conserver la configuration du logging de l'application
+    config.attributes["configure_logger"] = False
+    return config
+
 def init_db():
-    """Initialise la base de données et crée les tables si elles n'existent pas."""
+    """Initialise la base de données et applique les migrations en attente."""
     try:
-        # Créer les tables
-        Base.metadata.create_all(bind=engine)
+        config = get_alembic_config()
+        tables = inspect(engine).get_table_names()
+        if "alembic_version" not in tables and "projects" in tables:
+            # Base créée par create_all : on la rattache à l'historique avant de migrer
+            logger.info(f"Base existante sans historique de migrations, marquage en {LEGACY_REVISION}")
+            command.stamp(config, LEGACY_REVISION)
+        command.upgrade(config, "head")
+        backfill_finance_rollup()
         logger.info("Base de données initialisée avec succès")
     except Exception as e:
         logger.error(f"Erreur lors de l'initialisation de la base de données: {e}")
         raise
+
+def backfill_finance_rollup():
+    """Remplit l'agrégat financier journalier s'il est vide alors que des transactions existent."""
+    db = SessionLocal()
+    try:
+        has_rollup = db.query(models.FinanceDailyRollup.id).first() is not None
+        has_transactions = db.query(models.Transaction.id).first() is not None
+        if has_transactions and not has_rollup:
+            rows = finance_rollup.rebuild_rollup(db)
+            logger.info(f"Agrégat financier journalier reconstruit ({rows} lignes)")
+    finally:
+        db.close()
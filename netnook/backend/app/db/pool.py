@@ -0,0 +1,171 @@
+"""Réglages et mesures des pools de connexions.
+
+Les paramètres viennent de l'environnement :
+    DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT (30 s),
+    DB_POOL_RECYCLE (1800 s, -1 pour désactiver), DB_POOL_PRE_PING (true)
+
+Avec plusieurs workers uvicorn, chaque processus a son propre pool : le total
+des connexions ouvertes est workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+
+Les compteurs (connexions ouvertes, emprunts, restitutions, invalidations) sont
+alimentés par les événements du pool ; le temps d'attente d'une connexion est
+mesuré autour de l'emprunt, qui n'a pas d'événement « avant ».
+"""
+from collections import deque
+from threading import Lock
+import os
+import time
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes", "on")
+
+# Nombre d'attentes conservées pour les percentiles
+WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.waits.append(seconds)
+            self.wait_max = max(self.wait_max, seconds)
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            counters = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+            }
+            wait_max = self.wait_max
+
+        def percentile(fraction):
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000, 3) if waits else 0.0
+
+        return {
+            **counters,
+            "wait_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99), "max": round(wait_max * 1000, 3)},
+        }
+
+
+class _MeasuredPoolMixin:
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.increment("timeouts")
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # dispose() recrée le pool : on garde les mêmes compteurs
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeasuredQueuePool(_MeasuredPoolMixin, QueuePool):
+    pass
+
+
+class MeasuredAsyncAdaptedQueuePool(_MeasuredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url, asynchronous=False):
+    """Arguments de create_engine / create_async_engine pour cette URL"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Base en mémoire : une seule connexion partagée, pas de pool à régler
+        return {}
+    return {
+        "poolclass": MeasuredAsyncAdaptedQueuePool if asynchronous else MeasuredQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+# Mesures par nom de moteur ("sync", "async")
+pool_metrics = {}
+
+
+def instrument_engine(engine, name):
+    """Branche les compteurs d'événements sur le pool du moteur (synchrone)"""
+    metrics = pool_metrics[name] = PoolMetrics()
+    engine.pool.metrics = metrics
+    event.listen(engine, "connect", lambda *args: metrics.increment("connects"))
+    event.listen(engine, "checkout", lambda *args: metrics.increment("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.increment("checkins"))
+    event.listen(engine, "invalidate", lambda *args: metrics.increment("invalidations"))
+    return metrics
+
+
+def pool_status(engine, name):
+    """État instantané du pool et mesures cumulées"""
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if name in pool_metrics:
+        status.update(pool_metrics[name].snapshot())
+    return status
+
+
+def check_database(engine):
+    """Exécute SELECT 1 ; retourne {ok, latency_ms} ou {ok: False, error}"""
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+async def check_database_async(async_engine):
+    start = time.perf_counter()
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
@@ -0,0 +1,390 @@
+"""Recherche indexée sur l'ensemble des entités.
+
+- PostgreSQL : index GIN pg_trgm sur la colonne de titre de chaque table (sert
+  les ILIKE '%terme%') et index GIN sur un tsvector titre + texte, classement
+  par similarity() / ts_rank.
+- SQLite : table virtuelle FTS5 (tokenizer trigram) alimentée par des triggers,
+  classement par bm25().
+
+Le texte extrait des documents (document_blobs.extracted_text) a son propre
+index : search_index_document_texts (FTS5, contenu externe) sur SQLite, index
+GIN tsvector sur PostgreSQL ; search_document_texts() y cherche avec extraits.
+
+Les paramètres `search` des endpoints de liste passent par search_filter(),
+qui s'appuie sur les mêmes index.
+"""
+import logging
+
+from sqlalchemy import Integer, func, literal, literal_column, or_, select, text, union_all
+
+from app.models.models import (
+    Project, Client, Task, Invoice, Transaction, Event, Document, DocumentBlob, Resource, InventoryItem
+)
+
+logger = logging.getLogger(__name__)
+
+# Longueur minimale pour que le tokenizer trigram puisse servir la recherche
+MIN_TRIGRAM_LENGTH = 3
+TS_CONFIG = "simple"
+
+
+class SearchEntity:
+    def __init__(self, code, model, title, body, path):
+        self.code = code
+        self.model = model
+        self.title = title
+        self.body = body
+        self.path = path
+
+    @property
+    def name(self):
+        return self.model.__tablename__
+
+    def tsvector_sql(self, prefix=None):
+        """Expression tsvector PostgreSQL, identique dans l'index et dans les requêtes"""
+        columns = [f"{prefix}.{c.key}" if prefix else c.key for c in (self.title, *self.body)]
+        document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+        return f"to_tsvector('{TS_CONFIG}', {document})"
+
+
+# Le code sert à calculer le rowid FTS5 (id * 16 + code) pour des mises à jour directes
+SEARCH_ENTITIES = [
+    SearchEntity(0, Project, Project.name, [Project.description], "/projects"),
+    SearchEntity(1, Client, Client.name, [Client.email, Client.notes], "/clients"),
+    SearchEntity(2, Task, Task.title, [Task.description], "/tasks"),
+    SearchEntity(3, Invoice, Invoice.invoice_number, [Invoice.notes], "/finance/invoices"),
+    SearchEntity(4, Transaction, Transaction.description, [Transaction.category], "/finance/transactions"),
+    SearchEntity(5, Document, Document.name, [], "/documents"),
+    SearchEntity(6, Event, Event.title, [Event.description, Event.location], "/planning/events"),
+    SearchEntity(7, Resource, Resource.name, [Resource.description], "/resources"),
+    SearchEntity(8, InventoryItem, InventoryItem.name, [InventoryItem.description, InventoryItem.category], "/inventory"),
+]
+SEARCH_ENTITIES_BY_MODEL = {entity.model: entity for entity in SEARCH_ENTITIES}
+SEARCH_ENTITIES_BY_NAME = {entity.name: entity for entity in SEARCH_ENTITIES}
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+# --- Installation des index -------------------------------------------------
+
+# Disponibilité de pg_trgm par URL de base de données
+_trigram_support = {}
+
+
+def _sqlite_row_values(entity, prefix):
+    body = " || ' ' || ".join(f"coalesce({prefix}.{column.key}, '')" for column in entity.body) or "''"
+    return (
+        f"{prefix}.id * 16 + {entity.code}, '{entity.name}', {prefix}.id, "
+        f"coalesce({prefix}.{entity.title.key}, ''), {body}"
+    )
+
+
+def _install_sqlite(connection):
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+    ).first()
+    connection.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "entity UNINDEXED, entity_id UNINDEXED, title, body, tokenize = 'trigram')"
+    ))
+    for entity in SEARCH_ENTITIES:
+        table = entity.name
+        insert = (
+            "INSERT INTO search_index(rowid, entity, entity_id, title, body) "
+            f"VALUES ({_sqlite_row_values(entity, 'new')});"
+        )
+        delete = f"DELETE FROM search_index WHERE rowid = old.id * 16 + {entity.code};"
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_ai AFTER INSERT ON {table} BEGIN {insert} END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_ad AFTER DELETE ON {table} BEGIN {delete} END"
+        ))
+        if not exists:
+            connection.execute(text(
+                "INSERT INTO search_index(rowid, entity, entity_id, title, body) "
+                f"SELECT {_sqlite_row_values(entity, table)} FROM {table}"
+            ))
+
+
+def _install_postgresql(connection):
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        logger.warning(f"Extension pg_trgm indisponible, index trigram non créés: {e}")
+
+    has_trigram = _has_trigram(connection)
+    for entity in SEARCH_ENTITIES:
+        table = entity.name
+        if has_trigram:
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{entity.title.key}_trgm "
+                f"ON {table} USING gin ({entity.title.key} gin_trgm_ops)"
+            ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search_tsv "
+            f"ON {table} USING gin ({entity.tsvector_sql()})"
+        ))
+
+
+def install_search_index(connection):
+    """Crée les index de recherche propres au moteur (migration 0004_search_indexes)"""
+    if connection.dialect.name == "sqlite":
+        _install_sqlite(connection)
+    elif connection.dialect.name == "postgresql":
+        _install_postgresql(connection)
+    _trigram_support.clear()
+
+
+def uninstall_search_index(connection):
+    if connection.dialect.name == "sqlite":
+        for entity in SEARCH_ENTITIES:
+            for suffix in ("ai", "au", "ad"):
+                connection.execute(text(f"DROP TRIGGER IF EXISTS search_{entity.name}_{suffix}"))
+        connection.execute(text("DROP TABLE IF EXISTS search_index"))
+    elif connection.dialect.name == "postgresql":
+        for entity in SEARCH_ENTITIES:
+            connection.execute(text(f"DROP INDEX IF EXISTS ix_{entity.name}_{entity.title.key}_trgm"))
+            connection.execute(text(f"DROP INDEX IF EXISTS ix_{entity.name}_search_tsv"))
+    _trigram_support.clear()
+
+
+def _has_trigram(connection):
+    key = str(connection.engine.url)
+    if key not in _trigram_support:
+        _trigram_support[key] = connection.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _trigram_support[key]
+
+
+# Texte extrait des documents : index à part, le texte étant partagé par
+# contenu (document_blobs) et non par document
+DOCUMENT_TEXT_TSVECTOR = f"to_tsvector('{TS_CONFIG}', coalesce(extracted_text, ''))"
+
+
+def install_document_text_index(connection):
+    """Index du texte extrait des documents (migration 0008_document_text)"""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index_document_texts USING fts5("
+            "extracted_text, content = 'document_blobs', content_rowid = 'id', tokenize = 'trigram')"
+        ))
+        # Table à contenu externe : la suppression doit redonner l'ancien texte
+        delete = (
+            "INSERT INTO search_index_document_texts(search_index_document_texts, rowid, extracted_text) "
+            "VALUES ('delete', old.id, old.extracted_text);"
+        )
+        insert = "INSERT INTO search_index_document_texts(rowid, extracted_text) VALUES (new.id, new.extracted_text);"
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_document_texts_ai AFTER INSERT ON document_blobs "
+            f"WHEN new.extracted_text IS NOT NULL BEGIN {insert} END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_document_texts_ad AFTER DELETE ON document_blobs "
+            f"WHEN old.extracted_text IS NOT NULL BEGIN {delete} END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_document_texts_aud AFTER UPDATE OF extracted_text ON document_blobs "
+            f"WHEN old.extracted_text IS NOT NULL BEGIN {delete} END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_document_texts_aui AFTER UPDATE OF extracted_text ON document_blobs "
+            f"WHEN new.extracted_text IS NOT NULL BEGIN {insert} END"
+        ))
+        connection.execute(text(
+            "INSERT INTO search_index_document_texts(search_index_document_texts) VALUES ('rebuild')"
+        ))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_document_blobs_text_search_tsv "
+            f"ON document_blobs USING gin ({DOCUMENT_TEXT_TSVECTOR})"
+        ))
+
+
+def uninstall_document_text_index(connection):
+    if connection.dialect.name == "sqlite":
+        for suffix in ("ai", "ad", "aud", "aui"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS search_document_texts_{suffix}"))
+        connection.execute(text("DROP TABLE IF EXISTS search_index_document_texts"))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_document_blobs_text_search_tsv"))
+
+
+# --- Requêtes ---------------------------------------------------------------
+
+def search_filter(db, model, term):
+    """Critère SQL pour le paramètre `search` d'un endpoint de liste (colonne de titre)"""
+    entity = SEARCH_ENTITIES_BY_MODEL[model]
+    if db.bind.dialect.name == "sqlite" and len(term) >= MIN_TRIGRAM_LENGTH:
+        matches = text(
+            "SELECT entity_id FROM search_index WHERE search_index MATCH :search_match AND entity = :search_entity"
+        ).bindparams(search_match=f"title : {_fts_phrase(term)}", search_entity=entity.name)
+        return model.id.in_(matches.columns(entity_id=Integer))
+    # PostgreSQL : ILIKE servi par l'index GIN pg_trgm de la colonne
+    return entity.title.ilike(_like_pattern(term), escape="\\")
+
+
+def _search_sqlite(db, term, entities, limit):
+    params = {"limit": limit}
+    entity_filter = ""
+    if entities:
+        names = [f":entity_{i}" for i in range(len(entities))]
+        entity_filter = f" AND entity IN ({', '.join(names)})"
+        params.update({f"entity_{i}": entity.name for i, entity in enumerate(entities)})
+
+    if len(term) >= MIN_TRIGRAM_LENGTH:
+        params["match"] = _fts_phrase(term)
+        sql = (
+            "SELECT entity, entity_id, title, snippet(search_index, 3, '[', ']', '…', 12) AS snippet, "
+            "-bm25(search_index, 0.0, 0.0, 10.0, 1.0) AS score "
+            "FROM search_index WHERE search_index MATCH :match" + entity_filter +
+            " ORDER BY bm25(search_index, 0.0, 0.0, 10.0, 1.0) LIMIT :limit"
+        )
+    else:
+        # Terme trop court pour les trigrammes : parcours de l'index plein texte
+        params["pattern"] = _like_pattern(term)
+        sql = (
+            "SELECT entity, entity_id, title, NULL AS snippet, "
+            "CASE WHEN title LIKE :pattern ESCAPE '\\' THEN 1.0 ELSE 0.5 END AS score "
+            "FROM search_index WHERE (title LIKE :pattern ESCAPE '\\' OR body LIKE :pattern ESCAPE '\\')"
+            + entity_filter + " ORDER BY score DESC, entity_id DESC LIMIT :limit"
+        )
+    return db.execute(text(sql), params).all()
+
+
+def _search_postgresql(db, term, entities, limit):
+    has_trigram = _has_trigram(db.connection())
+    tsquery = func.plainto_tsquery(TS_CONFIG, term)
+    pattern = _like_pattern(term)
+
+    selects = []
+    for entity in entities:
+        tsvector = literal_column(entity.tsvector_sql(entity.name))
+        rank = func.ts_rank(tsvector, tsquery)
+        if has_trigram:
+            rank = func.greatest(func.similarity(entity.title, term), rank)
+        selects.append(
+            select(
+                literal(entity.name).label("entity"),
+                entity.model.id.label("entity_id"),
+                entity.title.label("title"),
+                literal(None).label("snippet"),
+                rank.label("score"),
+            ).where(or_(entity.title.ilike(pattern, escape="\\"), tsvector.op("@@")(tsquery)))
+        )
+    results = union_all(*selects).subquery()
+    return db.execute(
+        select(results).order_by(results.c.score.desc()).limit(limit)
+    ).all()
+
+
+def _search_generic(db, term, entities, limit):
+    pattern = _like_pattern(term)
+    selects = [
+        select(
+            literal(entity.name).label("entity"),
+            entity.model.id.label("entity_id"),
+            entity.title.label("title"),
+            literal(None).label("snippet"),
+            literal(1.0).label("score"),
+        ).where(entity.title.ilike(pattern, escape="\\"))
+        for entity in entities
+    ]
+    return db.execute(union_all(*selects).limit(limit)).all()
+
+
+def global_search(db, term, entity_names=None, limit=20):
+    """Recherche classée sur toutes les entités (ou celles demandées)"""
+    entities = [SEARCH_ENTITIES_BY_NAME[name] for name in entity_names] if entity_names else SEARCH_ENTITIES
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        rows = _search_sqlite(db, term, entity_names and entities, limit)
+    elif dialect == "postgresql":
+        rows = _search_postgresql(db, term, entities, limit)
+    else:
+        rows = _search_generic(db, term, entities, limit)
+
+    return [
+        {
+            "entity": entity,
+            "id": entity_id,
+            "title": title,
+            "snippet": (snippet or "").strip() or None,
+            "score": float(score or 0),
+            "url": f"{SEARCH_ENTITIES_BY_NAME[entity].path}/{entity_id}",
+        }
+        for entity, entity_id, title, snippet, score in rows
+    ]
+
+
+def search_document_texts(db, term, project_id=None, limit=20):
+    """Documents dont le texte extrait contient `term`, classés, avec un extrait"""
+    dialect = db.bind.dialect.name
+    params = {"limit": limit}
+    project_filter = ""
+    if project_id is not None:
+        project_filter = " AND d.project_id = :project_id"
+        params["project_id"] = project_id
+
+    if dialect == "sqlite" and len(term) >= MIN_TRIGRAM_LENGTH:
+        params["match"] = _fts_phrase(term)
+        sql = (
+            "SELECT d.id, d.name, d.project_id, d.file_type, "
+            "snippet(search_index_document_texts, 0, '[', ']', '…', 64) AS snippet, "
+            "-bm25(search_index_document_texts) AS score "
+            "FROM search_index_document_texts "
+            "JOIN document_blobs b ON b.id = search_index_document_texts.rowid "
+            "JOIN documents d ON d.sha256 = b.sha256 "
+            "WHERE search_index_document_texts MATCH :match" + project_filter +
+            " ORDER BY bm25(search_index_document_texts), d.id DESC LIMIT :limit"
+        )
+    elif dialect == "postgresql":
+        # ts_headline relit le texte : calculé seulement pour les lignes retenues
+        params["term"] = term
+        sql = (
+            "SELECT m.id, m.name, m.project_id, m.file_type, "
+            f"ts_headline('{TS_CONFIG}', b.extracted_text, plainto_tsquery('{TS_CONFIG}', :term), "
+            "'StartSel=[, StopSel=], MaxWords=24, MinWords=8, MaxFragments=1') AS snippet, m.score "
+            "FROM (SELECT d.id, d.name, d.project_id, d.file_type, b.id AS blob_id, "
+            f"ts_rank({DOCUMENT_TEXT_TSVECTOR}, "
+            f"plainto_tsquery('{TS_CONFIG}', :term)) AS score "
+            "FROM document_blobs b JOIN documents d ON d.sha256 = b.sha256 "
+            f"WHERE {DOCUMENT_TEXT_TSVECTOR} "
+            f"@@ plainto_tsquery('{TS_CONFIG}', :term)" + project_filter +
+            " ORDER BY score DESC, d.id DESC LIMIT :limit) m "
+            "JOIN document_blobs b ON b.id = m.blob_id ORDER BY m.score DESC, m.id DESC"
+        )
+    else:
+        # Terme trop court pour les trigrammes, ou autre moteur : parcours du texte
+        params["pattern"] = _like_pattern(term)
+        sql = (
+            "SELECT d.id, d.name, d.project_id, d.file_type, NULL AS snippet, 1.0 AS score "
+            "FROM document_blobs b JOIN documents d ON d.sha256 = b.sha256 "
+            "WHERE b.extracted_text LIKE :pattern ESCAPE '\\'" + project_filter +
+            " ORDER BY d.id DESC LIMIT :limit"
+        )
+
+    return [
+        {
+            "id": document_id,
+            "name": name,
+            "project_id": document_project_id,
+            "file_type": file_type,
+            "snippet": (snippet or "").strip() or None,
+            "score": float(score or 0),
+            "url": f"/documents/{document_id}",
+        }
+        for document_id, name, document_project_id, file_type, snippet, score in db.execute(text(sql), params).all()
+    ]
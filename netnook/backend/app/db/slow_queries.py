@@ -0,0 +1,243 @@
+"""Journal des requêtes SQL lentes, avec plan d'exécution.
+
+Au-delà de SLOW_QUERY_THRESHOLD_MS (500 ms par défaut, négatif pour
+désactiver), une requête est journalisée sous forme normalisée (littéraux et
+listes IN remplacés), avec la forme de ses paramètres — types et tailles,
+jamais les valeurs — et la route HTTP d'origine. Les requêtes sont agrégées
+par empreinte de la forme normalisée pour GET /admin/slow-queries.
+
+Le plan (EXPLAIN, ou EXPLAIN ANALYZE pour les SELECT sur PostgreSQL si
+SLOW_QUERY_EXPLAIN_ANALYZE=true) est capturé par un thread dédié, sur une
+connexion séparée du moteur synchrone : la requête lente n'attend pas son
+EXPLAIN. Cette connexion porte l'option SKIP_INSTRUMENTATION : l'EXPLAIN (qui
+exécute la requête avec ANALYZE) n'est ni journalisé ici ni compté dans les
+métriques SQL. Une même empreinte n'est réexpliquée qu'après
+SLOW_QUERY_EXPLAIN_INTERVAL secondes (600 par défaut).
+"""
+from collections import Counter
+from hashlib import sha1
+from queue import Full, Queue
+from threading import Lock, Thread
+import logging
+import os
+import re
+import time
+
+from sqlalchemy import event
+
+from app.core.metrics import SKIP_INSTRUMENTATION, current_route, is_instrumented
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "false").lower() in ("1", "true", "yes", "on")
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "600"))
+# Empreintes conservées ; au-delà, la moins coûteuse (temps cumulé) est oubliée
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+# EXPLAIN en attente au-delà duquel les nouvelles demandes sont ignorées
+EXPLAIN_QUEUE_SIZE = 100
+MAX_STATEMENT_LENGTH = 4000
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+_IN_LIST = re.compile(r"\bIN\s*\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_DOLLAR_PARAMETER = re.compile(r"\$(\d+)")
+
+
+def normalize_statement(statement):
+    """Forme normalisée : littéraux remplacés par ?, listes IN et VALUES multiples réduites"""
+    normalized = " ".join(statement.split())
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_LIST.sub(r"VALUES \1, ...", normalized)
+    return normalized
+
+
+def fingerprint(normalized):
+    return sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _value_shape(value):
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameters_shape(parameters, executemany=False):
+    """Types (et tailles) des paramètres, sans leurs valeurs"""
+    if executemany:
+        rows = list(parameters or [])
+        first = parameters_shape(rows[0]) if rows else None
+        return {"rows": len(rows), "row": first}
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return None
+
+
+class SlowQueryRecorder:
+    def __init__(self, threshold_ms=SLOW_QUERY_THRESHOLD_MS, max_fingerprints=SLOW_QUERY_MAX_FINGERPRINTS):
+        self.threshold_ms = threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self.explain_engine = None
+        self._entries = {}
+        self._lock = Lock()
+        self._queue = Queue(EXPLAIN_QUEUE_SIZE)
+        self._worker = None
+
+    @property
+    def enabled(self):
+        return self.threshold_ms >= 0
+
+    def instrument(self, engine, name):
+        """Mesure les requêtes du moteur (synchrone, ou sync_engine d'un moteur async)"""
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            context._slow_query_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            if not is_instrumented(conn):
+                return
+            elapsed_ms = (time.perf_counter() - context._slow_query_start) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                self.record(conn.dialect, statement, parameters, executemany, elapsed_ms, name)
+
+    def record(self, dialect, statement, parameters, executemany, elapsed_ms, engine_name="sync"):
+        normalized = normalize_statement(statement)[:MAX_STATEMENT_LENGTH]
+        key = fingerprint(normalized)
+        route = current_route()
+        shape = parameters_shape(parameters, executemany)
+        logger.warning(
+            f"Requête lente {elapsed_ms:.0f} ms [{route or 'hors requête'}] {key}: {normalized} paramètres={shape}"
+        )
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    cheapest = min(self._entries, key=lambda k: self._entries[k]["total_ms"])
+                    del self._entries[cheapest]
+                entry = self._entries[key] = {
+                    "fingerprint": key,
+                    "statement": normalized,
+                    "engine": engine_name,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": Counter(),
+                    "parameters": shape,
+                    "first_seen": now,
+                    "last_seen": now,
+                    "plan": None,
+                    "plan_captured_at": None,
+                    "_explain_requested_at": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["routes"][route or "hors requête"] += 1
+            entry["parameters"] = shape
+            entry["last_seen"] = now
+            requested = entry["_explain_requested_at"]
+            should_explain = (
+                not executemany
+                and normalized.lstrip("( ").upper().startswith(EXPLAINABLE)
+                and (requested is None or now - requested >= SLOW_QUERY_EXPLAIN_INTERVAL)
+            )
+            if should_explain:
+                entry["_explain_requested_at"] = now
+
+        if should_explain:
+            self._request_explain(key, dialect.name, dialect.paramstyle, statement, parameters)
+
+    def _request_explain(self, key, dialect_name, paramstyle, statement, parameters):
+        if self.explain_engine is None:
+            return
+        try:
+            self._queue.put_nowait((key, dialect_name, paramstyle, statement, parameters))
+        except Full:
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = Thread(target=self._explain_loop, name="slow-query-explain", daemon=True)
+            self._worker.start()
+
+    def _explain_loop(self):
+        while True:
+            key, dialect_name, paramstyle, statement, parameters = self._queue.get()
+            try:
+                plan = explain_statement(self.explain_engine, dialect_name, paramstyle, statement, parameters)
+            except Exception as e:
+                plan = f"EXPLAIN impossible : {type(e).__name__}: {e}"
+            logger.warning(f"Plan de la requête lente {key}:\n{plan}")
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["plan"] = plan
+                    entry["plan_captured_at"] = time.time()
+
+    def top(self, limit=20, order="total_ms"):
+        """Empreintes les plus coûteuses (order : total_ms, max_ms ou count)"""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry[order], reverse=True)[:limit]
+            return [
+                {
+                    **{name: value for name, value in entry.items() if not name.startswith("_")},
+                    "total_ms": round(entry["total_ms"], 3),
+                    "max_ms": round(entry["max_ms"], 3),
+                    "mean_ms": round(entry["total_ms"] / entry["count"], 3),
+                    "routes": dict(entry["routes"].most_common(5)),
+                }
+                for entry in entries
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _to_pyformat(statement, parameters):
+    """Requête asyncpg ($1, $2…) vers le format du pilote synchrone (%s)"""
+    order = []
+
+    def replace(match):
+        order.append(int(match.group(1)) - 1)
+        return "%s"
+
+    converted = _DOLLAR_PARAMETER.sub(replace, statement.replace("%", "%%"))
+    return converted, tuple(parameters[index] for index in order)
+
+
+def explain_statement(engine, dialect_name, paramstyle, statement, parameters):
+    """Plan d'exécution de `statement`, sur une connexion du moteur synchrone"""
+    with engine.connect().execution_options(**{SKIP_INSTRUMENTATION: True}) as connection:
+        if dialect_name == "postgresql":
+            if paramstyle == "numeric_dollar":
+                statement, parameters = _to_pyformat(statement, parameters)
+            analyze = SLOW_QUERY_EXPLAIN_ANALYZE and statement.lstrip("( ").upper().startswith(("SELECT", "WITH"))
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+            # ANALYZE exécute la requête : transaction annulée dans tous les cas
+            with connection.begin() as transaction:
+                rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+                transaction.rollback()
+            return "\n".join(row[0] for row in rows)
+        if dialect_name == "sqlite":
+            rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            return "\n".join(row[-1] for row in rows)
+        rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+        return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+recorder = SlowQueryRecorder()
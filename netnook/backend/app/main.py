@@ -1,10 +1,19 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from anyio import to_thread
 import uvicorn
+import os
 from app.db.init_db import init_db
-from app.db.database import get_db
+from app.db.database import get_db, engine, async_engine
+from app.db.pool import check_database, check_database_async, pool_status
 from app.api.api import api_router
+from app.api.text_extraction import pipeline as text_extraction
+from app.api.previews import pipeline as previews
+from app.core.cache import analytics_cache
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.compression import CompressionMiddleware
 import logging
 
 # Configuration du logging
@@ -14,6 +23,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Taille du threadpool des chemins encore synchrones (endpoints def, dépendances, flux)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
 app = FastAPI(
     title="Netnook API",
     description="API pour la plateforme ERP Netnook",
@@ -27,8 +39,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "X-Cache-Age", "X-Next-Cursor", "ETag", "Content-Range", "Accept-Ranges", "Content-Disposition"],
 )
 
+# Compression brotli / gzip des réponses volumineuses (voir app.core.compression)
+app.add_middleware(CompressionMiddleware)
+
+# Mesures par route (dernier ajouté : englobe CORS et les gestionnaires d'erreurs)
+app.add_middleware(MetricsMiddleware)
+
 # Inclure les routes API
 app.include_router(api_router)
 
@@ -36,11 +55,23 @@ app.include_router(api_router)
 async def startup_event():
     """Initialise la base de données au démarrage de l'application."""
     logger.info("Démarrage de l'application...")
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     try:
         init_db()
         logger.info("Base de données initialisée avec succès")
     except Exception as e:
         logger.error(f"Erreur lors de l'initialisation de la base de données: {e}")
+        return
+    # Extraction du texte des documents : reprise des contenus en attente
+    text_extraction.start()
+    await text_extraction.resume()
+    # Aperçus : générés après upload, ou à la première demande
+    previews.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await text_extraction.stop()
+    await previews.stop()
 
 @app.get("/")
 async def root():
@@ -50,5 +81,41 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Vérifie l'accès à la base et expose l'état des pools de connexions."""
+    checks = {"database": await run_in_threadpool(check_database, engine)}
+    pools = {"sync": pool_status(engine, "sync")}
+    if async_engine is not None:
+        checks["database_async"] = await check_database_async(async_engine)
+        pools["async"] = pool_status(async_engine.sync_engine, "async")
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "unavailable", "checks": checks, "pools": pools},
+    )
+
+@registry.add_collector
+def _runtime_metrics():
+    """Valeurs instantanées, relevées seulement à la lecture de /metrics"""
+    pools = {"sync": pool_status(engine, "sync")}
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.sync_engine, "async")
+    return [
+        ("db_pool_checked_out", "gauge", "Connexions empruntées au pool",
+         [({"pool": name}, status.get("checked_out", 0)) for name, status in pools.items()]),
+        ("db_pool_checkout_timeouts_total", "counter", "Attentes de connexion abandonnées",
+         [({"pool": name}, status.get("timeouts", 0)) for name, status in pools.items()]),
+        ("analytics_cache_requests_total", "counter", "Lectures du cache analytique",
+         [({"result": "hit"}, analytics_cache.hits), ({"result": "miss"}, analytics_cache.misses)]),
+        ("background_jobs_in_flight", "gauge", "Travaux de fond en cours",
+         [({"pipeline": "text_extraction"}, text_extraction.in_flight), ({"pipeline": "previews"}, previews.in_flight)]),
+    ]
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Mesures au format texte Prometheus."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Text, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_projects_name_id", "name", "id"),
+        Index("ix_projects_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_projects_status", "status"),
+        Index("ix_projects_client_id", "client_id"),
+        Index("ix_projects_end_date", "end_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -24,6 +33,11 @@ class Project(Base):
 
 class Client(Base):
     __tablename__ = "clients"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_clients_name_id", "name", "id"),
+        Index("ix_clients_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -40,6 +54,15 @@ class Client(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_tasks_title_id", "title", "id"),
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_tasks_project_id_status", "project_id", "status"),
+        Index("ix_tasks_status", "status"),
+        Index("ix_tasks_priority", "priority"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
@@ -56,6 +79,14 @@ class Task(Base):
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_invoices_issue_date_id", "issue_date", "id"),
+        Index("ix_invoices_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_invoices_client_id_status", "client_id", "status"),
+        Index("ix_invoices_status_amount", "status", "amount"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String(50), unique=True, nullable=False)
@@ -75,6 +106,17 @@ class Invoice(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_transactions_date_id", "date", "id"),
+        Index("ix_transactions_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_transactions_invoice_id", "invoice_id"),
+        Index("ix_transactions_type_category", "type", "category"),
+        Index("ix_transactions_category", "category"),
+        # Dédoublonnage des imports de relevés bancaires
+        Index("ix_transactions_import_hash", "import_hash", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True)
@@ -83,14 +125,41 @@ class Transaction(Base):
     category = Column(String(50), nullable=True)
     description = Column(Text, nullable=True)
     date = Column(DateTime, default=datetime.utcnow)
+    import_hash = Column(String(64), nullable=True)  # Empreinte de la ligne de relevé importée
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relations
     invoice = relationship("Invoice", back_populates="transactions")
 
+class FinanceDailyRollup(Base):
+    """Agrégat journalier des transactions, maintenu à chaque écriture (voir app.db.finance_rollup)"""
+    __tablename__ = "finance_daily_rollup"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    type = Column(String(50), nullable=False)
+    category = Column(String(50), nullable=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+# Clé unique de l'agrégat : coalesce pour qu'une catégorie NULL entre en conflit (upsert)
+Index(
+    "uq_finance_daily_rollup_key",
+    FinanceDailyRollup.day, FinanceDailyRollup.type, func.coalesce(FinanceDailyRollup.category, ""),
+    unique=True,
+)
+
 class Event(Base):
     __tablename__ = "events"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_events_start_date_id", "start_date", "id"),
+        Index("ix_events_title_id", "title", "id"),
+        Index("ix_events_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_events_end_date", "end_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
@@ -104,12 +173,21 @@ class Event(Base):
 
 class Document(Base):
     __tablename__ = "documents"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_documents_name_id", "name", "id"),
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_documents_project_id", "project_id"),
+        Index("ix_documents_sha256", "sha256"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     file_path = Column(String(255), nullable=False)
     file_type = Column(String(50), nullable=True)
     size = Column(Integer, nullable=True)  # Taille en octets
+    sha256 = Column(String(64), nullable=True)  # Empreinte du contenu, calculée à l'upload
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -117,8 +195,34 @@ class Document(Base):
     # Relations
     project = relationship("Project", back_populates="documents")
 
+class DocumentBlob(Base):
+    """Contenu stocké une seule fois, partagé par les documents de même SHA-256 (voir app.db.document_store)"""
+    __tablename__ = "document_blobs"
+    __table_args__ = (Index("ix_document_blobs_extraction_status", "extraction_status"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, unique=True)
+    size = Column(Integer, nullable=True)
+    file_path = Column(String(255), nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    # Texte extrait en tâche de fond (voir app.api.text_extraction) :
+    # pending, done, unsupported ou failed
+    extraction_status = Column(String(20), nullable=False, default="pending", server_default="pending")
+    extracted_text = Column(Text, nullable=True)
+    extraction_error = Column(String(255), nullable=True)
+    extracted_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Resource(Base):
     __tablename__ = "resources"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_resources_name_id", "name", "id"),
+        Index("ix_resources_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_resources_type_availability", "type", "availability"),
+        Index("ix_resources_availability", "availability"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -130,6 +234,14 @@ class Resource(Base):
 
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
+    # Index des tris de pagination par curseur (colonne, id)
+    __table_args__ = (
+        Index("ix_inventory_items_name_id", "name", "id"),
+        Index("ix_inventory_items_created_at_id", "created_at", "id"),
+        # Index des filtres et agrégations émis par les endpoints
+        Index("ix_inventory_items_category", "category"),
+        Index("ix_inventory_items_quantity", "quantity"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
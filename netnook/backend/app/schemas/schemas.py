@@ -18,6 +18,9 @@ class ProjectCreate(ProjectBase):
 class ProjectUpdate(ProjectBase):
     name: Optional[str] = None
     
+class ProjectBulkUpdate(ProjectUpdate):
+    id: int
+
 class Project(ProjectBase):
     id: int
     created_at: datetime
@@ -40,6 +43,9 @@ class ClientCreate(ClientBase):
 class ClientUpdate(ClientBase):
     name: Optional[str] = None
     
+class ClientBulkUpdate(ClientUpdate):
+    id: int
+
 class Client(ClientBase):
     id: int
     created_at: datetime
@@ -64,6 +70,9 @@ class TaskUpdate(TaskBase):
     title: Optional[str] = None
     project_id: Optional[int] = None
     
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
 class Task(TaskBase):
     id: int
     created_at: datetime
@@ -91,6 +100,9 @@ class InvoiceUpdate(InvoiceBase):
     client_id: Optional[int] = None
     amount: Optional[float] = None
     
+class InvoiceBulkUpdate(InvoiceUpdate):
+    id: int
+
 class Invoice(InvoiceBase):
     id: int
     created_at: datetime
@@ -115,6 +127,9 @@ class TransactionUpdate(TransactionBase):
     amount: Optional[float] = None
     type: Optional[str] = None
     
+class TransactionBulkUpdate(TransactionUpdate):
+    id: int
+
 class Transaction(TransactionBase):
     id: int
     created_at: datetime
@@ -139,6 +154,9 @@ class EventUpdate(EventBase):
     title: Optional[str] = None
     start_date: Optional[datetime] = None
     
+class EventBulkUpdate(EventUpdate):
+    id: int
+
 class Event(EventBase):
     id: int
     created_at: datetime
@@ -158,12 +176,19 @@ class DocumentBase(BaseModel):
 class DocumentCreate(DocumentBase):
     pass
 
-class DocumentUpdate(DocumentBase):
+# file_path n'est pas modifiable : il est déterminé par le contenu stocké
+class DocumentUpdate(BaseModel):
     name: Optional[str] = None
-    file_path: Optional[str] = None
+    file_type: Optional[str] = None
+    size: Optional[int] = None
+    project_id: Optional[int] = None
     
+class DocumentBulkUpdate(DocumentUpdate):
+    id: int
+
 class Document(DocumentBase):
     id: int
+    sha256: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -184,6 +209,9 @@ class ResourceUpdate(ResourceBase):
     name: Optional[str] = None
     type: Optional[str] = None
     
+class ResourceBulkUpdate(ResourceUpdate):
+    id: int
+
 class Resource(ResourceBase):
     id: int
     created_at: datetime
@@ -206,6 +234,9 @@ class InventoryItemCreate(InventoryItemBase):
 class InventoryItemUpdate(InventoryItemBase):
     name: Optional[str] = None
     
+class InventoryItemBulkUpdate(InventoryItemUpdate):
+    id: int
+
 class InventoryItem(InventoryItemBase):
     id: int
     created_at: datetime
@@ -213,3 +244,27 @@ class InventoryItem(InventoryItemBase):
     
     class Config:
         orm_mode = True
+
+
+# Bulk schemas
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # created, updated, deleted, not_found
+
+class BulkResult(BaseModel):
+    count: int
+    results: List[BulkItemResult]
+
+
+# Batch schemas
+class BatchRequestItem(BaseModel):
+    path: str  # chemin et chaîne de requête, ex. /projects/?limit=5
+    id: Optional[str] = None
+    headers: Dict[str, str] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem]
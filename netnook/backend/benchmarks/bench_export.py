@@ -0,0 +1,154 @@
+"""Mesure la mémoire des exports en flux /finance/transactions/export.
+
+    cd backend
+    python -m benchmarks.bench_export --rows 1000000
+    python -m benchmarks.bench_export --rows 200000 --compare-list
+
+L'application est appelée directement en ASGI et le corps de la réponse est
+consommé au fil de l'eau (le TestClient mettrait toute la réponse en mémoire).
+Le pic de RSS est échantillonné pendant la requête et rapporté à la mémoire
+de départ. --compare-list mesure aussi l'ancienne méthode : une seule page
+GET /finance/transactions?limit=<rows>.
+
+Sans --database-url, une base SQLite temporaire est utilisée.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark mémoire des exports CSV / NDJSON")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Nombre de transactions générées")
+    parser.add_argument("--database-url", default=None, help="Base cible (par défaut SQLite temporaire)")
+    parser.add_argument("--compare-list", action="store_true", help="Mesurer aussi l'endpoint de liste avec limit=<rows>")
+    return parser.parse_args(argv)
+
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRss:
+    """Échantillonne la RSS du processus toutes les 5 ms"""
+
+    def __enter__(self):
+        self.baseline = self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def seed_transactions(engine, rows):
+    from sqlalchemy import insert
+    from app.models.models import Transaction
+
+    start = datetime(2025, 1, 1)
+    batch = 10_000
+    with engine.begin() as connection:
+        for offset in range(0, rows, batch):
+            connection.execute(insert(Transaction), [
+                {
+                    "amount": round(10 + (i % 997) * 1.5, 2),
+                    "type": "Revenu" if i % 3 else "Dépense",
+                    "category": f"Catégorie {i % 20}",
+                    "description": f"Opération {i}",
+                    "date": start + timedelta(minutes=i),
+                    "created_at": start,
+                    "updated_at": start,
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+
+async def fetch(app, path):
+    """Appelle l'application en ASGI et retourne (statut, octets reçus) sans garder le corps"""
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": route, "raw_path": route.encode(), "query_string": query.encode(),
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    state = {"status": None, "bytes": 0, "request_sent": False}
+    complete = asyncio.Event()
+
+    async def receive():
+        if not state["request_sent"]:
+            state["request_sent"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Le client ne se déconnecte qu'une fois la réponse entièrement reçue
+        await complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            state["bytes"] += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                complete.set()
+
+    await app(scope, receive, send)
+    return state["status"], state["bytes"]
+
+
+def measure(app, label, path):
+    start = time.perf_counter()
+    with PeakRss() as rss:
+        status, size = asyncio.run(fetch(app, path))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} statut {status}  {size / 2**20:9.1f} Mo envoyés  {elapsed:7.2f} s  "
+        f"pic RSS +{(rss.peak - rss.baseline) / 2**20:7.1f} Mo"
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        directory = tempfile.mkdtemp(prefix="netnook-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+    # Import après le choix de la base : app.db.database lit DATABASE_URL à l'import
+    from app.db.database import engine
+    from app.db.init_db import init_db
+    from app.main import app
+
+    init_db()
+    start = time.perf_counter()
+    seed_transactions(engine, args.rows)
+    print(f"{args.rows} transactions générées en {time.perf_counter() - start:.1f} s")
+
+    measure(app, "export CSV", "/finance/transactions/export?format=csv")
+    measure(app, "export NDJSON", "/finance/transactions/export?format=ndjson")
+    if args.compare_list:
+        measure(app, f"liste limit={args.rows}", f"/finance/transactions?limit={args.rows}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
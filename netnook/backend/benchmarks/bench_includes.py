@@ -0,0 +1,106 @@
+"""Vérifie que include= ne dépend pas de la taille de page et le compare aux relectures côté client (N+1).
+
+    cd backend
+    python -m benchmarks.bench_includes --pages 10,100,500 --repeat 5
+
+Une base SQLite temporaire est remplie par benchmarks.datagen (tier small).
+Pour chaque liste à relations et chaque taille de page, on compte les
+requêtes SQL de GET ?include=... : le nombre doit être le même pour toutes
+les tailles (code de sortie 1 sinon). On mesure aussi le temps de la page
+avec include= face au schéma historique de l'interface : la liste, puis un
+GET par ligne et par relation.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Listes à relations : (chemin, include=, relectures par ligne à partir d'un objet de la liste)
+SCENARIOS = [
+    ("/projects/", "client,tasks,documents", lambda row: [
+        *([f"/clients/{row['client_id']}"] if row.get("client_id") else []),
+        f"/tasks/?project_id={row['id']}",
+        f"/documents/?project_id={row['id']}",
+    ]),
+    ("/clients/", "projects,invoices", lambda row: [
+        f"/projects/?client_id={row['id']}",
+        f"/finance/invoices?client_id={row['id']}",
+    ]),
+    ("/tasks/", "project", lambda row: [f"/projects/{row['project_id']}"] if row.get("project_id") else []),
+    ("/finance/invoices", "client,transactions", lambda row: [
+        *([f"/clients/{row['client_id']}"] if row.get("client_id") else []),
+        f"/finance/transactions?invoice_id={row['id']}",
+    ]),
+    ("/finance/transactions", "invoice", lambda row: [f"/finance/invoices/{row['invoice_id']}"] if row.get("invoice_id") else []),
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Nombre de requêtes SQL et temps des listes avec include=")
+    parser.add_argument("--pages", default="10,100,500", help="Tailles de page (limit=), séparées par des virgules")
+    parser.add_argument("--repeat", type=int, default=5, help="Mesures par chemin (la meilleure est retenue)")
+    return parser.parse_args(argv)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pages = [int(size) for size in args.pages.split(",")]
+    directory = tempfile.mkdtemp(prefix="netnook-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ["SLOW_QUERY_THRESHOLD_MS"] = "-1"
+
+    # Import après le choix de la base : app.db.database lit DATABASE_URL à l'import
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.db.database import engine
+    from app.main import app
+    from benchmarks import datagen
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *_: statements.append(None))
+
+    with TestClient(app) as client:
+        datagen.seed(engine, "small")
+
+        def get(url):
+            response = client.get(url)
+            response.raise_for_status()
+            return response.json()
+
+        status = 0
+        print(f"{'liste':<22} {'limit':>6} {'requêtes':>9} {'include=':>10} {'N+1':>10} {'GET N+1':>8}")
+        for path, include, follow in SCENARIOS:
+            counts = set()
+            for limit in pages:
+                url = f"{path}?limit={limit}&include={include}"
+                statements.clear()
+                get(url)
+                counts.add(len(statements))
+                query_count = len(statements)
+
+                included_time = best_of(args.repeat, lambda: get(url))
+                rows = get(f"{path}?limit={limit}")
+                follow_urls = [related for row in rows for related in follow(row)]
+                client_time = best_of(args.repeat, lambda: [get(related) for related in [f"{path}?limit={limit}", *follow_urls]])
+                print(
+                    f"{path:<22} {limit:>6} {query_count:>9} {included_time * 1000:>7.1f} ms "
+                    f"{client_time * 1000:>7.1f} ms {len(follow_urls) + 1:>8}"
+                )
+            if len(counts) > 1:
+                print(f"{path} : le nombre de requêtes varie avec la taille de page ({sorted(counts)})")
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Compare la sérialisation des listes : response_model (Pydantic + json) et FAST_JSON (tuples + orjson).
+
+    cd backend
+    python -m benchmarks.bench_serialization --rows 1000 --repeat 20
+
+Pour chaque schéma de sortie de app/schemas/schemas.py, une base SQLite
+temporaire est remplie de `rows` lignes (générateur de benchmarks.datagen),
+puis une page de `rows` lignes est lue et encodée par les deux chemins :
+- response_model : objets ORM, validation Pydantic (orm_mode), JSONResponse ;
+- FAST_JSON : tuples de colonnes, dicts, ORJSONResponse (app.api.serialization).
+Le temps inclut la requête SQL. Les deux corps doivent être identiques octet pour octet, et
+la taille compressée en gzip et brotli est donnée pour le corps obtenu.
+"""
+from datetime import datetime
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark de la sérialisation des listes")
+    parser.add_argument("--rows", type=int, default=1000, help="Lignes par page sérialisée")
+    parser.add_argument("--repeat", type=int, default=20, help="Mesures par chemin (la meilleure est retenue)")
+    return parser.parse_args(argv)
+
+
+def document_rows(count):
+    moment = datetime(2024, 1, 1)
+    for i in range(1, count + 1):
+        yield {
+            "name": f"Document {i}.pdf", "file_path": f"/app/uploads/blobs/{i:064x}", "file_type": "application/pdf",
+            "size": 1000 + i, "sha256": f"{i:064x}", "project_id": None, "created_at": moment, "updated_at": moment,
+        }
+
+
+def best_of(repeat, func):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    directory = tempfile.mkdtemp(prefix="netnook-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ["SLOW_QUERY_THRESHOLD_MS"] = "-1"
+
+    # Import après le choix de la base : app.db.database lit DATABASE_URL à l'import
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from typing import List
+    from app.api.serialization import json_rows, select_schema_columns
+    from app.db.database import Base, SessionLocal, engine
+    from app.db.init_db import init_db
+    from app.models import models
+    from app.schemas import schemas
+    from benchmarks import datagen
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    init_db()
+    # Assez de lignes parentes pour les clés étrangères des tables générées
+    sizes = {name: args.rows for name in datagen.TIERS["small"]}
+    tables = Base.metadata.tables
+    with engine.begin() as connection:
+        for name, _, rows in datagen.generators(sizes):
+            connection.execute(tables[name].insert(), list(rows))
+        connection.execute(tables["documents"].insert(), list(document_rows(args.rows)))
+
+    outputs = [
+        (model_name, getattr(models, model_name), getattr(schemas, model_name))
+        for model_name in ("Project", "Client", "Task", "Invoice", "Transaction", "Event", "Document",
+                           "Resource", "InventoryItem")
+    ]
+    print(f"{'schéma':<14} {'response_model':>15} {'FAST_JSON':>10} {'gain':>6} {'JSON':>9} {'gzip':>9} {'brotli':>9}")
+    db = SessionLocal()
+    try:
+        for name, model, schema in outputs:
+            field = create_response_field(name=f"Response_{name}", type_=List[schema])
+            query = db.query(model).order_by(model.id).limit(args.rows)
+
+            def classic():
+                db.expunge_all()
+                items = query.all()
+                content = asyncio.run(serialize_response(field=field, response_content=items))
+                return JSONResponse(content).body
+
+            def fast():
+                return json_rows(select_schema_columns(query, model, schema).all(), model, schema).body
+
+            classic_time, classic_body = best_of(args.repeat, classic)
+            fast_time, fast_body = best_of(args.repeat, fast)
+            if classic_body != fast_body:
+                print(f"{name} : les deux chemins produisent un JSON différent")
+                return 1
+            gzip_size = len(zlib.compress(fast_body, 5))
+            brotli_size = len(brotli.compress(fast_body, quality=4)) if brotli else 0
+            print(
+                f"{name:<14} {classic_time * 1000:>12.1f} ms {fast_time * 1000:>7.1f} ms {classic_time / fast_time:>5.1f}x "
+                f"{len(fast_body) / 1024:>6.0f} Ko {gzip_size / 1024:>6.0f} Ko {brotli_size / 1024:>6.0f} Ko"
+            )
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
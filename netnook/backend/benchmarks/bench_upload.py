@@ -0,0 +1,135 @@
+"""Vérifie que l'API reste réactive pendant l'upload d'un gros document.
+
+    cd backend
+    python -m benchmarks.bench_upload --size-mb 2048
+    python -m benchmarks.bench_upload --size-mb 2048 --mode async
+
+Le serveur est lancé sous uvicorn ; un fichier de `size-mb` Mo est généré à
+la volée et envoyé en multipart (transfert chunked, sans Content-Length)
+pendant qu'une sonde enchaîne des GET /health et /projects/. Le rapport
+compare la latence de la sonde avant et pendant l'upload, et vérifie la
+taille et le SHA-256 enregistrés.
+
+Sans --database-url, une base SQLite temporaire est utilisée.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_load import percentile, start_server
+
+BOUNDARY = "netnook-bench-boundary"
+CHUNK_SIZE = 1024 * 1024
+PROBES = ["/health", "/projects/?limit=1"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Latence de l'API pendant un gros upload")
+    parser.add_argument("--size-mb", type=int, default=2048, help="Taille du fichier envoyé (Mo)")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--database-url", default=None, help="Base cible (par défaut SQLite temporaire)")
+    return parser.parse_args(argv)
+
+
+def multipart_body(size, digest):
+    """Corps multipart généré à la volée ; met à jour `digest` avec le contenu du fichier"""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="bench.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    block = os.urandom(CHUNK_SIZE)
+    sent = 0
+    while sent < size:
+        chunk = block[: min(CHUNK_SIZE, size - sent)]
+        digest.update(chunk)
+        sent += len(chunk)
+        yield chunk
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def probe(client, stop, latencies):
+    index = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(PROBES[index % len(PROBES)])
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        index += 1
+        await asyncio.sleep(0.02)
+
+
+async def run(base_url, size):
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        baseline = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, baseline))
+        await asyncio.sleep(2)
+        stop.set()
+        await task
+
+        during = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, during))
+        digest = hashlib.sha256()
+
+        async def body():
+            for chunk in multipart_body(size, digest):
+                yield chunk
+
+        start = time.perf_counter()
+        response = await client.post(
+            "/documents/", content=body(),
+            headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+    return baseline, during, response, elapsed, digest.hexdigest()
+
+
+def report(label, latencies):
+    print(
+        f"{label:<16} {len(latencies):>6} requêtes  p50 {percentile(latencies, 0.50) * 1000:8.1f} ms  "
+        f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  max {max(latencies, default=0) * 1000:8.1f} ms"
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    directory = tempfile.mkdtemp(prefix="netnook-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    upload_directory = os.path.join(directory, "uploads")
+    os.makedirs(upload_directory)
+    size = args.size_mb * 1024 * 1024
+
+    process = start_server(database_url, args.mode, args.port, extra_env={
+        "UPLOAD_DIRECTORY": upload_directory,
+        "MAX_UPLOAD_SIZE": str(size + CHUNK_SIZE),
+    })
+    try:
+        baseline, during, response, elapsed, expected = asyncio.run(run(f"http://127.0.0.1:{args.port}", size))
+    finally:
+        process.terminate()
+        process.wait()
+
+    document = response.json()
+    print(f"upload {args.size_mb} Mo : statut {response.status_code} en {elapsed:.1f} s ({args.size_mb / elapsed:.0f} Mo/s)")
+    report("sonde au repos", baseline)
+    report("sonde pendant", during)
+    ok = response.status_code == 201 and document.get("size") == size and document.get("sha256") == expected
+    print("taille et SHA-256 enregistrés :", "OK" if ok else f"ÉCHEC {document}")
+    if ok:
+        os.remove(document["file_path"])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.db.database import Base, engine
+from app.models import models  # noqa: F401  (enregistre les tables dans Base.metadata)
+
+config = context.config
+
+# init_db() désactive la configuration du logging pour garder celle de l'application
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Objets créés en SQL brut par app.db.search, inconnus des modèles
+SEARCH_INDEX_SUFFIXES = ("_trgm", "_search_tsv")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and name.startswith("search_index"):
+        return False
+    if type_ == "index" and name and name.endswith(SEARCH_INDEX_SUFFIXES):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
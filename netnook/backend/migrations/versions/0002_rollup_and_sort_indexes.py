@@ -0,0 +1,69 @@
+"""Agrégat financier journalier et index de tri de la pagination par curseur
+
+Revision ID: 0002_rollup_and_sort_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-17 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_rollup_and_sort_indexes"
+down_revision: Union[str, None] = "0001_initial_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Les bases créées par create_all avant les migrations peuvent déjà contenir ces objets
+SORT_INDEXES = {
+    "projects": ["name", "created_at"],
+    "clients": ["name", "created_at"],
+    "tasks": ["title", "created_at"],
+    "invoices": ["issue_date", "created_at"],
+    "transactions": ["date", "created_at"],
+    "events": ["start_date", "title", "created_at"],
+    "documents": ["name", "created_at"],
+    "resources": ["name", "created_at"],
+    "inventory_items": ["name", "created_at"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("finance_daily_rollup"):
+        op.create_table(
+            "finance_daily_rollup",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("type", sa.String(length=50), nullable=False),
+            sa.Column("category", sa.String(length=50), nullable=True),
+            sa.Column("total", sa.Float(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("day", "type", "category", name="uq_finance_daily_rollup_key"),
+        )
+        op.create_index("ix_finance_daily_rollup_id", "finance_daily_rollup", ["id"])
+        op.execute(
+            "INSERT INTO finance_daily_rollup (day, type, category, total, count) "
+            "SELECT date(date), type, category, sum(amount), count(id) FROM transactions "
+            "WHERE date IS NOT NULL GROUP BY date(date), type, category"
+        )
+
+    for table, columns in SORT_INDEXES.items():
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        for column in columns:
+            name = f"ix_{table}_{column}_id"
+            if name not in existing:
+                op.create_index(name, table, [column, "id"])
+
+
+def downgrade() -> None:
+    for table, columns in SORT_INDEXES.items():
+        for column in columns:
+            op.drop_index(f"ix_{table}_{column}_id", table_name=table)
+    op.drop_index("ix_finance_daily_rollup_id", table_name="finance_daily_rollup")
+    op.drop_table("finance_daily_rollup")
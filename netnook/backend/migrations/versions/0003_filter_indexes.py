@@ -0,0 +1,55 @@
+"""Index secondaires correspondant aux filtres et agrégations des endpoints
+
+Revision ID: 0003_filter_indexes
+Revises: 0002_rollup_and_sort_indexes
+Create Date: 2026-10-17 00:00:02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_filter_indexes"
+down_revision: Union[str, None] = "0002_rollup_and_sort_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nom, table, colonnes) : chaque index sert une requête précise
+FILTER_INDEXES = [
+    # analytics : GROUP BY status, projets en retard, jointure top clients
+    ("ix_projects_status", "projects", ["status"]),
+    ("ix_projects_client_id", "projects", ["client_id"]),
+    ("ix_projects_end_date", "projects", ["end_date"]),
+    # read_tasks(project_id, status) et performance des projets (project_id IN ... GROUP BY status)
+    ("ix_tasks_project_id_status", "tasks", ["project_id", "status"]),
+    ("ix_tasks_status", "tasks", ["status"]),
+    ("ix_tasks_priority", "tasks", ["priority"]),
+    # read_invoices(client_id, status) et sommes par statut (index couvrant)
+    ("ix_invoices_client_id_status", "invoices", ["client_id", "status"]),
+    ("ix_invoices_status_amount", "invoices", ["status", "amount"]),
+    # read_transactions(invoice_id, type, category) ; la date est servie par ix_transactions_date_id
+    ("ix_transactions_invoice_id", "transactions", ["invoice_id"]),
+    ("ix_transactions_type_category", "transactions", ["type", "category"]),
+    ("ix_transactions_category", "transactions", ["category"]),
+    # read_events(end_date) ; start_date est servi par ix_events_start_date_id
+    ("ix_events_end_date", "events", ["end_date"]),
+    ("ix_documents_project_id", "documents", ["project_id"]),
+    # read_resources(type, availability) et read_employees (type = 'Humain')
+    ("ix_resources_type_availability", "resources", ["type", "availability"]),
+    ("ix_resources_availability", "resources", ["availability"]),
+    # read_inventory_items(category, min_quantity)
+    ("ix_inventory_items_category", "inventory_items", ["category"]),
+    ("ix_inventory_items_quantity", "inventory_items", ["quantity"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in FILTER_INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, columns in reversed(FILTER_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,27 @@
+"""Index de recherche (pg_trgm / tsvector sur PostgreSQL, FTS5 sur SQLite)
+
+Revision ID: 0004_search_indexes
+Revises: 0003_filter_indexes
+Create Date: 2026-10-17 00:00:03
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.db.search import install_search_index, uninstall_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_search_indexes"
+down_revision: Union[str, None] = "0003_filter_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    install_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    uninstall_search_index(op.get_bind())
@@ -0,0 +1,29 @@
+"""Empreinte d'import des transactions (dédoublonnage des relevés bancaires)
+
+Revision ID: 0005_transaction_import_hash
+Revises: 0004_search_indexes
+Create Date: 2026-10-17 00:00:04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_transaction_import_hash"
+down_revision: Union[str, None] = "0004_search_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("import_hash", sa.String(length=64), nullable=True))
+    op.create_index("ix_transactions_import_hash", "transactions", ["import_hash"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_import_hash", table_name="transactions")
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.drop_column("import_hash")
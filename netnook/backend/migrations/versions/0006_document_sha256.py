@@ -0,0 +1,27 @@
+"""Empreinte SHA-256 des documents, calculée à l'upload
+
+Revision ID: 0006_document_sha256
+Revises: 0005_transaction_import_hash
+Create Date: 2026-10-17 00:00:05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_document_sha256"
+down_revision: Union[str, None] = "0005_transaction_import_hash"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("sha256", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("documents") as batch_op:
+        batch_op.drop_column("sha256")
@@ -0,0 +1,46 @@
+"""Stockage des documents adressé par contenu, avec compteurs de références
+
+Les fichiers existants sont rangés sous UPLOAD_DIRECTORY/blobs et dédoublonnés.
+
+Revision ID: 0007_document_blobs
+Revises: 0006_document_sha256
+Create Date: 2026-10-17 00:00:06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.document_store import dedup_existing_documents, restore_document_files
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_document_blobs"
+down_revision: Union[str, None] = "0006_document_sha256"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_blobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=True),
+        sa.Column("file_path", sa.String(length=255), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("sha256"),
+    )
+    op.create_index("ix_document_blobs_id", "document_blobs", ["id"], unique=False)
+    op.create_index("ix_documents_sha256", "documents", ["sha256"], unique=False)
+    dedup_existing_documents(op.get_bind())
+
+
+def downgrade() -> None:
+    restore_document_files(op.get_bind())
+    op.drop_index("ix_documents_sha256", table_name="documents")
+    op.drop_index("ix_document_blobs_id", table_name="document_blobs")
+    op.drop_table("document_blobs")
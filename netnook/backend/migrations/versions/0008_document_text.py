@@ -0,0 +1,40 @@
+"""Texte extrait des documents et son index plein texte
+
+Revision ID: 0008_document_text
+Revises: 0007_document_blobs
+Create Date: 2026-10-17 00:00:07
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.search import install_document_text_index, uninstall_document_text_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_document_text"
+down_revision: Union[str, None] = "0007_document_blobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Les contenus existants sont en attente : extraits au prochain démarrage
+    op.add_column("document_blobs", sa.Column("extraction_status", sa.String(length=20), nullable=False, server_default="pending"))
+    op.add_column("document_blobs", sa.Column("extracted_text", sa.Text(), nullable=True))
+    op.add_column("document_blobs", sa.Column("extraction_error", sa.String(length=255), nullable=True))
+    op.add_column("document_blobs", sa.Column("extracted_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_document_blobs_extraction_status", "document_blobs", ["extraction_status"], unique=False)
+    install_document_text_index(op.get_bind())
+
+
+def downgrade() -> None:
+    uninstall_document_text_index(op.get_bind())
+    op.drop_index("ix_document_blobs_extraction_status", table_name="document_blobs")
+    with op.batch_alter_table("document_blobs") as batch_op:
+        batch_op.drop_column("extracted_at")
+        batch_op.drop_column("extraction_error")
+        batch_op.drop_column("extracted_text")
+        batch_op.drop_column("extraction_status")
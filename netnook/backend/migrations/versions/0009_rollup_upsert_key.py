@@ -0,0 +1,44 @@
+"""Clé unique de l'agrégat financier utilisable en upsert (catégorie NULL comprise)
+
+Revision ID: 0009_rollup_upsert_key
+Revises: 0008_document_text
+Create Date: 2026-10-17 00:00:08
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_rollup_upsert_key"
+down_revision: Union[str, None] = "0008_document_text"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REBUILD_ROLLUP = (
+    "INSERT INTO finance_daily_rollup (day, type, category, total, count) "
+    "SELECT date(date), type, category, sum(amount), count(id) FROM transactions "
+    "WHERE date IS NOT NULL GROUP BY date(date), type, category"
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("finance_daily_rollup") as batch_op:
+        batch_op.drop_constraint("uq_finance_daily_rollup_key", type_="unique")
+    # L'ancienne contrainte laissait passer des doublons de catégorie NULL : agrégat recalculé
+    op.execute("DELETE FROM finance_daily_rollup")
+    op.execute(REBUILD_ROLLUP)
+    op.create_index(
+        "uq_finance_daily_rollup_key",
+        "finance_daily_rollup",
+        ["day", "type", sa.text("coalesce(category, '')")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_finance_daily_rollup_key", table_name="finance_daily_rollup")
+    with op.batch_alter_table("finance_daily_rollup") as batch_op:
+        batch_op.create_unique_constraint("uq_finance_daily_rollup_key", ["day", "type", "category"])
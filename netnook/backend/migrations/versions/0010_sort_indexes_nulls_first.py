@@ -0,0 +1,52 @@
+"""Index de tri NULLS FIRST sur PostgreSQL pour les colonnes de tri qui acceptent NULL
+
+Revision ID: 0010_sort_indexes_nulls_first
+Revises: 0009_rollup_upsert_key
+Create Date: 2026-10-17 00:00:09
+
+La pagination place les NULL en premier en tri croissant et en dernier en tri
+décroissant (voir app.api.pagination) : c'est l'ordre natif des index SQLite,
+rien à faire sur ce dialecte. Sur PostgreSQL, un index NULLS FIRST parcouru
+dans un sens ou dans l'autre fournit directement ces deux ordres.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_sort_indexes_nulls_first"
+down_revision: Union[str, None] = "0009_rollup_upsert_key"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NULLABLE_SORTS = {
+    "projects": ["created_at"],
+    "clients": ["created_at"],
+    "tasks": ["created_at"],
+    "invoices": ["issue_date", "created_at"],
+    "transactions": ["date", "created_at"],
+    "events": ["created_at"],
+    "documents": ["created_at"],
+    "resources": ["created_at"],
+    "inventory_items": ["created_at"],
+}
+
+
+def _recreate(nulls_first):
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, columns in NULLABLE_SORTS.items():
+        for column in columns:
+            name = f"ix_{table}_{column}_id"
+            op.drop_index(name, table_name=table)
+            op.create_index(name, table, [sa.text(f"{column} NULLS FIRST") if nulls_first else column, "id"])
+
+
+def upgrade() -> None:
+    _recreate(nulls_first=True)
+
+
+def downgrade() -> None:
+    _recreate(nulls_first=False)
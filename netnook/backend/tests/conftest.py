@@ -0,0 +1,47 @@
+"""Configuration commune des tests : base SQLite et répertoire d'upload temporaires.
+
+Les variables d'environnement sont fixées avant l'import de l'application :
+app.db.database et app.api.uploads les lisent à l'import.
+"""
+from contextlib import contextmanager
+import os
+import tempfile
+
+TEST_DIRECTORY = tempfile.mkdtemp(prefix="netnook-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIRECTORY, 'test.db')}"
+os.environ["DATABASE_ASYNC"] = "false"
+os.environ["UPLOAD_DIRECTORY"] = os.path.join(TEST_DIRECTORY, "uploads")
+os.environ["SLOW_QUERY_THRESHOLD_MS"] = "-1"
+os.environ["TEXT_EXTRACTION_WORKERS"] = "0"
+os.environ["PREVIEW_WORKERS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db.database import engine
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@contextmanager
+def _count(statements):
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def count_statements():
+    """Contexte qui relève les requêtes SQL exécutées : with count_statements() as statements"""
+    return lambda: _count([])
@@ -0,0 +1,42 @@
+from app.core.cache import analytics_cache
+
+STATUS = "Audit performance"
+
+
+def _create(client, path, **values):
+    response = client.post(path, json=values)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _add_projects(client, count):
+    for i in range(count):
+        customer = _create(client, "/clients/", name=f"Client performance {i}")
+        project = _create(client, "/projects/", name=f"Projet performance {i}", status=STATUS, client_id=customer["id"])
+        _create(client, "/tasks/", title="Tâche", status="Terminée", project_id=project["id"])
+        _create(client, "/finance/invoices", invoice_number=f"PERF-{project['id']}", client_id=customer["id"], amount=100)
+
+
+def test_projects_performance_query_count_is_constant(client, count_statements):
+    counts = []
+    for added in (2, 20):
+        _add_projects(client, added)
+        analytics_cache.clear()
+        with count_statements() as statements:
+            response = client.get("/analytics/projects/performance", params={"status": STATUS})
+        assert response.status_code == 200
+        projects = response.json()
+        assert all(project["tasks"] == [{"status": "Terminée", "count": 1}] for project in projects)
+        assert all(project["total_invoiced"] == 100 for project in projects)
+        counts.append((len(projects), len(statements)))
+    assert counts == [(2, 3), (22, 3)]
+
+
+def test_projects_performance_returns_all_projects_by_default(client):
+    _add_projects(client, 3)
+    analytics_cache.clear()
+    everything = client.get("/analytics/projects/performance").json()
+    page = client.get("/analytics/projects/performance", params={"skip": 1, "limit": 2}).json()
+    assert len(everything) >= 3
+    assert [project["id"] for project in page] == [project["id"] for project in everything[1:3]]
+    assert client.get("/analytics/projects/performance", params={"limit": 0}).status_code == 422
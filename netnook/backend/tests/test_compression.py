@@ -0,0 +1,29 @@
+def _project(client):
+    response = client.post("/projects/", json={"name": "Projet compressé", "description": "Cahier des charges. " * 200})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_compressed_responses_have_their_own_strong_etag(client):
+    project = _project(client)
+    path = f"/projects/{project['id']}"
+
+    identity = client.get(path, headers={"Accept-Encoding": "identity"})
+    compressed = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    # Réponse non compressée pour ce client mais compressible : un cache doit la distinguer
+    assert "Accept-Encoding" in identity.headers["vary"]
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert compressed.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+
+    # La version en cache, compressée ou non, est reconnue
+    for etag, encoding in ((compressed.headers["etag"], "gzip"), (identity.headers["etag"], "identity")):
+        revalidated = client.get(path, headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == etag
+
+    updated = client.put(path, json={"name": "Projet renommé"}, headers={"If-Match": compressed.headers["etag"]})
+    assert updated.status_code == 200
+    stale = client.put(path, json={"name": "Conflit"}, headers={"If-Match": compressed.headers["etag"]})
+    assert stale.status_code == 412
@@ -0,0 +1,100 @@
+import os
+
+
+def _upload(client, content, name="note.txt"):
+    response = client.post("/documents/", files={"file": (name, content, "text/plain")})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_file_path_is_not_writable(client):
+    document = _upload(client, b"contenu du document")
+
+    response = client.put(f"/documents/{document['id']}", json={"file_path": "/etc/passwd"})
+    assert response.status_code == 200
+    assert response.json()["file_path"] == document["file_path"]
+    response = client.put("/documents/bulk", json=[{"id": document["id"], "file_path": "/etc/passwd"}])
+    assert response.status_code == 200
+
+    content = client.get(f"/documents/{document['id']}/content")
+    assert content.status_code == 200
+    assert content.content == b"contenu du document"
+
+
+def test_content_outside_upload_directory_is_not_served(client):
+    from app.db.database import SessionLocal
+    from app.models.models import Document
+
+    db = SessionLocal()
+    try:
+        legacy = Document(name="ancien", file_path="/etc/passwd", file_type="text/plain")
+        db.add(legacy)
+        db.commit()
+        document_id = legacy.id
+    finally:
+        db.close()
+
+    assert client.get(f"/documents/{document_id}/content").status_code == 404
+
+
+def test_reupload_survives_concurrent_delete_of_last_reference(client):
+    from app.api.uploads import UPLOAD_DIRECTORY, ReceivedFile
+    from app.db.database import SessionLocal
+    from app.db.document_store import blob_path, settle_blob, store_blob
+    from app.models.models import Document
+
+    content = b"contenu partage puis supprime"
+    first = _upload(client, content)
+
+    # Upload du même contenu : le fichier existe encore au moment de store_blob
+    received = ReceivedFile(UPLOAD_DIRECTORY, len(content), "copie.txt", "text/plain")
+    received.write(content)
+    path = store_blob(received)
+    # La dernière référence disparaît avant que le nouveau document ne soit validé
+    assert client.delete(f"/documents/{first['id']}").status_code == 204
+    assert not os.path.exists(blob_path(received.sha256))
+
+    db = SessionLocal()
+    try:
+        document = Document(name="copie.txt", file_path=path, size=len(content), sha256=received.sha256)
+        db.add(document)
+        db.commit()
+        document_id = document.id
+    finally:
+        db.close()
+    settle_blob(received)
+
+    response = client.get(f"/documents/{document_id}/content")
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_rebuild_references_keeps_extracted_text(client):
+    from app.db.database import SessionLocal
+    from app.db.document_store import blob_path, check_store, rebuild_references
+    from app.models.models import DocumentBlob
+    from sqlalchemy import text
+
+    kept = _upload(client, b"texte extrait conserve")
+    orphan = _upload(client, b"contenu sans document")
+    db = SessionLocal()
+    try:
+        blob = db.query(DocumentBlob).filter(DocumentBlob.sha256 == kept["sha256"]).one()
+        blob.extraction_status = "done"
+        blob.extracted_text = "texte extrait conserve"
+        blob.ref_count = 5
+        db.query(DocumentBlob).filter(DocumentBlob.sha256 == orphan["sha256"]).update({"ref_count": 3})
+        db.commit()
+        # Le document du second contenu disparaît sans passer par la session (base modifiée à la main)
+        db.execute(text("DELETE FROM documents WHERE id = :id"), {"id": orphan["id"]})
+        db.commit()
+
+        rebuild_references(db)
+
+        blob = db.query(DocumentBlob).filter(DocumentBlob.sha256 == kept["sha256"]).one()
+        assert (blob.ref_count, blob.extraction_status, blob.extracted_text) == (1, "done", "texte extrait conserve")
+        assert db.query(DocumentBlob).filter(DocumentBlob.sha256 == orphan["sha256"]).first() is None
+        assert not os.path.exists(blob_path(orphan["sha256"]))
+        assert not [problem for problem in check_store(db) if problem["sha256"] in (kept["sha256"], orphan["sha256"])]
+    finally:
+        db.close()
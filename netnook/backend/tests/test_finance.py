@@ -0,0 +1,50 @@
+from app.db.database import SessionLocal
+from app.db.finance_rollup import check_rollup
+from app.models.models import FinanceDailyRollup
+
+
+def _transaction(client, **values):
+    response = client.post("/finance/transactions", json=values)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _summary(client, **params):
+    response = client.get("/analytics/finance/summary", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_end_date_is_inclusive_to_the_instant_on_both_paths(client):
+    _transaction(client, amount=10, type="Revenu", category="conseil", date="2031-03-10T00:00:00")
+    _transaction(client, amount=100, type="Revenu", date="2031-03-10T12:00:00")
+    _transaction(client, amount=5, type="Dépense", date="2031-03-09T15:00:00")
+
+    # Bornes à minuit (agrégat journalier) et bornes horaires (transactions) : mêmes totaux
+    for start_date in ("2031-03-09T00:00:00", "2031-03-09T01:00:00"):
+        summary = _summary(client, start_date=start_date, end_date="2031-03-10T00:00:00")
+        assert (summary["total_income"], summary["total_expenses"]) == (10, 5)
+    assert _summary(client, start_date="2031-03-09T00:00:00", end_date="2031-03-11T00:00:00")["total_income"] == 110
+
+    series = _summary(client, start_date="2031-03-09T00:00:00", end_date="2031-03-10T00:00:00", group_by="day")["series"]
+    assert [(period["period"], period["income"], period["expenses"]) for period in series] == [
+        ("2031-03-09", 0, 5), ("2031-03-10", 10, 0)
+    ]
+
+
+def test_rollup_upsert_merges_null_categories(client):
+    first = _transaction(client, amount=7, type="Dépense", date="2032-01-05T09:00:00")
+    second = _transaction(client, amount=3, type="Dépense", date="2032-01-05T18:00:00")
+
+    db = SessionLocal()
+    try:
+        rows = db.query(FinanceDailyRollup).filter(FinanceDailyRollup.day == first["date"][:10]).all()
+        assert [(row.category, row.total, row.count) for row in rows] == [(None, 10, 2)]
+
+        for transaction in (first, second):
+            assert client.delete(f"/finance/transactions/{transaction['id']}").status_code == 204
+        db.expire_all()
+        assert db.query(FinanceDailyRollup).filter(FinanceDailyRollup.day == first["date"][:10]).count() == 0
+        assert check_rollup(db) == []
+    finally:
+        db.close()
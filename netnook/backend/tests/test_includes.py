@@ -0,0 +1,41 @@
+import pytest
+
+# Listes à relations et include= correspondant (voir les *_INCLUDES des routers)
+SCENARIOS = [
+    ("/projects/", "client,tasks,documents"),
+    ("/clients/", "projects,invoices"),
+    ("/tasks/", "project"),
+    ("/finance/invoices", "client,transactions"),
+    ("/finance/transactions", "invoice"),
+]
+
+
+def _create(client, path, **values):
+    response = client.post(path, json=values)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.fixture(scope="module")
+def related(client):
+    for i in range(12):
+        customer = _create(client, "/clients/", name=f"Client inclus {i}")
+        project = _create(client, "/projects/", name=f"Projet inclus {i}", client_id=customer["id"])
+        for title in ("Cadrage", "Recette"):
+            _create(client, "/tasks/", title=title, project_id=project["id"])
+        invoice = _create(client, "/finance/invoices", invoice_number=f"INC-{i}", client_id=customer["id"], amount=50)
+        _create(client, "/finance/transactions", invoice_id=invoice["id"], amount=50, type="Revenu")
+
+
+@pytest.mark.parametrize("path,include", SCENARIOS)
+def test_include_query_count_does_not_depend_on_page_size(client, count_statements, related, path, include):
+    counts = []
+    for limit in (2, 10):
+        with count_statements() as statements:
+            response = client.get(path, params={"limit": limit, "include": include, "sort": "-id"})
+        assert response.status_code == 200, response.text
+        rows = response.json()
+        assert len(rows) == limit
+        assert all(name in row for row in rows for name in include.split(","))
+        counts.append(len(statements))
+    assert counts[0] == counts[1], f"{path}?include={include} : {counts} requêtes pour limit=2 et limit=10"
@@ -0,0 +1,56 @@
+from app.api.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+
+
+def test_limit_outside_bounds_is_rejected(client):
+    for limit in (0, -1, MAX_PAGE_SIZE + 1):
+        assert client.get("/projects/", params={"limit": limit}).status_code == 422
+    assert client.get("/projects/", params={"skip": -1}).status_code == 422
+
+
+def test_limit_truncates_the_page(client):
+    for name in ("Alpha", "Beta"):
+        assert client.post("/projects/", json={"name": name}).status_code == 201
+
+    response = client.get("/projects/", params={"limit": 1})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.headers[NEXT_CURSOR_HEADER]
+
+
+def _pages(client, path, params):
+    ids = []
+    cursor = None
+    while True:
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        ids += [row["id"] for row in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+
+
+def test_cursor_pages_through_null_sort_values(client):
+    customer = client.post("/clients/", json={"name": "Client pagination"}).json()
+    dates = ["2030-01-03T00:00:00", None, "2030-01-01T00:00:00", None, "2030-01-02T00:00:00"]
+    invoices = []
+    for i, issue_date in enumerate(dates):
+        response = client.post("/finance/invoices", json={
+            "invoice_number": f"NULL-{i}", "client_id": customer["id"], "amount": 10,
+            "status": "Pagination NULL", "issue_date": issue_date,
+        })
+        assert response.status_code == 201, response.text
+        invoice = response.json()
+        if issue_date is None:
+            # La création applique la date du jour : NULL passe par une modification
+            response = client.put(f"/finance/invoices/{invoice['id']}", json={"issue_date": None})
+            assert response.status_code == 200, response.text
+            invoice = response.json()
+        invoices.append(invoice)
+    assert [invoice["issue_date"] for invoice in invoices].count(None) == 2
+
+    # NULL en premier en tri croissant, en dernier en tri décroissant, départagés par id
+    nulls = [invoices[1]["id"], invoices[3]["id"]]
+    dated = [invoices[2]["id"], invoices[4]["id"], invoices[0]["id"]]
+    params = {"status": "Pagination NULL", "limit": 2}
+    assert _pages(client, "/finance/invoices", {**params, "sort": "issue_date"}) == nulls + dated
+    assert _pages(client, "/finance/invoices", {**params, "sort": "-issue_date"}) == dated[::-1] + nulls[::-1]
@@ -0,0 +1,174 @@
+"""Plans d'exécution des requêtes de liste et d'analytics.
+
+Rejoue un ensemble de requêtes HTTP représentatives (filtres, tris, curseurs,
+recherche, analytics) sur une base remplie par benchmarks.datagen, capture
+les SELECT émis puis lance EXPLAIN sur chacun via une connexion séparée. Tout
+parcours complet d'une table dépassant MIN_ROWS lignes fait échouer le test.
+
+Un parcours avec LIMIT qui fournit directement l'ordre demandé (pas de tri
+intermédiaire) n'est pas signalé : il s'arrête après `limit` lignes retenues,
+c'est le plan attendu pour une page de liste sur un filtre peu sélectif.
+"""
+import json
+import re
+
+import pytest
+from sqlalchemy import event, text
+
+from app.core.cache import analytics_cache
+from app.db.database import Base, SessionLocal, engine
+from app.db.finance_rollup import rebuild_rollup
+from benchmarks import datagen
+
+# Taille de table à partir de laquelle un parcours complet est signalé
+MIN_ROWS = 1000
+
+# Requêtes rejouées : chaque filtre et chaque tri exposés par les endpoints
+SCENARIOS = [
+    "/projects/?limit=50",
+    "/projects/?search=refonte",
+    "/projects/?sort=name&limit=50",
+    "/projects/?sort=-created_at&limit=50",
+    "/clients/?search=dupont",
+    "/clients/?sort=name&limit=50",
+    "/tasks/?project_id=1",
+    "/tasks/?project_id=1&status=En%20cours",
+    "/tasks/?status=Termin%C3%A9e",
+    "/tasks/?priority=Haute",
+    "/tasks/?search=maquette",
+    "/finance/invoices?client_id=1",
+    "/finance/invoices?status=En%20attente",
+    "/finance/invoices?search=FAC",
+    "/finance/invoices?sort=-issue_date&limit=50",
+    "/finance/transactions?invoice_id=1",
+    "/finance/transactions?type=Revenu",
+    "/finance/transactions?category=Loyer",
+    "/finance/transactions?type=D%C3%A9pense&category=Loyer",
+    "/finance/transactions?sort=-date&limit=50",
+    "/planning/events?start_date=2026-01-01T00:00:00",
+    "/planning/events?end_date=2026-01-31T00:00:00",
+    "/documents/?project_id=1",
+    "/resources/?type=Mat%C3%A9riel",
+    "/resources/?availability=true",
+    "/hr/employees?availability=true",
+    "/inventory/?category=Informatique",
+    "/inventory/?min_quantity=10",
+    "/search/?q=refonte",
+    "/analytics/dashboard",
+    "/analytics/finance/summary?start_date=2026-01-01&end_date=2026-03-31&group_by=month",
+    "/analytics/finance/summary?start_date=2026-01-01T08:30:00",
+    "/analytics/projects/performance?status=En%20cours",
+    "/analytics/ai-insights",
+]
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """Volumes du palier small de datagen, ajoutés aux données des autres tests"""
+    tables = Base.metadata.tables
+    for name, _, rows in datagen.generators(datagen.TIERS["small"]):
+        with engine.begin() as connection:
+            connection.execute(tables[name].insert(), list(rows))
+    db = SessionLocal()
+    try:
+        rebuild_rollup(db)
+    finally:
+        db.close()
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+
+def capture_statements(client, scenarios):
+    """Exécute les scénarios et retourne les SELECT émis : [(route, sql, paramètres)]"""
+    captured = []
+    current = {"route": None}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((current["route"], statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        for route in scenarios:
+            analytics_cache.clear()
+            current["route"] = route
+            response = client.get(route)
+            assert response.status_code < 500, f"{route} a répondu {response.status_code}"
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def _table_rows(connection, table, cache):
+    if table not in cache:
+        if connection.dialect.name == "postgresql":
+            cache[table] = connection.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table AND relkind = 'r'"),
+                {"table": table},
+            ).scalar()
+        else:
+            try:
+                cache[table] = connection.execute(text(f'SELECT count(*) FROM "{table}"')).scalar()
+            except Exception:
+                cache[table] = None
+    return cache[table]
+
+
+def _explain_sqlite(connection, statement, parameters):
+    plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    details = [row[-1] for row in plan]
+    scans = [(m.group(1), detail) for detail in details if (m := SQLITE_FULL_SCAN.match(detail))]
+    needs_sort = any(detail.startswith("USE TEMP B-TREE") for detail in details)
+    return scans, needs_sort
+
+
+def _walk_pg_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_pg_plan(child)
+
+
+def _explain_postgresql(connection, statement, parameters):
+    result = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    plan = result if isinstance(result, list) else json.loads(result)
+    nodes = list(_walk_pg_plan(plan[0]["Plan"]))
+    scans = [
+        (node["Relation Name"], f"Seq Scan on {node['Relation Name']}")
+        for node in nodes if node.get("Node Type") == "Seq Scan"
+    ]
+    needs_sort = any(node.get("Node Type") in ("Sort", "Incremental Sort", "Aggregate", "HashAggregate") for node in nodes)
+    return scans, needs_sort
+
+
+def _has_limit(statement):
+    return " LIMIT " in " ".join(statement.upper().split())
+
+
+def check_plans(client, min_rows=MIN_ROWS, scenarios=SCENARIOS):
+    """Retourne la liste des parcours complets de tables de plus de min_rows lignes"""
+    captured = capture_statements(client, scenarios)
+    violations = []
+    seen = set()
+    table_rows = {}
+    with engine.connect() as connection:
+        explain = _explain_postgresql if connection.dialect.name == "postgresql" else _explain_sqlite
+        for route, statement, parameters in captured:
+            if (route, statement) in seen:
+                continue
+            seen.add((route, statement))
+            scans, needs_sort = explain(connection, statement, parameters)
+            if _has_limit(statement) and not needs_sort:
+                continue
+            for table, detail in scans:
+                rows = _table_rows(connection, table, table_rows)
+                if rows is not None and rows > min_rows:
+                    violations.append(f"{route}: {detail} ({rows} lignes)\n    {' '.join(statement.split())}")
+    return violations
+
+
+def test_no_full_table_scan(client, seeded):
+    violations = check_plans(client)
+    assert not violations, f"{len(violations)} parcours complet(s) au-delà de {MIN_ROWS} lignes :\n" + "\n".join(violations)
+
@@ -0,0 +1,26 @@
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import instrument_sql, sql_statements
+from app.db.slow_queries import SlowQueryRecorder
+
+
+def test_explain_of_a_slow_query_is_not_recorded(tmp_path):
+    # Moteur dédié : les écouteurs ajoutés ici ne concernent pas les autres tests
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+    recorder = SlowQueryRecorder(threshold_ms=0)
+    recorder.instrument(engine, "test-slow")
+    instrument_sql(engine, "test-slow")
+    recorder.explain_engine = engine
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1 AS lente"))
+    deadline = time.monotonic() + 5
+    while not recorder.top()[0]["plan"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    entries = recorder.top()
+    assert entries[0]["plan"]
+    assert [entry["statement"] for entry in entries] == ["SELECT ? AS lente"]
+    assert sql_statements._values[("test-slow",)] == 1
@@ -0,0 +1,82 @@
+from hashlib import sha256
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.uploads import MAX_FIELDS, receive_upload
+
+BOUNDARY = "netnook-test"
+CHUNK_SIZE = 64 * 1024
+
+
+def _body(content, fields=()):
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields
+    ]
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="data.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n".encode() + content + b"\r\n"
+    )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body):
+    """Requête dont le corps arrive par blocs, sans Content-Length (envoi en flux)"""
+    chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        # Laisse s'entrelacer les réceptions concurrentes
+        await asyncio.sleep(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/documents/",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())],
+    }
+    return Request(scope, receive)
+
+
+def _temporary_files(directory):
+    return [name for name in os.listdir(directory) if name.startswith(".upload-")]
+
+
+def test_concurrent_uploads_hash_and_size(tmp_path):
+    contents = [os.urandom(size) for size in (1, CHUNK_SIZE * 3 + 7, CHUNK_SIZE * 10)]
+
+    async def receive_all():
+        return await asyncio.gather(*[
+            receive_upload(_request(_body(content, [("name", f"fichier {i}")])), directory=str(tmp_path), max_size=1024 * 1024)
+            for i, content in enumerate(contents)
+        ])
+
+    results = asyncio.run(receive_all())
+    for i, (content, (fields, received)) in enumerate(zip(contents, results)):
+        assert fields == {"name": f"fichier {i}"}
+        assert (received.size, received.sha256) == (len(content), sha256(content).hexdigest())
+        received.move_to(str(tmp_path / received.sha256))
+        with open(received.path, "rb") as stored:
+            assert stored.read() == content
+    assert _temporary_files(tmp_path) == []
+
+
+def test_streaming_upload_above_limit_is_rejected(tmp_path):
+    body = _body(b"x" * (CHUNK_SIZE * 4))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(receive_upload(_request(body), directory=str(tmp_path), max_size=CHUNK_SIZE))
+    assert error.value.status_code == 413
+    assert _temporary_files(tmp_path) == []
+
+
+def test_too_many_fields_is_rejected(tmp_path):
+    fields = [(f"champ{i}", "valeur") for i in range(MAX_FIELDS + 1)]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(receive_upload(_request(_body(b"contenu", fields)), directory=str(tmp_path)))
+    assert error.value.status_code == 413
+    assert _temporary_files(tmp_path) == []